@@ -12,6 +12,7 @@ from collections import defaultdict
 from urllib.parse import urlparse, unquote
 import requests
 import sys
+import multiprocessing
 import logging
 from pathlib import Path
 import uuid
@@ -38,10 +39,11 @@ from Core_Modules.settings.settings_manager import SettingsManager
 from Core_Modules.parsers.m3u_parser import M3UParser
 from Core_Modules.parsers.epg_parser import EPGParser
 from Core_Modules.core.channel_validator import ChannelValidator
-from Core_Modules.undo.undo_manager import UndoManager
+from Core_Modules.undo.undo_manager import UndoManager, ListEditor
+from Core_Modules.undo.history_journal import HistoryJournal
 from Core_Modules.utils.helpers import (
     sanitize_filename, validate_url, validate_file_path,
-    sanitize_input, is_valid_m3u, download_and_cache_thumbnail,
+    sanitize_input, is_valid_m3u,
     get_cached_thumbnail_stats, SimpleCache, get_file_size,
     create_progress_dialog, open_folder_in_explorer
 )
@@ -49,6 +51,7 @@ from Core_Modules.gui.components import ButtonFactory, DialogFactory, ProgressMa
 from Core_Modules.ffprobe_validator import validate_m3u_quick, FFprobeValidator
 from Core_Modules.http_validator import HTTPValidator
 from Core_Modules.github_deploy import GitHubDeploy, deploy_generated_pages
+from Core_Modules.output_manager import get_output_manager
 
 # Initialize generators as None - will be set in try/except
 NexusTVPageGenerator = None
@@ -155,10 +158,11 @@ class M3UMatrix:
         # Initialize Core Module managers
         self.settings_manager = SettingsManager()
         self.settings = self.settings_manager.get_all_settings()
-        self.m3u_parser = M3UParser()
+        self.m3u_parser = M3UParser(cache_thumbnails=self.settings.get('cache_thumbnails', True),
+                                    thumbnails_dir=get_output_manager().thumbnails_dir)
         self.epg_parser = EPGParser()
         self.channel_validator = ChannelValidator()
-        self.undo_manager = UndoManager()
+        self.undo_manager = UndoManager(journal=HistoryJournal())
         self.progress_manager = ProgressManager(self.root)  # type: ignore
         self.github_deployer = GitHubDeploy()  # GitHub deployment handler
         
@@ -269,6 +273,8 @@ class M3UMatrix:
             ("🎬 FFprobe Check", self.validate_with_ffprobe, "#00FFFF"),
             ("📡 EPG Import", self.import_epg, "#3498DB"),
             ("🎬 CLASSIC TV", self.generate_classic, "#FF0000"),
+            ("🖼️ Cache Logos", self.cache_channel_logos, "#F39C12"),
+            ("🖼️ Thumbnails", self.build_channel_thumbnails, "#E67E22"),
             # Row 3 - New Schedule Center
             ("📅 TV Schedule Center", self.open_schedule_center, "#2ECC71")
         ]
@@ -382,13 +388,9 @@ class M3UMatrix:
                 
                 if channels:
                     # Track changes for undo
-                    old_channels = self.channels.copy()
-                    self.channels.extend(channels)
-                    self.undo_manager.save_state({
-                        'type': 'load',
-                        'old_channels': old_channels,
-                        'new_channels': self.channels.copy()
-                    })
+                    editor = ListEditor(self.channels)
+                    editor.append(channels)
+                    self.undo_manager.record_edits(editor.edits, f"Load {Path(file_path).name}", 'load')
                     
                     loaded_count += 1
                     self.files.append(file_path)
@@ -401,9 +403,66 @@ class M3UMatrix:
         if loaded_count > 0:
             self.refresh_display()
             self.update_status(f"Loaded {loaded_count} file(s), {len(self.channels)} channels")
+            if self.settings.get('cache_logos_on_load', False):
+                self.cache_channel_logos()
         else:
             messagebox.showwarning("No Files Loaded", "No valid M3U files were loaded")
 
+    def cache_channel_logos(self):
+        """Cache channel logos in the background"""
+        if not self.channels:
+            messagebox.showwarning("No Channels", "Please load channels first")
+            return
+        
+        # The worker only sees copies; results are applied on the Tk thread
+        channels = [dict(ch) for ch in self.channels]
+        self.update_status(f"Caching logos for {len(channels)} channels...")
+        
+        def cache_thread():
+            try:
+                stats = self.m3u_parser.cache_logos(channels)
+                message = f"Cached {stats['cached']} channel logo(s), {stats['failed']} failed"
+                self.root.after(0, lambda: self.apply_channel_fields(channels, ('logo_path',), message))
+            except Exception as e:
+                self.logger.error(f"Logo caching failed: {e}")
+        
+        thread = threading.Thread(target=cache_thread, daemon=True)
+        thread.start()
+
+    def build_channel_thumbnails(self):
+        """Build channel thumbnails (cached logos or placeholders) in the background"""
+        if not self.channels:
+            messagebox.showwarning("No Channels", "Please load channels first")
+            return
+        
+        channels = [dict(ch) for ch in self.channels]
+        self.update_status(f"Building thumbnails for {len(channels)} channels...")
+        
+        def thumbnail_thread():
+            try:
+                # Render in this process: no worker pool forked from the Tk app
+                stats = self.m3u_parser.build_thumbnails(channels, workers=1)
+                message = (f"Built {stats['logos']} logo and "
+                           f"{stats['placeholders']} placeholder thumbnail(s)")
+                self.root.after(0, lambda: self.apply_channel_fields(channels, ('thumbnail',), message))
+            except Exception as e:
+                self.logger.error(f"Thumbnail build failed: {e}")
+        
+        thread = threading.Thread(target=thumbnail_thread, daemon=True)
+        thread.start()
+
+    def apply_channel_fields(self, results, fields, message):
+        """Copy fields computed in a worker onto the matching live channels"""
+        by_uuid = {ch['uuid']: ch for ch in results if 'uuid' in ch}
+        for channel in self.channels:
+            result = by_uuid.get(channel.get('uuid'))
+            if result is None:
+                continue
+            for field in fields:
+                if field in result:
+                    channel[field] = result[field]
+        self.update_status(message)
+
     def refresh_display(self):
         """Refresh the treeview display"""
         # Clear current display
@@ -1016,9 +1075,6 @@ Sample Details:
             messagebox.showinfo("No Data", "Nothing to paste")
             return
         
-        # Track for undo
-        old_channels = self.channels.copy()
-        
         # Insert at current selection or end
         selected = self.tv.selection()
         if selected:
@@ -1026,19 +1082,17 @@ Sample Details:
         else:
             insert_index = len(self.channels)
         
-        # Insert channels
-        for i, channel in enumerate(self.clipboard):
-            # Generate new UUID for pasted channel
+        # Generate new UUIDs for pasted channels
+        new_channels = []
+        for channel in self.clipboard:
             new_channel = channel.copy()
             new_channel['uuid'] = str(uuid.uuid4())
-            self.channels.insert(insert_index + i, new_channel)
+            new_channels.append(new_channel)
         
-        # Update undo stack
-        self.undo_manager.save_state({
-            'type': 'paste',
-            'old_channels': old_channels,
-            'new_channels': self.channels.copy()
-        }, "Paste channels")
+        # Insert channels and update undo stack
+        editor = ListEditor(self.channels)
+        editor.insert(insert_index, new_channels)
+        self.undo_manager.record_edits(editor.edits, "Paste channels", 'paste')
         
         self.refresh_display()
         self.update_status(f"Pasted {len(self.clipboard)} channel(s)")
@@ -1050,20 +1104,14 @@ Sample Details:
             return
         
         if messagebox.askyesno("Delete Channels", f"Delete {len(selected)} channel(s)?"):
-            # Track for undo
-            old_channels = self.channels.copy()
-            
             # Delete in reverse order to maintain indices
+            editor = ListEditor(self.channels)
             indices = sorted([self.tv.index(item) for item in selected], reverse=True)
             for idx in indices:
-                del self.channels[idx]
+                editor.delete(idx)
             
             # Update undo stack
-            self.undo_manager.save_state({
-                'type': 'delete',
-                'old_channels': old_channels,
-                'new_channels': self.channels.copy()
-            }, "Delete channels")
+            self.undo_manager.record_edits(editor.edits, "Delete channels", 'delete')
             
             self.refresh_display()
             self.update_status(f"Deleted {len(indices)} channel(s)")
@@ -1074,23 +1122,17 @@ Sample Details:
         if not selected:
             return
         
-        # Track for undo
-        old_channels = self.channels.copy()
-        
         # Duplicate channels
+        editor = ListEditor(self.channels)
         indices = [self.tv.index(item) for item in selected]
         for idx in sorted(indices, reverse=True):
             new_channel = self.channels[idx].copy()
             new_channel['uuid'] = str(uuid.uuid4())
             new_channel['name'] = f"{new_channel.get('name', '')} (Copy)"
-            self.channels.insert(idx + 1, new_channel)
+            editor.insert(idx + 1, [new_channel])
         
         # Update undo stack
-        self.undo_manager.save_state({
-            'type': 'duplicate',
-            'old_channels': old_channels,
-            'new_channels': self.channels.copy()
-        }, "Duplicate channels")
+        self.undo_manager.record_edits(editor.edits, "Duplicate channels", 'duplicate')
         
         self.refresh_display()
         self.update_status(f"Duplicated {len(indices)} channel(s)")
@@ -1130,22 +1172,18 @@ Sample Details:
         
         # Save button
         def save_changes():
-            # Track for undo
-            old_channels = self.channels.copy()
-            
-            # Update channel
-            self.channels[idx]['name'] = entries['Name'].get()
-            self.channels[idx]['group'] = entries['Group'].get()
-            self.channels[idx]['url'] = entries['URL'].get()
-            self.channels[idx]['logo'] = entries['Logo'].get()
-            self.channels[idx]['tvg_id'] = entries['TVG ID'].get()
+            # Update a copy of the channel so history keeps the original
+            updated = self.channels[idx].copy()
+            updated['name'] = entries['Name'].get()
+            updated['group'] = entries['Group'].get()
+            updated['url'] = entries['URL'].get()
+            updated['logo'] = entries['Logo'].get()
+            updated['tvg_id'] = entries['TVG ID'].get()
             
-            # Update undo stack
-            self.undo_manager.save_state({
-                'type': 'edit',
-                'old_channels': old_channels,
-                'new_channels': self.channels.copy()
-            }, "Edit channel")
+            # Replace channel and update undo stack
+            editor = ListEditor(self.channels)
+            editor.replace(idx, [updated])
+            self.undo_manager.record_edits(editor.edits, "Edit channel", 'edit')
             
             self.refresh_display()
             dialog.destroy()
@@ -1173,17 +1211,15 @@ Sample Details:
 
     def undo(self):
         """Undo last action"""
-        action = self.undo_manager.undo()
+        action = self.undo_manager.undo(self.channels)
         if action:
-            self.channels = action['old_channels'].copy()
             self.refresh_display()
             self.update_status(f"Undone: {action['type']}")
 
     def redo(self):
         """Redo last undone action"""
-        action = self.undo_manager.redo()
+        action = self.undo_manager.redo(self.channels)
         if action:
-            self.channels = action['new_channels'].copy()
             self.refresh_display()
             self.update_status(f"Redone: {action['type']}")
 
@@ -1255,6 +1291,7 @@ Sample Details:
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     try:
         app = M3UMatrix()
         app.root.protocol("WM_DELETE_WINDOW", app.safe_exit)
@@ -10,6 +10,7 @@ from datetime import datetime, timedelta, time
 import json
 import sys
 import os
+import threading
 from pathlib import Path
 
 # Add parent directory to path for imports
@@ -968,16 +969,35 @@ class TVScheduleCenter:
         self.update_grid_content()
     
     def import_folder(self):
-        """Import folder of media files"""
+        """Import folder of media files (probed in a worker thread)"""
         folder = filedialog.askdirectory(title="Select folder with media files")
         if not folder:
             return
         
-        scheduler = AutoScheduler()
-        result = scheduler.import_folder(folder, 
-                                        channel_name=Path(folder).name,
-                                        channel_group="Auto Imported")
-        
+        name = Path(folder).name
+        self.update_status(f"Importing {name}...")
+        
+        def report(probed, total):
+            # About 100 status updates per import, however many files
+            if probed == total or probed % max(total // 100, 1) == 0:
+                self.root.after(0, lambda: self.update_status(f"Importing {name}: probed {probed}/{total} files"))
+        
+        def import_thread():
+            try:
+                scheduler = AutoScheduler()
+                result = scheduler.import_folder(folder,
+                                                channel_name=name,
+                                                channel_group="Auto Imported",
+                                                progress=report)
+            except Exception as e:
+                result = {'success': False, 'message': str(e), 'shows_imported': 0}
+            self.root.after(0, lambda: self.finish_import(folder, result))
+        
+        thread = threading.Thread(target=import_thread, daemon=True)
+        thread.start()
+    
+    def finish_import(self, folder, result):
+        """Show the result of import_folder (Tk thread)"""
         if result['success']:
             self.load_channels()
             messagebox.showinfo("Import Complete", 
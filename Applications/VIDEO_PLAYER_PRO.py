@@ -35,6 +35,14 @@ except ImportError:
     NDI_AVAILABLE = False
     print("INFO: NDI output module not available.")
 
+# Cached ffprobe results, shared with the schedule generators
+try:
+    sys.path.insert(0, str(Path(__file__).parent.parent / "Core_Modules"))
+    from media_probe import get_media_probe
+    MEDIA_PROBE_AVAILABLE = True
+except ImportError:
+    MEDIA_PROBE_AVAILABLE = False
+
 class VideoPlayerWorkbench(tk.Toplevel):
     def __init__(self, parent):
         super().__init__(parent)
@@ -685,6 +693,15 @@ class VideoPlayerWorkbench(tk.Toplevel):
     
     def add_videos_to_playlist(self, files):
         total = len(files)
+        
+        # Probe local files concurrently up front; the loop below then reads the cache
+        if MEDIA_PROBE_AVAILABLE:
+            self.after(0, lambda: self.status_label.config(text=f"Probing {total} files..."))
+            try:
+                get_media_probe().probe_many(files)
+            except Exception as e:
+                print(f"Media probe failed: {e}")
+        
         for idx, filepath in enumerate(files, 1):
             # Update status
             filename = os.path.basename(filepath)
@@ -729,28 +746,16 @@ class VideoPlayerWorkbench(tk.Toplevel):
                     'is_youtube': is_youtube
                 }
             
-            # Local file - try ffprobe first, then fallback to basic metadata
+            # Local file - try ffprobe first (cached per file), then fallback to basic metadata
             try:
-                cmd = [
-                    'ffprobe',
-                    '-v', 'quiet',
-                    '-print_format', 'json',
-                    '-show_format',
-                    '-show_streams',
-                    filepath
-                ]
-                
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+                info = get_media_probe().probe(filepath) if MEDIA_PROBE_AVAILABLE else None
                 
-                if result.returncode == 0 and result.stdout:
-                    data = json.loads(result.stdout)
-                    
-                    duration = float(data.get('format', {}).get('duration', 0))
+                if info and not info.get('error'):
+                    duration = info.get('duration') or 0
                     
-                    video_stream = next((s for s in data.get('streams', []) if s['codec_type'] == 'video'), {})
-                    width = video_stream.get('width', 0)
-                    height = video_stream.get('height', 0)
-                    codec = video_stream.get('codec_name', 'unknown')
+                    width = info.get('width', 0)
+                    height = info.get('height', 0)
+                    codec = info.get('video_codec') or 'unknown'
                     
                     title = Path(filepath).stem
                     
@@ -0,0 +1,159 @@
+"""
+Asset Bundle
+Shared, content-hashed JS libraries for generated pages. Instead of inlining
+hls.js/dash.js into every page, each library is written once to
+generated_pages/assets/ and pages reference it by relative path; a small
+service worker at the pages root precaches the assets.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+from file_utils import write_atomic
+from template_engine import read_cached, record_dependency
+
+ASSET_MODES = ('inline', 'external')
+ASSETS_DIRNAME = "assets"
+SERVICE_WORKER_NAME = "asset-sw.js"
+
+SERVICE_WORKER_TEMPLATE = """// Generated by M3U Matrix - precaches the shared player libraries
+const CACHE_NAME = 'player-assets-__VERSION__';
+const ASSETS = __ASSETS__;
+
+self.addEventListener('install', event => {
+    event.waitUntil(caches.open(CACHE_NAME).then(cache => cache.addAll(ASSETS)));
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys().then(names => Promise.all(
+            names.filter(name => name.startsWith('player-assets-') && name !== CACHE_NAME)
+                 .map(name => caches.delete(name))
+        ))
+    );
+});
+
+// Asset names are content-hashed, so a cached copy never goes stale
+self.addEventListener('fetch', event => {
+    if (!event.request.url.includes('/__ASSETS_DIR__/')) {
+        return;
+    }
+    event.respondWith(
+        caches.match(event.request).then(cached => cached || fetch(event.request))
+    );
+});
+"""
+
+
+class AssetBundle:
+    """
+    Publishes library files into <pages_dir>/assets/<name>.<hash><ext>
+    """
+    
+    def __init__(self, pages_dir: Path):
+        """
+        Initialize the bundle
+        
+        Args:
+            pages_dir: Root of the generated site (parent of the per-generator folders)
+        """
+        self.pages_dir = Path(pages_dir)
+        self.assets_dir = self.pages_dir / ASSETS_DIRNAME
+        self.service_worker_path = self.pages_dir / SERVICE_WORKER_NAME
+        self.published: Dict[Tuple[str, str], Path] = {}  # (source, content hash) -> asset
+        self.lock = threading.Lock()
+    
+    def publish(self, source: Path) -> Path:
+        """
+        Make sure a library is in the assets directory
+        
+        Args:
+            source: Library file
+        
+        Returns:
+            Path of the content-hashed asset
+        """
+        source = Path(source)
+        text = read_cached(source)
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]
+        
+        with self.lock:
+            asset = self.published.get((str(source), digest))
+            if asset is not None and asset.exists():
+                record_dependency(asset)
+                return asset
+            
+            name = source.name
+            stem, ext = (name[:-len(source.suffix)], source.suffix) if source.suffix else (name, "")
+            asset = self.assets_dir / f"{stem}.{digest}{ext}"
+            if not asset.exists():
+                self.assets_dir.mkdir(parents=True, exist_ok=True)
+                write_atomic(asset, text)
+                self._write_service_worker()
+            elif not self.service_worker_path.exists():
+                self._write_service_worker()
+            self.published[(str(source), digest)] = asset
+        # Pages that reference the asset are stale if it goes missing
+        record_dependency(asset)
+        return asset
+    
+    def script_tags(self, sources: Iterable[Path], page_dir: Path, register_worker: bool = True) -> str:
+        """
+        <script src> tags for libraries, relative to a page's directory
+        
+        Args:
+            sources: Library files, in load order
+            page_dir: Directory of the page that will contain the tags
+            register_worker: Also register the precaching service worker
+        
+        Returns:
+            HTML
+        """
+        tags = [f'<script src="{self.relative_url(self.publish(source), page_dir)}"></script>'
+                for source in sources]
+        if register_worker:
+            worker_url = self.relative_url(self.service_worker_path, page_dir)
+            tags.append("<script>if ('serviceWorker' in navigator && location.protocol.startsWith('http')) "
+                        f"navigator.serviceWorker.register('{worker_url}');</script>")
+        return "\n".join(tags)
+    
+    def relative_url(self, path: Path, page_dir: Path) -> str:
+        """URL of path as seen from a page in page_dir"""
+        return os.path.relpath(path, page_dir).replace(os.sep, '/')
+    
+    def _write_service_worker(self) -> None:
+        """(Re)write the service worker with every published asset"""
+        assets = sorted(p for p in self.assets_dir.iterdir() if p.is_file() and not p.name.startswith('.'))
+        urls = [f"{ASSETS_DIRNAME}/{p.name}" for p in assets]
+        version = hashlib.sha256("\n".join(urls).encode('utf-8')).hexdigest()[:12]
+        script = (SERVICE_WORKER_TEMPLATE
+                  .replace('__VERSION__', version)
+                  .replace('__ASSETS__', json.dumps(urls, indent=4))
+                  .replace('__ASSETS_DIR__', ASSETS_DIRNAME))
+        write_atomic(self.service_worker_path, script)
+
+
+def inline_script_break(tags: str) -> str:
+    """
+    Replacement for a library placeholder that sits inside an inline <script>:
+    closes that script, loads the external tags, and reopens it
+    """
+    return f"</script>\n{tags}\n<script>"
+
+
+_bundles: Dict[str, AssetBundle] = {}
+_bundles_lock = threading.Lock()
+
+
+def get_asset_bundle(pages_dir: Path) -> AssetBundle:
+    """Shared bundle for a generated site"""
+    key = str(Path(pages_dir).resolve())
+    with _bundles_lock:
+        bundle = _bundles.get(key)
+        if bundle is None:
+            bundle = _bundles[key] = AssetBundle(Path(pages_dir))
+        return bundle
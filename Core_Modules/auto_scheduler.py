@@ -4,11 +4,14 @@ Handles auto-building schedules from folders/M3U files with flexible time slots
 """
 
 import os
-import json
+from itertools import repeat
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, List, Dict, Optional, Tuple
+import numpy as np
 from Core_Modules.tv_schedule_db import TVScheduleDB
+from Core_Modules.epg_snapshot import EPGSnapshotBuilder
+from Core_Modules.media_probe import get_media_probe
 import re
 
 
@@ -20,16 +23,22 @@ class AutoScheduler:
     def __init__(self, db_path: str = "tv_schedules.db"):
         """Initialize auto-scheduler"""
         self.db = TVScheduleDB(db_path)
+        self.snapshots = EPGSnapshotBuilder(self.db)
     
     def import_folder(self, folder_path: str, channel_name: str, 
-                     channel_group: str = "Auto Imported") -> Dict:
+                     channel_group: str = "Auto Imported",
+                     progress: Optional[Callable[[int, int], None]] = None) -> Dict:
         """
-        Import all media files from a folder as shows
+        Import all media files from a folder (recursively) as shows
+        
+        Durations are probed concurrently through the shared ffprobe cache and
+        all shows are inserted in one transaction.
         
         Args:
             folder_path: Path to folder containing media files
             channel_name: Name for the channel
             channel_group: Group for the channel
+            progress: Called as progress(probed, total) while probing
         
         Returns:
             Dict with import results
@@ -46,33 +55,40 @@ class AutoScheduler:
         if not channel_id:
             return {'success': False, 'message': 'Failed to create channel', 'shows_imported': 0}
         
-        shows_imported = 0
+        # Get all media files (one walk of the tree)
         files = []
+        for root, _, filenames in os.walk(folder):
+            for filename in filenames:
+                if os.path.splitext(filename)[1].lower() in self.VIDEO_EXTENSIONS:
+                    files.append(Path(root) / filename)
+        files.sort()
         
-        # Get all media files
-        for ext in self.VIDEO_EXTENSIONS:
-            files.extend(folder.glob(f"*{ext}"))
-            files.extend(folder.glob(f"**/*{ext}"))  # Recursive
-        
-        # Remove duplicates and sort
-        files = sorted(set(files))
+        probes = get_media_probe().probe_many(files, progress=progress)
         
+        shows = []
         for file_path in files:
-            try:
-                duration = self._get_file_duration(file_path)
-                if duration <= 0:
-                    duration = 45  # Default to 45 minutes
-                
-                show_id = self.db.add_show(
-                    channel_id=channel_id,
-                    name=file_path.stem,
-                    duration_minutes=duration,
-                    description=f"From {file_path.parent.name}",
-                    metadata={"file_path": str(file_path)}
-                )
-                shows_imported += 1
-            except Exception as e:
-                print(f"Error importing {file_path}: {e}")
+            info = probes.get(str(file_path))
+            seconds = info.get('duration') if info else None
+            duration = self._minutes(seconds)
+            if duration <= 0:
+                duration = 45  # Default to 45 minutes
+            
+            metadata = {"file_path": str(file_path)}
+            if seconds:
+                metadata["duration_seconds"] = seconds
+            shows.append({
+                'channel_id': channel_id,
+                'name': file_path.stem,
+                'duration_minutes': duration,
+                'description': f"From {file_path.parent.name}",
+                'metadata': metadata
+            })
+        
+        try:
+            shows_imported = len(self.db.add_shows(shows))
+        except Exception as e:
+            print(f"Error importing shows from {folder_path}: {e}")
+            return {'success': False, 'message': f'Error importing shows: {e}', 'shows_imported': 0}
         
         return {
             'success': True,
@@ -196,41 +212,15 @@ class AutoScheduler:
             shows = shows.copy()
             random.shuffle(shows)
         
-        # Build schedule
-        current_time = start_dt
-        shows_scheduled = 0
+        # Build schedule: the (shuffled) show order repeats until the window is full
+        show_idx, starts, ends = self._plan_slots(
+            [show.get('duration_minutes') or 45 for show in shows], start_dt, end_dt, slot_mode)
         
-        # Create infinite show list by repeating
-        show_cycle = shows * (num_days + 1)  # Ensure enough shows
-        show_idx = 0
-        
-        while current_time < end_dt:
-            if show_idx >= len(show_cycle):
-                break
-            
-            show = show_cycle[show_idx]
-            show_duration = show.get('duration_minutes', 45)
-            
-            # Calculate end time
-            slot_end = current_time + timedelta(minutes=show_duration)
-            
-            # Ensure it doesn't go past end date
-            if slot_end > end_dt:
-                break
-            
-            # Add to schedule
-            self.db.add_time_slot(
-                schedule_id=schedule_id,
-                channel_id=channel_id,
-                show_id=show['show_id'],
-                start_time=current_time.strftime("%Y-%m-%d %H:%M:%S"),
-                end_time=slot_end.strftime("%Y-%m-%d %H:%M:%S"),
-                is_repeat=True
-            )
-            
-            shows_scheduled += 1
-            current_time = slot_end
-            show_idx += 1
+        show_ids = np.array([show['show_id'] for show in shows])[show_idx].tolist()
+        shows_scheduled = self.db.add_time_slots(
+            schedule_id,
+            zip(repeat(channel_id), show_ids, starts, ends, repeat(True), repeat(""))
+        )
         
         return {
             'success': True,
@@ -243,6 +233,47 @@ class AutoScheduler:
             'enable_looping': enable_looping
         }
     
+    @staticmethod
+    def _plan_slots(durations: List[int], start_dt: datetime, end_dt: datetime,
+                    slot_mode: str = "exact_duration") -> Tuple[np.ndarray, List[str], List[str]]:
+        """
+        Lay shows back to back from start_dt, cycling through durations, until
+        the next show would run past end_dt
+        
+        Slot offsets are cumulative sums over the tiled duration array, and
+        timestamps are formatted in bulk.
+        
+        Args:
+            durations: Show durations in minutes, in play order
+            start_dt: Schedule start
+            end_dt: Schedule end
+            slot_mode: "exact_duration", or "grid_30min" to round each slot up to 30 minutes
+        
+        Returns:
+            (index into durations per slot, start times, end times) with times
+            as "YYYY-MM-DD HH:MM:SS"
+        """
+        minutes = np.maximum(np.asarray(durations, dtype=np.int64), 1)
+        if slot_mode == "grid_30min":
+            minutes = -(-minutes // 30) * 30
+        
+        window = int((end_dt - start_dt).total_seconds() // 60)
+        cycles = window // int(minutes.sum()) + 1
+        tiled = np.tile(minutes, cycles)
+        
+        slot_ends = np.cumsum(tiled)
+        count = int(np.searchsorted(slot_ends, window, side='right'))
+        slot_ends = slot_ends[:count]
+        slot_starts = slot_ends - tiled[:count]
+        
+        base = np.datetime64(start_dt.replace(microsecond=0), 's')
+        
+        def timestamps(offsets):
+            stamps = np.datetime_as_string(base + offsets.astype('timedelta64[m]'), unit='s')
+            return [stamp.replace('T', ' ') for stamp in stamps.tolist()]
+        
+        return np.arange(count) % len(minutes), timestamps(slot_starts), timestamps(slot_ends)
+    
     def rebuild_schedule(self, schedule_id: int) -> Dict:
         """
         Rebuild schedule by refreshing show durations
@@ -289,101 +320,81 @@ class AutoScheduler:
         """
         Export schedule as Web EPG JSON with ISO timestamps
         
+        The export is stitched from the incremental per-channel, per-day
+        snapshot fragments, so only days edited since the last export are rebuilt.
+        
         Args:
             schedule_id: Schedule to export
-            output_path: Optional output file path
+            output_path: Optional output file path (written incrementally)
         
         Returns:
-            Dict with EPG data or file path
+            Dict with EPG data (when no output_path) or file path
         """
         # Get schedule details
-        schedules = self.db.get_schedules()
-        schedule = next((s for s in schedules if s['schedule_id'] == schedule_id), None)
+        schedule = self.db.get_schedule(schedule_id)
         
         if not schedule:
             return {'success': False, 'message': 'Schedule not found'}
         
-        # Get all time slots
-        slots = self.db.get_time_slots(schedule_id)
+        # Rebuild only the fragments touched since the last export
+        self.snapshots.update(schedule_id)
         
-        # Build EPG JSON structure
-        epg_data = {
-            "schedule": {
-                "id": schedule_id,
-                "name": schedule.get('name', 'Untitled'),
-                "start_date": schedule.get('start_date'),
-                "end_date": schedule.get('end_date'),
-                "enable_looping": schedule.get('enable_looping', False),
-                "generated_at": datetime.now().isoformat()
-            },
-            "channels": {},
-            "programs": []
+        schedule_info = {
+            "id": schedule_id,
+            "name": schedule.get('name', 'Untitled'),
+            "start_date": schedule.get('start_date'),
+            "end_date": schedule.get('end_date'),
+            "enable_looping": bool(schedule.get('enable_looping', False)),
+            "generated_at": datetime.now().isoformat()
         }
         
-        # Group slots by channel
-        for slot in slots:
-            channel_id = slot['channel_id']
-            
-            # Get channel info
-            if channel_id not in epg_data['channels']:
-                channels = self.db.get_channels()
-                channel = next((c for c in channels if c['channel_id'] == channel_id), None)
-                if channel:
-                    epg_data['channels'][str(channel_id)] = {
-                        "id": channel_id,
-                        "name": channel.get('name'),
-                        "description": channel.get('description'),
-                        "group": channel.get('channel_group')
-                    }
-            
-            # Get show info
-            show_id = slot.get('show_id')
-            show_name = "Unknown"
-            if show_id:
-                all_shows = self.db.get_shows()
-                show = next((s for s in all_shows if s['show_id'] == show_id), None)
-                if show:
-                    show_name = show.get('name')
-            
-            # Add program
-            epg_data['programs'].append({
-                "id": slot['slot_id'],
-                "channel_id": channel_id,
-                "show_id": show_id,
-                "show_name": show_name,
-                "start": datetime.strptime(slot['start_time'], "%Y-%m-%d %H:%M:%S").isoformat(),
-                "end": datetime.strptime(slot['end_time'], "%Y-%m-%d %H:%M:%S").isoformat(),
-                "duration_minutes": self._calculate_duration(slot['start_time'], slot['end_time']),
-                "is_repeat": slot.get('is_repeat', 0)
-            })
+        # Channel info for every channel with scheduled programs
+        all_channels = {c['channel_id']: c for c in self.db.get_channels()}
+        channels = {}
+        for channel_id in self.snapshots.channel_ids(schedule_id):
+            channel = all_channels.get(channel_id)
+            if channel:
+                channels[str(channel_id)] = {
+                    "id": channel_id,
+                    "name": channel.get('name'),
+                    "description": channel.get('description'),
+                    "group": channel.get('channel_group')
+                }
         
         epg_json = {
             'success': True,
-            'message': f'Exported {len(epg_data["programs"])} programs',
-            'schedule_id': schedule_id,
-            'epg_data': epg_data,
-            'program_count': len(epg_data['programs'])
+            'schedule_id': schedule_id
         }
         
         # Save to file if path provided
         if output_path:
             try:
                 with open(output_path, 'w', encoding='utf-8') as f:
-                    json.dump(epg_data, f, indent=2)
+                    program_count = self.snapshots.write_export(schedule_id, schedule_info, channels, f)
                 epg_json['file_path'] = output_path
             except Exception as e:
-                epg_json['error'] = str(e)
+                return {'success': False, 'message': f'Error writing EPG: {e}', 'schedule_id': schedule_id}
         else:
+            epg_data = self.snapshots.stitch(schedule_id, schedule_info, channels)
+            program_count = len(epg_data['programs'])
+            epg_json['epg_data'] = epg_data
             epg_json['file_path'] = ""
         
+        epg_json['message'] = f'Exported {program_count} programs'
+        epg_json['program_count'] = program_count
         return epg_json
     
     @staticmethod
     def _get_file_duration(file_path: Path) -> int:
-        """Get media file duration in minutes (stub - would use FFprobe)"""
-        # For now, return default duration
-        # In production, use FFprobe to extract real duration
-        return 45
+        """Get media file duration in minutes via the shared ffprobe cache (0 if unknown)"""
+        return AutoScheduler._minutes(get_media_probe().duration(file_path))
+    
+    @staticmethod
+    def _minutes(seconds: Optional[float]) -> int:
+        """Whole minutes (at least 1) for a probed duration, 0 if unknown"""
+        if not seconds:
+            return 0
+        return max(1, round(seconds / 60))
     
     @staticmethod
     def _parse_extinf(extinf_line: str) -> int:
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Batch Page Generator
+Generates many player pages (any page_generator generator x many playlists)
+in a process pool, with per-job timing
+"""
+
+import os
+import time
+import inspect
+import logging
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import asset_bundle
+import data_shards
+import page_generator
+import template_engine
+from build_manifest import MANIFEST_NAME, BuildManifest, content_key, file_signature
+from parsers import m3u_stream
+from template_engine import track_dependencies
+
+logger = logging.getLogger(__name__)
+
+# Short names for the generators that take M3U content -> class in page_generator
+GENERATORS = {
+    'nexus_tv': 'NexusTVPageGenerator',
+    'web_iptv': 'WebIPTVGenerator',
+    'simple': 'SimplePlayerGenerator',
+    'buffer_tv': 'BufferTVGenerator',
+    'classic_tv': 'ClassicTVGenerator',
+    'stream_hub': 'StreamHubGenerator',
+}
+
+# Generators whose generate_page() takes asset_mode ('inline' or 'external' JS libraries)
+ASSET_MODE_GENERATORS = {'nexus_tv', 'buffer_tv', 'classic_tv'}
+
+# Generators whose generate_page() takes data_mode ('inline' or 'sharded' channel data)
+DATA_MODE_GENERATORS = {'nexus_tv'}
+
+# Modules besides the generator's own whose code shapes every page
+PAGE_CODE_MODULES = (m3u_stream, template_engine, asset_bundle, data_shards)
+
+
+class PageJob:
+    """
+    One page to generate: generator.generate_page(content, name, **options)
+    
+    generator is a page_generator class, its class name, or a GENERATORS
+    short name; content is M3U text (or a channel list for the Rumble and
+    Multi-Channel generators).
+    """
+    
+    def __init__(self, generator, content, name: str, options: Optional[Dict[str, Any]] = None,
+                 template_path: Optional[str] = None):
+        self.generator = GENERATORS.get(generator, generator)
+        self.content = content
+        self.name = name
+        self.options = options or {}
+        self.template_path = template_path
+    
+    @property
+    def generator_name(self) -> str:
+        return self.generator if isinstance(self.generator, str) else self.generator.__name__
+    
+    @property
+    def target(self) -> str:
+        """Build manifest entry for this job's output"""
+        return f"{self.generator_name}|{self.name}|{self.template_path or ''}"
+    
+    @property
+    def key(self) -> str:
+        """Hash of the job's inputs"""
+        return content_key(self.generator_name, self.content, self.options)
+
+
+# Generator instances per worker process, reused across jobs
+_generators: Dict[tuple, Any] = {}
+
+
+def _get_generator(generator, template_path: Optional[str]):
+    key = (generator, template_path)
+    instance = _generators.get(key)
+    if instance is None:
+        generator_class = getattr(page_generator, generator) if isinstance(generator, str) else generator
+        instance = _generators[key] = generator_class(template_path)
+    return instance
+
+
+def run_job(job: PageJob) -> Dict[str, Any]:
+    """
+    Generate one page
+    
+    Returns:
+        {'generator', 'name', 'output', 'error', 'skipped', 'seconds', 'deps', 'copies'}
+        where deps maps the files the page was built from to their signatures
+        and copies lists the side files copied next to the page
+    """
+    start = time.perf_counter()
+    result = {'generator': job.generator_name, 'name': job.name, 'output': None, 'error': None,
+              'skipped': False, 'deps': {}, 'copies': []}
+    try:
+        generator = _get_generator(job.generator, job.template_path)
+        with track_dependencies(result['copies']) as deps:
+            output = generator.generate_page(job.content, job.name, **job.options)
+        sources = [inspect.getsourcefile(type(generator))]
+        sources += [inspect.getsourcefile(module) for module in PAGE_CODE_MODULES]
+        for source in sources:
+            deps[source] = file_signature(source)
+        result['deps'] = deps
+        if isinstance(output, tuple):  # ClassicTVGenerator returns (path, channel_count)
+            output = output[0]
+        if output is None:
+            raise RuntimeError("generator produced no page")
+        result['output'] = str(output)
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def generate_pages(jobs: Iterable[PageJob], workers: Optional[int] = None,
+                   progress: Optional[Callable[[int, int, Dict], None]] = None,
+                   incremental: bool = True) -> Dict[str, Any]:
+    """
+    Generate pages in parallel
+    
+    Args:
+        jobs: Pages to generate
+        workers: Process count (default: CPU count; 1 runs in this process)
+        progress: Called as progress(done, total, job_result) as jobs finish
+        incremental: Skip pages whose playlist, options, template, libraries
+            and generator code are unchanged since the last build (tracked in
+            a build manifest in each generator's output directory)
+    
+    Returns:
+        {'results': per-job results in job order, 'succeeded', 'skipped', 'failed', 'seconds'}
+    """
+    jobs = list(jobs)
+    results: List[Optional[Dict]] = [None] * len(jobs)
+    start = time.perf_counter()
+    done = 0
+    
+    manifests: Dict[str, BuildManifest] = {}
+    job_manifests: List[Optional[BuildManifest]] = [None] * len(jobs)
+    if incremental:
+        for i, job in enumerate(jobs):
+            try:
+                output_dir = str(_get_generator(job.generator, job.template_path).output_dir)
+            except Exception:
+                continue  # reported when the job runs
+            if output_dir not in manifests:
+                manifests[output_dir] = BuildManifest(Path(output_dir) / MANIFEST_NAME)
+            manifest = job_manifests[i] = manifests[output_dir]
+            
+            output = manifest.fresh_output(job.target, job.key)
+            if output:
+                results[i] = {'generator': job.generator_name, 'name': job.name, 'output': output,
+                              'error': None, 'skipped': True, 'seconds': 0.0}
+                done += 1
+                if progress:
+                    progress(done, len(jobs), results[i])
+    
+    pending = [i for i, result in enumerate(results) if result is None]
+    workers = min(workers or os.cpu_count() or 1, max(1, len(pending)))
+    
+    def finish(i: int, result: Dict) -> None:
+        nonlocal done
+        deps = result.pop('deps', {})
+        copies = result.pop('copies', [])
+        manifest = job_manifests[i]
+        if manifest is not None:
+            if result['error']:
+                manifest.forget(jobs[i].target)
+            else:
+                manifest.record(jobs[i].target, jobs[i].key, result['output'], deps, copies)
+        results[i] = result
+        done += 1
+        if progress:
+            progress(done, len(jobs), result)
+    
+    if workers == 1:
+        for i in pending:
+            finish(i, run_job(jobs[i]))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(run_job, jobs[i]): i for i in pending}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:  # worker died or job didn't pickle
+                    result = {'generator': jobs[i].generator_name, 'name': jobs[i].name, 'output': None,
+                              'error': f"{type(e).__name__}: {e}", 'skipped': False, 'seconds': 0.0}
+                finish(i, result)
+    
+    for manifest in manifests.values():
+        manifest.save()
+    
+    failed = [r for r in results if r['error']]
+    for r in failed:
+        logger.warning(f"{r['generator']} failed for {r['name']}: {r['error']}")
+    skipped = sum(1 for r in results if r['skipped'])
+    return {
+        'results': results,
+        'succeeded': len(results) - len(failed) - skipped,
+        'skipped': skipped,
+        'failed': len(failed),
+        'seconds': round(time.perf_counter() - start, 3)
+    }
+
+
+def jobs_for_playlists(m3u_files: Iterable[str], generators: Iterable[str],
+                       asset_mode: Optional[str] = None, data_mode: Optional[str] = None) -> List[PageJob]:
+    """
+    One job per (playlist, generator), named after the playlist file
+    
+    asset_mode ('inline' or 'external') and data_mode ('inline' or 'sharded')
+    are passed to the generators that support them
+    """
+    generators = list(generators)
+    jobs = []
+    for m3u_file in m3u_files:
+        path = Path(m3u_file)
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+        name = path.stem.replace('_', ' ').title()
+        for generator in generators:
+            options = {}
+            if asset_mode and generator in ASSET_MODE_GENERATORS:
+                options['asset_mode'] = asset_mode
+            if data_mode and generator in DATA_MODE_GENERATORS:
+                options['data_mode'] = data_mode
+            jobs.append(PageJob(generator, content, name, options))
+    return jobs
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Generate player pages for many playlists in parallel")
+    parser.add_argument('playlists', nargs='+', help='M3U files')
+    parser.add_argument('--generators', '-g', default=','.join(GENERATORS),
+                        help=f"Comma-separated generators ({', '.join(GENERATORS)})")
+    parser.add_argument('--workers', '-w', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--force', '-f', action='store_true', help='Regenerate unchanged pages too')
+    parser.add_argument('--assets', choices=('inline', 'external'),
+                        help="Embed JS libraries in each page (inline) or share them from assets/ (external)")
+    parser.add_argument('--data', choices=('inline', 'sharded'),
+                        help="Embed all channel data (inline) or split it into lazily loaded shards (sharded)")
+    
+    args = parser.parse_args()
+    
+    batch = generate_pages(jobs_for_playlists(args.playlists, args.generators.split(','), args.assets, args.data),
+                           workers=args.workers, incremental=not args.force)
+    for r in batch['results']:
+        status = r['output'] if not r['error'] else f"❌ {r['error']}"
+        if r['skipped']:
+            status = f"(unchanged) {status}"
+        print(f"{r['seconds']:8.3f}s  {r['generator']:<24} {r['name']:<30} {status}")
+    print(f"✅ {batch['succeeded']} generated, {batch['skipped']} unchanged, "
+          f"{batch['failed']} failed in {batch['seconds']}s")
@@ -0,0 +1,108 @@
+"""
+Build Manifest
+Records what each generated output was built from, so unchanged outputs
+can be skipped on the next build
+"""
+
+import os
+import json
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from file_utils import write_atomic
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = ".build_manifest.json"
+
+
+def file_signature(path) -> Optional[list]:
+    """[mtime_ns, size] of a file, or None if it doesn't exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def content_key(*parts: Any) -> str:
+    """Stable hash of build inputs (strings, lists, dicts...)"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, str):
+            part = json.dumps(part, sort_keys=True, default=str, ensure_ascii=False)
+        digest.update(part.encode('utf-8', errors='surrogatepass'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """
+    JSON manifest of target -> {'key', 'output', 'deps', 'copies'}
+    - key: content_key() of the inputs (playlist, generator, options)
+    - output: the file that was produced
+    - deps: signatures of the files it was built from (templates, libraries, code)
+    - copies: side files copied next to the output (CSS, JS)
+    
+    A target is fresh when its key matches, its output and copies still
+    exist and none of its dependencies changed.
+    """
+    
+    def __init__(self, path):
+        """
+        Initialize the manifest
+        
+        Args:
+            path: Manifest file (created on save)
+        """
+        self.path = Path(path)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.dirty = False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable build manifest {self.path}: {e}")
+    
+    def fresh_output(self, target: str, key: str) -> Optional[str]:
+        """
+        Output of an up-to-date target
+        
+        Returns:
+            The recorded output path, or None if the target must be rebuilt
+        """
+        entry = self.entries.get(target)
+        if not entry or entry.get('key') != key or not entry.get('output'):
+            return None
+        if not os.path.exists(entry['output']):
+            return None
+        for copy in entry.get('copies', ()):
+            if not os.path.exists(copy):
+                return None
+        for dep, signature in entry.get('deps', {}).items():
+            if file_signature(dep) != signature:
+                return None
+        return entry['output']
+    
+    def record(self, target: str, key: str, output: str, deps: Dict[str, list],
+               copies: Iterable[str] = ()) -> None:
+        """Record a successful build of target"""
+        self.entries[target] = {'key': key, 'output': str(output), 'deps': deps, 'copies': sorted(set(copies))}
+        self.dirty = True
+    
+    def forget(self, target: str) -> None:
+        """Drop a target (e.g. after a failed build)"""
+        if self.entries.pop(target, None) is not None:
+            self.dirty = True
+    
+    def save(self) -> None:
+        """Write the manifest if it changed"""
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(self.path, json.dumps(self.entries, indent=1, sort_keys=True))
+        self.dirty = False
@@ -0,0 +1,90 @@
+"""
+Channel Response Formats
+Content negotiation and encoders for channel listings shared by
+redis_api_server.py and dashboard.py: verbose JSON, columnar compact
+JSON, newline-delimited JSON and msgpack
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
+# Field order of the exporter's channel metadata hashes
+CHANNEL_FIELDS = [
+    'id', 'name', 'url', 'logo', 'group', 'tvg_id', 'tvg_name',
+    'duration', 'start_time', 'end_time', 'uuid', 'exported_at'
+]
+
+FORMATS = ('json', 'compact', 'ndjson', 'msgpack')
+
+MEDIA_TYPES = {
+    'json': 'application/json',
+    'compact': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'msgpack': 'application/x-msgpack',
+}
+
+_ACCEPT_FORMATS = {
+    'application/x-msgpack': 'msgpack',
+    'application/msgpack': 'msgpack',
+    'application/vnd.msgpack': 'msgpack',
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonlines': 'ndjson',
+}
+
+
+def negotiate_format(requested: Optional[str], accept: Optional[str]) -> Optional[str]:
+    """
+    Pick a response format from ?format= (preferred) or the Accept header.
+    Returns None for an unknown or unavailable format.
+    """
+    if requested:
+        fmt = requested.lower()
+    else:
+        fmt = 'json'
+        for part in (accept or '').split(','):
+            media_type = part.split(';')[0].strip().lower()
+            if media_type in _ACCEPT_FORMATS:
+                fmt = _ACCEPT_FORMATS[media_type]
+                break
+    
+    if fmt not in FORMATS or (fmt == 'msgpack' and not MSGPACK_AVAILABLE):
+        return None
+    return fmt
+
+
+def compact_channels(channels: List[Dict[str, str]]) -> Dict[str, Any]:
+    """Columnar shape: field names once, one array row per channel (missing fields are null)"""
+    extra = sorted({k for ch in channels for k in ch} - set(CHANNEL_FIELDS))
+    fields = CHANNEL_FIELDS + extra
+    return {
+        "fields": fields,
+        "rows": [[ch.get(f) for f in fields] for ch in channels]
+    }
+
+
+def encode_compact(page: Dict[str, Any]) -> bytes:
+    """Encode a channel page ({"channels": [...], ...}) as compact JSON"""
+    body = dict(page)
+    body.update(compact_channels(body.pop("channels")))
+    return json.dumps(body, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def encode_msgpack(page: Dict[str, Any]) -> bytes:
+    """Encode a channel page as msgpack using the columnar shape"""
+    body = dict(page)
+    body.update(compact_channels(body.pop("channels")))
+    return msgpack.packb(body, use_bin_type=True)
+
+
+def ndjson_lines(channels: Iterable[Dict[str, str]]) -> Iterable[bytes]:
+    """One JSON object per line"""
+    for channel in channels:
+        yield json.dumps(channel, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
@@ -6,7 +6,9 @@ Browser-based interface to view cached channel data
 import redis
 import json
 from datetime import datetime
-from flask import Flask, render_template_string, jsonify, request
+from flask import Flask, Response, render_template_string, jsonify, request, stream_with_context
+from redis_exporter import CHANNEL_INDEX_KEY, GROUP_COUNTS_KEY, GROUP_NAMES_KEY, channel_key
+from channel_formats import MEDIA_TYPES, negotiate_format, encode_compact, encode_msgpack, ndjson_lines
 
 app = Flask(__name__)
 
@@ -345,9 +347,7 @@ DASHBOARD_HTML = """
                 }
                 
                 // Load channels
-                const channelsRes = await fetch('/api/channels');
-                const channelsJson = await channelsRes.json();
-                channelsData = channelsJson.channels || [];
+                channelsData = await loadChannels();
                 displayChannels(channelsData);
                 
                 // Load groups
@@ -369,6 +369,24 @@ DASHBOARD_HTML = """
             }
         }
         
+        async function loadChannels() {
+            // /api/channels is paged; read every page
+            const pageSize = 5000;
+            let channels = [];
+            let total = 0;
+            do {
+                const res = await fetch(`/api/channels?offset=${channels.length}&limit=${pageSize}`);
+                const page = await res.json();
+                const batch = page.channels || [];
+                total = page.total || 0;
+                if (batch.length === 0) {
+                    break;
+                }
+                channels = channels.concat(batch);
+            } while (channels.length < total);
+            return channels;
+        }
+        
         function displayChannels(channels) {
             const container = document.getElementById('channels-list');
             
@@ -590,9 +608,8 @@ def api_stats():
         })
     
     try:
-        # Count channels
-        channel_keys = list(r.scan_iter(match="channel:*:metadata", count=100))
-        channel_count = len(channel_keys)
+        # Count channels from the exporter's index
+        channel_count = r.zcard(CHANNEL_INDEX_KEY)
         
         # Get Redis info
         info = r.info()
@@ -610,25 +627,64 @@ def api_stats():
 
 @app.route('/api/channels')
 def api_channels():
-    """Get all channels"""
+    """Get a page of channels (limit/offset query params; format=json|compact|ndjson|msgpack)"""
+    fmt = negotiate_format(request.args.get('format'), request.headers.get('Accept'))
+    if fmt is None:
+        return jsonify({"error": "Unsupported format", "channels": []}), 406
+    
     r = get_redis()
     if r is None:
         return jsonify({"channels": []})
     
     try:
-        channel_keys = list(r.scan_iter(match="channel:*:metadata", count=100))
-        channels = []
-        
-        for key in channel_keys:
-            channel_data = r.hgetall(key)
-            if channel_data:
-                channels.append(channel_data)
-        
-        return jsonify({"channels": channels})
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        
+        if fmt == 'ndjson':
+            # Streamed in batches; no cap on limit since nothing is buffered
+            limit = request.args.get('limit', type=int)
+            return Response(stream_with_context(stream_channels(r, offset, limit)),
+                            mimetype=MEDIA_TYPES['ndjson'],
+                            headers={"X-Total-Count": str(r.zcard(CHANNEL_INDEX_KEY))})
+        
+        limit = min(request.args.get('limit', 1000, type=int), 5000)
+        channels = fetch_channels(r, r.zrange(CHANNEL_INDEX_KEY, offset, offset + limit - 1))
+        
+        page = {
+            "channels": channels,
+            "total": r.zcard(CHANNEL_INDEX_KEY),
+            "limit": limit,
+            "offset": offset
+        }
+        
+        if fmt == 'compact':
+            return Response(encode_compact(page), mimetype=MEDIA_TYPES['compact'])
+        if fmt == 'msgpack':
+            return Response(encode_msgpack(page), mimetype=MEDIA_TYPES['msgpack'])
+        return jsonify(page)
     except Exception as e:
         return jsonify({"error": str(e), "channels": []})
 
 
+def fetch_channels(r, channel_ids):
+    """Read channel metadata hashes in one pipelined round trip"""
+    pipe = r.pipeline(transaction=False)
+    for channel_id in channel_ids:
+        pipe.hgetall(channel_key(channel_id))
+    return [data for data in pipe.execute() if data]
+
+
+def stream_channels(r, offset, limit=None, batch_size=1000):
+    """Yield NDJSON lines for the channel index, one batch of ids at a time"""
+    position = offset
+    while limit is None or position < offset + limit:
+        count = batch_size if limit is None else min(batch_size, offset + limit - position)
+        channel_ids = r.zrange(CHANNEL_INDEX_KEY, position, position + count - 1)
+        if not channel_ids:
+            break
+        yield from ndjson_lines(fetch_channels(r, channel_ids))
+        position += len(channel_ids)
+
+
 @app.route('/api/groups')
 def api_groups():
     """Get all groups"""
@@ -637,22 +693,14 @@ def api_groups():
         return jsonify({"groups": []})
     
     try:
-        channel_keys = list(r.scan_iter(match="channel:*:metadata", count=100))
-        groups = {}
-        
-        for key in channel_keys:
-            channel_data = r.hgetall(key)
-            group = channel_data.get('group', 'Uncategorized')
-            
-            if group not in groups:
-                groups[group] = {
-                    "name": group,
-                    "channel_count": 0
-                }
-            
-            groups[group]["channel_count"] += 1
-        
-        return jsonify({"groups": list(groups.values())})
+        group_counts = r.hgetall(GROUP_COUNTS_KEY)
+        group_names = r.hgetall(GROUP_NAMES_KEY)
+        groups = sorted((
+            {"name": group_names.get(key, key), "channel_count": int(count)}
+            for key, count in group_counts.items()
+        ), key=lambda group: group["name"].lower())
+        
+        return jsonify({"groups": groups})
     except Exception as e:
         return jsonify({"error": str(e), "groups": []})
 
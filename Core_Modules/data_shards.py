@@ -0,0 +1,126 @@
+"""
+Data Shards
+Splits large embedded page data (channel lists, schedules) into fixed-size
+shard files next to the page. The page embeds the first shard and a small
+index; a loader appends the remaining shards to the same arrays after first
+paint. Shards are JS rather than JSON files so they also load from file://,
+where fetch() is blocked.
+"""
+
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+from file_utils import write_atomic
+from template_engine import record_dependency
+
+DATA_MODES = ('inline', 'sharded')
+DEFAULT_SHARD_SIZE = 1000
+SHARD_DIRNAME = "data"
+
+SHARD_LOADER_TEMPLATE = """<script>
+(function () {
+    // Remaining data shards, appended in order once the page has painted.
+    // Listen for 'pagedata:shard' to refresh views as records arrive.
+    var index = __INDEX__;
+    var data = window.__pageData = window.__pageData || {};
+    window.__pageDataShard = function (name, number, records) {
+        var target = data[name];
+        if (target) {
+            Array.prototype.push.apply(target, records);
+        }
+        document.dispatchEvent(new CustomEvent('pagedata:shard', {
+            detail: {name: name, shard: number, loaded: target ? target.length : 0, total: index[name].total}
+        }));
+    };
+    function load(name, i) {
+        var files = index[name].shards;
+        if (i >= files.length) {
+            return;
+        }
+        var script = document.createElement('script');
+        script.src = files[i];
+        script.onload = function () { load(name, i + 1); };
+        document.body.appendChild(script);
+    }
+    function start() {
+        Object.keys(index).forEach(function (name) { load(name, 0); });
+    }
+    if (document.readyState === 'complete') {
+        setTimeout(start, 0);
+    } else {
+        window.addEventListener('load', start);
+    }
+})();
+</script>"""
+
+
+def shard_json(records: Sequence) -> str:
+    """Compact JSON for embedding in a script"""
+    return json.dumps(list(records), ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+
+
+def data_expression(name: str, records: Sequence) -> str:
+    """
+    JS expression evaluating to the first shard's array, registered as
+    window.__pageData[name] so later shards are appended to the same array
+    """
+    return f"((window.__pageData = window.__pageData || {{}})[{json.dumps(name)}] = {shard_json(records)})"
+
+
+def write_shards(records: Sequence, page_dir: Path, name: str,
+                 shard_size: int = DEFAULT_SHARD_SIZE) -> Tuple[List, Dict]:
+    """
+    Write all but the first shard of records to <page_dir>/data/
+    
+    Shard files are content-hashed (<name>-<n>.<hash>.js); shards left over
+    from a previous, larger build are removed.
+    
+    Args:
+        records: Data to split
+        page_dir: Directory of the page
+        name: Data set name (also the window.__pageData key)
+        shard_size: Records per shard
+    
+    Returns:
+        (records to embed in the page, index entry for shard_loader_script)
+    """
+    if shard_size < 1:
+        raise ValueError("shard_size must be at least 1")
+    
+    shard_dir = Path(page_dir) / SHARD_DIRNAME
+    urls = []
+    written = set()
+    for number, start in enumerate(range(shard_size, len(records), shard_size), 1):
+        script = f"window.__pageDataShard({json.dumps(name)}, {number}, {shard_json(records[start:start + shard_size])});\n"
+        digest = hashlib.sha256(script.encode('utf-8')).hexdigest()[:10]
+        filename = f"{name}-{number:04d}.{digest}.js"
+        path = shard_dir / filename
+        if not path.exists():
+            shard_dir.mkdir(parents=True, exist_ok=True)
+            write_atomic(path, script)
+        # The page is stale if a shard goes missing
+        record_dependency(path)
+        written.add(filename)
+        urls.append(f"{SHARD_DIRNAME}/{filename}")
+    
+    if shard_dir.is_dir():
+        for stale in shard_dir.glob(f"{name}-*.js"):
+            if stale.name not in written:
+                stale.unlink()
+    
+    return list(records[:shard_size]), {'total': len(records), 'shards': urls}
+
+
+def shard_loader_script(index: Dict[str, Dict]) -> str:
+    """
+    <script> that lazily loads the shards written by write_shards
+    
+    Args:
+        index: data set name -> index entry from write_shards
+    """
+    pending = {name: entry for name, entry in index.items() if entry['shards']}
+    if not pending:
+        return ""
+    return SHARD_LOADER_TEMPLATE.replace('__INDEX__', json.dumps(pending, separators=(',', ':')))
@@ -0,0 +1,198 @@
+"""
+EPG Snapshot Builder
+Maintains per-channel, per-day Web EPG JSON fragments on disk and
+rebuilds only the days touched by time slot edits
+"""
+
+import json
+import shutil
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, TextIO
+from Core_Modules.file_utils import write_atomic
+from Core_Modules.tv_schedule_db import TVScheduleDB
+
+
+class EPGSnapshotBuilder:
+    """
+    Incremental Web EPG snapshot store
+    
+    Layout: <snapshot_dir>/<schedule_id>/<channel_id>/<YYYY-MM-DD>.json, each
+    fragment holding the programs that start on that day. TVScheduleDB records
+    touched days in epg_dirty_days as slots change; update() rebuilds just those.
+    """
+    
+    MANIFEST_NAME = "manifest.json"
+    
+    def __init__(self, db: TVScheduleDB, snapshot_dir: Optional[str] = None):
+        """Initialize snapshot builder"""
+        self.db = db
+        if snapshot_dir:
+            self.snapshot_dir = Path(snapshot_dir)
+        else:
+            self.snapshot_dir = self.db.db_path.parent / f"{self.db.db_path.stem}_epg_snapshots"
+    
+    def schedule_dir(self, schedule_id: int) -> Path:
+        """Directory holding a schedule's fragments"""
+        return self.snapshot_dir / str(schedule_id)
+    
+    def fragment_path(self, schedule_id: int, channel_id: int, day: str) -> Path:
+        """Path of one channel/day fragment"""
+        return self.schedule_dir(schedule_id) / str(channel_id) / f"{day}.json"
+    
+    def has_snapshot(self, schedule_id: int) -> bool:
+        """Check whether a schedule has a complete snapshot on disk"""
+        return (self.schedule_dir(schedule_id) / self.MANIFEST_NAME).exists()
+    
+    def build_full(self, schedule_id: int) -> Dict:
+        """Rebuild every fragment of a schedule in a single pass over its slots"""
+        # Clear pending edits first; anything changed during the build is re-marked
+        self.db.pop_dirty_days(schedule_id)
+        
+        schedule_dir = self.schedule_dir(schedule_id)
+        if schedule_dir.exists():
+            shutil.rmtree(schedule_dir)
+        
+        fragments = 0
+        current_key = None
+        programs: List[Dict] = []
+        
+        for slot in self.db.iter_time_slots(schedule_id):
+            key = (slot['channel_id'], slot['start_time'][:10])
+            if key != current_key:
+                if programs:
+                    self._write_fragment(schedule_id, *current_key, programs)
+                    fragments += 1
+                current_key = key
+                programs = []
+            
+            program = self._slot_to_program(slot)
+            if program:
+                programs.append(program)
+        
+        if programs:
+            self._write_fragment(schedule_id, *current_key, programs)
+            fragments += 1
+        
+        self._write_manifest(schedule_id)
+        return {'schedule_id': schedule_id, 'full_rebuild': True, 'fragments_written': fragments}
+    
+    def update(self, schedule_id: int) -> Dict:
+        """Bring a schedule's snapshot up to date, rebuilding only dirty days"""
+        if not self.has_snapshot(schedule_id):
+            return self.build_full(schedule_id)
+        
+        dirty_days = self.db.pop_dirty_days(schedule_id)
+        for channel_id, day in dirty_days:
+            self.rebuild_day(schedule_id, channel_id, day)
+        
+        if dirty_days:
+            self._write_manifest(schedule_id)
+        
+        return {'schedule_id': schedule_id, 'full_rebuild': False, 'fragments_written': len(dirty_days)}
+    
+    def rebuild_day(self, schedule_id: int, channel_id: int, day: str):
+        """Regenerate (or remove) the fragment for one channel and day"""
+        slots = self.db.get_time_slots(schedule_id, channel_id=channel_id, date=day)
+        programs = [p for p in (self._slot_to_program(s) for s in slots) if p]
+        
+        if programs:
+            programs.sort(key=lambda p: p['start'])
+            self._write_fragment(schedule_id, channel_id, day, programs)
+        else:
+            path = self.fragment_path(schedule_id, channel_id, day)
+            if path.exists():
+                path.unlink()
+    
+    def channel_ids(self, schedule_id: int) -> List[int]:
+        """Channels that have at least one fragment in the snapshot"""
+        schedule_dir = self.schedule_dir(schedule_id)
+        if not schedule_dir.exists():
+            return []
+        return sorted(
+            int(d.name) for d in schedule_dir.iterdir()
+            if d.is_dir() and d.name.isdigit() and any(d.glob("*.json"))
+        )
+    
+    def iter_programs(self, schedule_id: int,
+                      channel_names: Optional[Dict[int, str]] = None) -> Iterable[Dict]:
+        """Yield programs from the fragments in (start, channel name) order, one day at a time"""
+        if channel_names is None:
+            channel_names = {c['channel_id']: c.get('name') or "" for c in self.db.get_channels()}
+        
+        days: Dict[str, List[Path]] = {}
+        schedule_dir = self.schedule_dir(schedule_id)
+        if schedule_dir.exists():
+            for channel_dir in schedule_dir.iterdir():
+                if channel_dir.is_dir():
+                    for fragment in channel_dir.glob("*.json"):
+                        days.setdefault(fragment.stem, []).append(fragment)
+        
+        for day in sorted(days):
+            programs = []
+            for fragment in days[day]:
+                with open(fragment, 'r', encoding='utf-8') as f:
+                    programs.extend(json.load(f))
+            programs.sort(key=lambda p: (p['start'], channel_names.get(p['channel_id'], "")))
+            yield from programs
+    
+    def stitch(self, schedule_id: int, schedule_info: Dict, channels: Dict) -> Dict:
+        """Assemble the Web EPG document from the fragments"""
+        channel_names = {int(cid): c.get('name') or "" for cid, c in channels.items()}
+        return {
+            "schedule": schedule_info,
+            "channels": channels,
+            "programs": list(self.iter_programs(schedule_id, channel_names))
+        }
+    
+    def write_export(self, schedule_id: int, schedule_info: Dict, channels: Dict, f: TextIO) -> int:
+        """Stream the Web EPG document to a file object, returning the program count"""
+        channel_names = {int(cid): c.get('name') or "" for cid, c in channels.items()}
+        f.write('{\n  "schedule": %s,\n  "channels": %s,\n  "programs": [' % (
+            json.dumps(schedule_info), json.dumps(channels)))
+        count = 0
+        for program in self.iter_programs(schedule_id, channel_names):
+            f.write(',\n    ' if count else '\n    ')
+            f.write(json.dumps(program))
+            count += 1
+        f.write('\n  ]\n}\n' if count else ']\n}\n')
+        return count
+    
+    def delete_snapshot(self, schedule_id: int):
+        """Remove a schedule's fragments from disk"""
+        schedule_dir = self.schedule_dir(schedule_id)
+        if schedule_dir.exists():
+            shutil.rmtree(schedule_dir)
+    
+    def _write_fragment(self, schedule_id: int, channel_id: int, day: str, programs: List[Dict]):
+        """Atomically write one fragment file"""
+        path = self.fragment_path(schedule_id, channel_id, day)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(path, json.dumps(programs, separators=(',', ':')))
+    
+    def _write_manifest(self, schedule_id: int):
+        """Record when the snapshot was last brought up to date"""
+        path = self.schedule_dir(schedule_id) / self.MANIFEST_NAME
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'schedule_id': schedule_id, 'updated_at': datetime.now().isoformat()}, f)
+    
+    @staticmethod
+    def _slot_to_program(slot: Dict) -> Optional[Dict]:
+        """Convert a time slot row into a Web EPG program entry"""
+        try:
+            start = datetime.strptime(slot['start_time'], "%Y-%m-%d %H:%M:%S")
+            end = datetime.strptime(slot['end_time'], "%Y-%m-%d %H:%M:%S")
+        except (TypeError, ValueError):
+            return None
+        
+        return {
+            "id": slot['slot_id'],
+            "channel_id": slot['channel_id'],
+            "show_id": slot.get('show_id'),
+            "show_name": slot.get('show_name') or "Unknown",
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "duration_minutes": int((end - start).total_seconds() / 60),
+            "is_repeat": slot.get('is_repeat', 0)
+        }
@@ -0,0 +1,37 @@
+"""
+File Utilities
+Atomic file writes shared by the generators, caches and manifests
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Union
+
+
+def write_atomic(path, data: Union[str, bytes]) -> None:
+    """
+    Write a file so readers (browsers, deploy copies, parallel jobs) never
+    see it half-written: the data goes to a temporary file next to it,
+    which then replaces the target
+    
+    Args:
+        path: Target file (its directory must exist)
+        data: Text (written as UTF-8) or bytes
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        if isinstance(data, str):
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+        else:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -5,14 +5,30 @@ Pushes generated pages to Liberty-Express- "Ready Made" folder
 """
 
 import subprocess
+import hashlib
 import json
 import os
 from pathlib import Path
 from datetime import datetime
 import logging
 
+from build_manifest import file_signature
+from file_utils import write_atomic
+
 logger = logging.getLogger(__name__)
 
+# Records what was last copied into Ready Made; it holds machine-local file
+# signatures, so it lives in .git/ rather than in the deployed tree
+DEPLOY_MANIFEST = "ready_made_deploy_manifest.json"
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 
 class GitHubDeploy:
     """Handles automated deployment to GitHub"""
@@ -31,6 +47,7 @@ class GitHubDeploy:
         self.repo_path = Path(repo_path)
         self.ready_made_path = self.repo_path / "Ready Made"
         self.branch = "main"
+        self.unchanged_files = []  # files copy_pages() found already up to date
         
     def is_repo_ready(self):
         """Check if repo path exists and is a git repository"""
@@ -54,25 +71,55 @@ class GitHubDeploy:
             logger.error(f"Failed to create Ready Made folder: {e}")
             return False
     
-    def copy_pages(self, source_dir, subfolder_name=None):
+    def copy_pages(self, source_dir, subfolder_name=None, only_changed=True):
         """
         Copy generated pages to Ready Made folder
         
         Args:
             source_dir: Source directory with generated pages
             subfolder_name: Optional subfolder (e.g., "nexus_tv")
+            only_changed: Skip files whose content matches what was last
+                copied (tracked in the deploy manifest)
         
         Returns:
-            List of copied files
+            List of copied files (unchanged ones are in self.unchanged_files)
         """
         import shutil
         
+        self.unchanged_files = []
         source_path = Path(source_dir)
         if not source_path.exists():
             logger.error(f"Source directory not found: {source_dir}")
             return []
         
         copied_files = []
+        manifest_path = self._deploy_manifest_path()
+        manifest = self._load_deploy_manifest(manifest_path) if only_changed else {}
+        
+        def copy_file(file, dest):
+            """Copy one file unless dest already holds the same content"""
+            key = str(dest)
+            signature = file_signature(file)
+            entry = manifest.get(key)
+            
+            if entry and dest.exists():
+                if entry['source_signature'] == signature:
+                    self.unchanged_files.append(key)
+                    return
+                # Rewritten but possibly identical (e.g. a regenerated page)
+                content_hash = _file_hash(file)
+                if content_hash == entry['hash']:
+                    entry['source_signature'] = signature
+                    self.unchanged_files.append(key)
+                    return
+            else:
+                content_hash = _file_hash(file) if only_changed else None
+            
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(file, dest)
+            manifest[key] = {'source_signature': signature, 'hash': content_hash}
+            copied_files.append(key)
+            logger.info(f"Copied: {file.name} → {dest}")
         
         try:
             # Determine target path
@@ -83,13 +130,10 @@ class GitHubDeploy:
             
             target_path.mkdir(parents=True, exist_ok=True)
             
-            # Copy all HTML files
-            for html_file in source_path.glob("*.html"):
+            # Copy all HTML files (and top-level scripts such as the asset service worker)
+            for html_file in [*source_path.glob("*.html"), *source_path.glob("*.js")]:
                 try:
-                    dest = target_path / html_file.name
-                    shutil.copy2(html_file, dest)
-                    copied_files.append(str(dest))
-                    logger.info(f"Copied: {html_file.name} → {dest}")
+                    copy_file(html_file, target_path / html_file.name)
                 except Exception as e:
                     logger.error(f"Failed to copy {html_file.name}: {e}")
             
@@ -99,40 +143,65 @@ class GitHubDeploy:
                     target_subdir = target_path / subdir.name
                     target_subdir.mkdir(parents=True, exist_ok=True)
                     
+                    # Dot files are build bookkeeping (.build_manifest.json, temp files)
                     for file in subdir.rglob("*"):
-                        if file.is_file():
-                            rel_path = file.relative_to(subdir)
-                            dest = target_subdir / rel_path
-                            dest.parent.mkdir(parents=True, exist_ok=True)
-                            shutil.copy2(file, dest)
-                            copied_files.append(str(dest))
-                            logger.info(f"Copied: {file.name} → {dest}")
+                        if file.is_file() and not file.name.startswith('.'):
+                            copy_file(file, target_subdir / file.relative_to(subdir))
         
         except Exception as e:
             logger.error(f"Error copying pages: {e}")
         
+        if only_changed:
+            self._save_deploy_manifest(manifest_path, manifest)
+        
+        if self.unchanged_files:
+            logger.info(f"{len(self.unchanged_files)} files unchanged, not copied")
         return copied_files
     
+    def _deploy_manifest_path(self):
+        git_dir = self.repo_path / ".git"
+        if git_dir.is_dir():
+            return git_dir / DEPLOY_MANIFEST
+        return self.ready_made_path / f".{DEPLOY_MANIFEST}"
+    
+    def _load_deploy_manifest(self, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_deploy_manifest(self, path, manifest):
+        try:
+            write_atomic(path, json.dumps(manifest, indent=1, sort_keys=True))
+        except Exception as e:
+            logger.error(f"Failed to save deploy manifest: {e}")
+    
     def git_add(self, file_path=None):
         """
         Git add files
         
         Args:
-            file_path: Specific file to add (default: all in Ready Made)
+            file_path: Specific file, or list of files, to add (default: all in Ready Made)
         """
         try:
             os.chdir(self.repo_path)
             
-            if file_path:
-                cmd = ["git", "add", file_path]
+            if isinstance(file_path, (list, tuple)):
+                paths = [str(p) for p in file_path]
+            elif file_path:
+                paths = [file_path]
             else:
-                cmd = ["git", "add", "Ready Made/"]
+                paths = ["Ready Made/"]
             
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-            
-            if result.returncode != 0:
-                logger.error(f"Git add failed: {result.stderr}")
-                return False
+            # Batches keep the command line within OS limits
+            for i in range(0, len(paths), 500):
+                cmd = ["git", "add", "--"] + paths[i:i + 500]
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+                
+                if result.returncode != 0:
+                    logger.error(f"Git add failed: {result.stderr}")
+                    return False
             
             logger.info("Files staged for commit")
             return True
@@ -217,6 +286,7 @@ class GitHubDeploy:
         result = {
             'success': False,
             'copied_files': [],
+            'unchanged_files': 0,
             'commit_hash': None,
             'error': None
         }
@@ -232,16 +302,21 @@ class GitHubDeploy:
                 result['error'] = "Failed to create Ready Made folder"
                 return result
             
-            # Copy files
+            # Copy files (only those that changed since the last deploy)
             copied = self.copy_pages(source_dir, subfolder_name)
+            result['unchanged_files'] = len(self.unchanged_files)
             if not copied:
-                result['error'] = "No files copied"
+                if self.unchanged_files:
+                    result['success'] = True
+                    logger.info("Nothing changed since the last deployment")
+                else:
+                    result['error'] = "No files copied"
                 return result
             
             result['copied_files'] = copied
             
-            # Git operations
-            if not self.git_add():
+            # Git operations (stage just the copied files)
+            if not self.git_add(copied):
                 result['error'] = "Failed to stage files"
                 return result
             
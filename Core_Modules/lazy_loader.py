@@ -3,8 +3,205 @@ Lazy Loading Module for Playlists
 Implements virtual scrolling for thousands of items with minimal memory
 """
 
+import os
 import json
-from typing import List, Dict, Optional, Generator
+import sqlite3
+from pathlib import Path
+from typing import List, Dict, Optional, Generator, Iterable, Union
+from search_index import SearchIndex, DEFAULT_FIELDS, tokenize
+from lru_cache import LRUCache
+
+
+class IndexedPlaylist:
+    """
+    Playlist stored on disk for range reads
+    - One SQLite row per item, keyed by position
+    - FTS5 index over name, tvg_id and group (when SQLite provides FTS5)
+    - Supports len(), indexing and slicing; only requested rows are read
+    """
+    
+    SEARCH_FIELDS = ('name', 'tvg_id', 'group')
+    
+    def __init__(self, db_path: Union[str, Path]):
+        """
+        Open an index built by IndexedPlaylist.build
+        
+        Args:
+            db_path: Path to the playlist index database
+        """
+        self.db_path = Path(db_path)
+        if not self.db_path.exists():
+            raise FileNotFoundError(f"Playlist index not found: {self.db_path}")
+        
+        conn = self._connect()
+        try:
+            # Positions are contiguous from 0, and MAX on the rowid is a single seek
+            last = conn.execute("SELECT MAX(position) FROM items").fetchone()[0]
+            self._length = 0 if last is None else last + 1
+            self.has_fts = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'items_fts'").fetchone() is not None
+        finally:
+            conn.close()
+    
+    @classmethod
+    def build(cls, items: Iterable[Dict], db_path: Union[str, Path], batch_size: int = 5000) -> "IndexedPlaylist":
+        """
+        Write items to a new playlist index, streaming in batches
+        
+        Args:
+            items: Items in playlist order (any iterable, e.g. a parser generator)
+            db_path: Destination database; replaced atomically when complete
+            batch_size: Rows per insert batch
+        """
+        db_path = Path(db_path)
+        tmp_path = db_path.with_name(db_path.name + '.tmp')
+        if tmp_path.exists():
+            tmp_path.unlink()
+        
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute("CREATE TABLE items (position INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+            try:
+                conn.execute("""
+                    CREATE VIRTUAL TABLE items_fts USING fts5(
+                        name, tvg_id, group_name, content='', tokenize='unicode61 remove_diacritics 2'
+                    )
+                """)
+                has_fts = True
+            except sqlite3.OperationalError:
+                has_fts = False
+            
+            rows, fts_rows = [], []
+            
+            def flush():
+                conn.executemany("INSERT INTO items (position, data) VALUES (?, ?)", rows)
+                if has_fts:
+                    conn.executemany(
+                        "INSERT INTO items_fts (rowid, name, tvg_id, group_name) VALUES (?, ?, ?, ?)", fts_rows)
+                rows.clear()
+                fts_rows.clear()
+            
+            for position, item in enumerate(items):
+                rows.append((position, json.dumps(item, ensure_ascii=False)))
+                if has_fts:
+                    fts_rows.append((position, *(str(item.get(f) or '') for f in cls.SEARCH_FIELDS)))
+                if len(rows) >= batch_size:
+                    flush()
+            flush()
+            conn.commit()
+        finally:
+            conn.close()
+        
+        os.replace(tmp_path, db_path)
+        return cls(db_path)
+    
+    @classmethod
+    def from_m3u(cls, m3u_path: Union[str, Path], db_path: Union[str, Path] = None) -> "IndexedPlaylist":
+        """
+        Open the index for an M3U file, (re)building it when missing or older than the file
+        
+        Args:
+            m3u_path: Playlist file
+            db_path: Index location (default: <m3u_path>.index.db)
+        """
+        m3u_path = Path(m3u_path)
+        db_path = Path(db_path) if db_path else m3u_path.with_name(m3u_path.name + '.index.db')
+        
+        if db_path.exists() and db_path.stat().st_mtime >= m3u_path.stat().st_mtime:
+            return cls(db_path)
+        
+        from parsers.m3u_parser import M3UParser
+        return cls.build(M3UParser(cache_thumbnails=False).iter_file(str(m3u_path)), db_path)
+    
+    def __len__(self) -> int:
+        return self._length
+    
+    def __getitem__(self, key: Union[int, slice]):
+        """Read one item or a contiguous range of items"""
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._length)
+            if step != 1:
+                raise ValueError("IndexedPlaylist slices must be contiguous")
+            return self._read_range(start, stop)
+        
+        index = key + self._length if key < 0 else key
+        if not 0 <= index < self._length:
+            raise IndexError("playlist index out of range")
+        return self._read_range(index, index + 1)[0]
+    
+    def search(self, query: str, fields: List[str] = None, limit: int = 50) -> List[Dict]:
+        """
+        Search items, best matches first
+        
+        Name, tvg_id and group go through the FTS5 index (every word must match
+        as a word prefix, ranked by BM25 with name > tvg_id > group); other
+        fields, or a build without FTS5, fall back to a substring scan.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        
+        if self.has_fts and (fields is None or set(fields) <= set(self.SEARCH_FIELDS)):
+            return self._search_fts(tokens, fields or list(self.SEARCH_FIELDS), limit)
+        return self._search_scan(tokens, fields, limit)
+    
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+    
+    def _read_range(self, start: int, stop: int) -> List[Dict]:
+        if start >= stop:
+            return []
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "SELECT data FROM items WHERE position >= ? AND position < ? ORDER BY position",
+                (start, stop))
+            return [json.loads(data) for (data,) in cursor]
+        finally:
+            conn.close()
+    
+    def _search_fts(self, tokens: List[str], fields: List[str], limit: int) -> List[Dict]:
+        columns = ' '.join('group_name' if f == 'group' else f for f in fields)
+        terms = ' AND '.join('"%s"*' % t.replace('"', '""') for t in tokens)
+        weights = ', '.join(str(DEFAULT_FIELDS[f]) for f in self.SEARCH_FIELDS)
+        
+        conn = self._connect()
+        try:
+            cursor = conn.execute(f"""
+                SELECT items.data FROM items
+                JOIN (
+                    SELECT rowid AS position, bm25(items_fts, {weights}) AS score
+                    FROM items_fts WHERE items_fts MATCH ?
+                    ORDER BY score LIMIT ?
+                ) AS hits USING (position)
+                ORDER BY hits.score, items.position
+            """, ('{%s} : (%s)' % (columns, terms), limit))
+            return [json.loads(data) for (data,) in cursor]
+        finally:
+            conn.close()
+    
+    def _search_scan(self, tokens: List[str], fields: Optional[List[str]], limit: int) -> List[Dict]:
+        # LIKE narrows the rows cheaply in SQLite; the field check runs in Python
+        # Tokens are word characters, so '_' is the only LIKE wildcard to escape
+        where = ' AND '.join(["data LIKE ? ESCAPE '\\'"] * len(tokens))
+        params = ['%' + t.replace('_', '\\_') + '%' for t in tokens]
+        
+        results = []
+        conn = self._connect()
+        try:
+            cursor = conn.execute(f"SELECT data FROM items WHERE {where} ORDER BY position", params)
+            for (data,) in cursor:
+                item = json.loads(data)
+                values = [str(item[f]).casefold() for f in (fields or item.keys()) if f in item]
+                if all(any(t in v for v in values) for t in tokens):
+                    results.append(item)
+                    if len(results) >= limit:
+                        break
+            return results
+        finally:
+            conn.close()
 
 class LazyPlaylistLoader:
     """
@@ -15,21 +212,23 @@ class LazyPlaylistLoader:
     - Generator-based streaming
     """
     
-    def __init__(self, items: List[Dict], chunk_size: int = 2, cache_size: int = 10):
+    def __init__(self, items: Union[List[Dict], IndexedPlaylist], chunk_size: int = 2, cache_size: int = 10):
         """
         Initialize lazy loader
         
         Args:
-            items: Full list of items (shows/channels)
+            items: Full list of items (shows/channels), or an IndexedPlaylist
+                   to read them from disk on demand
             chunk_size: Items to load at once (default 2)
             cache_size: Recent items to keep cached (default 10)
         """
         self.all_items = items
         self.chunk_size = chunk_size
         self.cache_size = cache_size
-        self.cache = {}  # {index: item}
+        self.cache = LRUCache(max_size=cache_size)  # {index: item}
         self.current_index = 0
         self.total_items = len(items)
+        self.search_indexes = {}  # {fields tuple: SearchIndex}
     
     def get_chunk(self, start_index: int = 0) -> Dict:
         """
@@ -55,16 +254,9 @@ class LazyPlaylistLoader:
         end_index = min(start_index + self.chunk_size, self.total_items)
         items = self.all_items[start_index:end_index]
         
-        # Update cache
+        # Update cache (least recently used entries are evicted)
         for i, item in enumerate(items):
-            idx = start_index + i
-            self.cache[idx] = item
-        
-        # Remove old cache entries if over size
-        if len(self.cache) > self.cache_size:
-            oldest_keys = sorted(self.cache.keys())[:-self.cache_size]
-            for key in oldest_keys:
-                del self.cache[key]
+            self.cache.set(start_index + i, item)
         
         return {
             'items': items,
@@ -89,7 +281,7 @@ class LazyPlaylistLoader:
             # Pre-cache the next items
             next_items = self.all_items[next_index:next_index + self.chunk_size]
             for i, item in enumerate(next_items):
-                self.cache[next_index + i] = item
+                self.cache.set(next_index + i, item)
             return {'preloaded': len(next_items), 'next_index': next_index}
         return {'preloaded': 0, 'next_index': -1}
     
@@ -103,42 +295,51 @@ class LazyPlaylistLoader:
         """Get single item by index"""
         if 0 <= index < self.total_items:
             # Check cache first
-            if index in self.cache:
-                return self.cache[index]
+            item = self.cache.get(index)
+            if item is not None:
+                return item
             # Load and cache
             item = self.all_items[index]
-            self.cache[index] = item
+            self.cache.set(index, item)
             return item
         return None
     
-    def search_items(self, query: str, fields: List[str] = None) -> List[Dict]:
+    def search_items(self, query: str, fields: List[str] = None, limit: Optional[int] = None) -> List[Dict]:
         """
-        Search items with lazy loading of results
-        Only returns items, doesn't cache all results
+        Search items through an inverted index
+        The index for a field set is built on first use and reused afterwards
         
         Args:
-            query: Search term (case-insensitive)
+            query: Search terms (case-insensitive; every word must match a
+                   word in some field as a prefix or substring)
             fields: Fields to search in (default all)
+            limit: Maximum results (default all)
         
         Returns:
-            List of matching items
+            List of matching items, best matches first
         """
-        query_lower = query.lower()
-        results = []
+        if isinstance(self.all_items, IndexedPlaylist):
+            return self.all_items.search(query, fields, limit if limit is not None else self.total_items)
         
-        for item in self.all_items:
-            for field in (fields or item.keys()):
-                if field in item:
-                    value = str(item[field]).lower()
-                    if query_lower in value:
-                        results.append(item)
-                        break
+        index = self.get_search_index(fields)
+        hits, _ = index.search(query, limit)
+        return [self.all_items[i] for i, _ in hits]
+    
+    def get_search_index(self, fields: List[str] = None) -> SearchIndex:
+        """Get (building if needed) the search index for a set of fields"""
+        if fields is None:
+            fields = sorted({key for item in self.all_items for key in item})
+        key = tuple(fields)
         
-        return results
+        if key not in self.search_indexes:
+            weights = {f: DEFAULT_FIELDS.get(f, 1.0) for f in fields}
+            self.search_indexes[key] = SearchIndex.build(enumerate(self.all_items), weights)
+        return self.search_indexes[key]
     
     def clear_cache(self):
-        """Clear the cache"""
+        """Clear the cache and search indexes"""
         self.cache.clear()
+        self.search_indexes.clear()
     
     def get_statistics(self) -> Dict:
         """Get memory usage statistics"""
@@ -147,7 +348,9 @@ class LazyPlaylistLoader:
             'cached_items': len(self.cache),
             'cache_percentage': (len(self.cache) / self.total_items * 100) if self.total_items > 0 else 0,
             'chunk_size': self.chunk_size,
-            'cache_size': self.cache_size
+            'cache_size': self.cache_size,
+            'cache_hits': self.cache.hits,
+            'cache_misses': self.cache.misses
         }
 
 
@@ -0,0 +1,364 @@
+"""
+Logo Cache
+Concurrent channel logo fetching into a content-addressed on-disk cache:
+identical images are stored once however many channels/URLs share them
+"""
+
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from file_utils import write_atomic
+
+logger = logging.getLogger(__name__)
+
+# Leading bytes -> extension, for images whose URL doesn't say
+_IMAGE_SIGNATURES = [
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'GIF87a', '.gif'),
+    (b'GIF89a', '.gif'),
+    (b'BM', '.bmp'),
+    (b'\x00\x00\x01\x00', '.ico'),
+]
+
+
+def guess_image_extension(data: bytes, url: str = "", content_type: str = "") -> str:
+    """Pick a file extension from the image bytes, falling back to the content type and URL"""
+    for signature, ext in _IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return ext
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return '.webp'
+    if b'<svg' in data[:512].lower():
+        return '.svg'
+    
+    content_type = content_type.split(';')[0].strip().lower()
+    if content_type.startswith('image/'):
+        subtype = content_type[6:].replace('jpeg', 'jpg').replace('svg+xml', 'svg')
+        return '.' + subtype
+    
+    path = urlparse(url).path.lower()
+    for ext in ('.png', '.jpg', '.jpeg', '.gif', '.webp', '.svg'):
+        if path.endswith(ext):
+            return '.jpg' if ext == '.jpeg' else ext
+    return '.jpg'
+
+
+class LogoCache:
+    """
+    Content-addressed image store
+    - Files live at objects/<sha256[:2]>/<sha256><ext>
+    - index.db maps URL -> content hash plus ETag/Last-Modified for revalidation
+    - Least recently used objects are evicted once the store exceeds max_bytes
+    """
+    
+    def __init__(self, cache_dir: Path, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Initialize the cache
+        
+        Args:
+            cache_dir: Cache directory
+            max_bytes: Size cap for stored images
+        """
+        self.cache_dir = Path(cache_dir)
+        self.objects_dir = self.cache_dir / "objects"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        
+        self.conn = sqlite3.connect(str(self.cache_dir / "index.db"), check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS objects (
+                hash TEXT PRIMARY KEY,
+                ext TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_objects_last_access ON objects(last_access);
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                hash TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                checked_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_urls_hash ON urls(hash);
+        """)
+        self.conn.commit()
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+    
+    def object_path(self, content_hash: str, ext: str) -> Path:
+        """Path of a stored image"""
+        return self.objects_dir / content_hash[:2] / f"{content_hash}{ext}"
+    
+    def lookup(self, url: str) -> Optional[Dict]:
+        """
+        Cached entry for a URL
+        
+        Returns:
+            {'path', 'hash', 'etag', 'last_modified', 'checked_at'} or None
+        """
+        with self.lock:
+            row = self.conn.execute("""
+                SELECT u.hash, u.etag, u.last_modified, u.checked_at, o.ext
+                FROM urls u JOIN objects o ON o.hash = u.hash
+                WHERE u.url = ?
+            """, (url,)).fetchone()
+        if row is None:
+            return None
+        
+        content_hash, etag, last_modified, checked_at, ext = row
+        path = self.object_path(content_hash, ext)
+        if not path.exists():
+            return None
+        return {'path': str(path), 'hash': content_hash, 'etag': etag,
+                'last_modified': last_modified, 'checked_at': checked_at}
+    
+    def store(self, url: str, data: bytes, etag: Optional[str] = None,
+              last_modified: Optional[str] = None, content_type: str = "") -> str:
+        """
+        Store downloaded image bytes for a URL
+        
+        Returns:
+            Path of the (possibly already present) stored image
+        """
+        content_hash = hashlib.sha256(data).hexdigest()
+        now = time.time()
+        
+        with self.lock:
+            row = self.conn.execute("SELECT ext FROM objects WHERE hash = ?", (content_hash,)).fetchone()
+            ext = row[0] if row else guess_image_extension(data, url, content_type)
+            path = self.object_path(content_hash, ext)
+            
+            if row is None or not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                write_atomic(path, data)
+                if row is None:
+                    self.total_bytes += len(data)
+                self.conn.execute("INSERT OR REPLACE INTO objects (hash, ext, size, last_access) VALUES (?, ?, ?, ?)",
+                                  (content_hash, ext, len(data), now))
+            else:
+                self.conn.execute("UPDATE objects SET last_access = ? WHERE hash = ?", (now, content_hash))
+            
+            self.conn.execute("""
+                INSERT OR REPLACE INTO urls (url, hash, etag, last_modified, checked_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (url, content_hash, etag, last_modified, now))
+            self._evict(keep=content_hash)
+            self.conn.commit()
+        return str(path)
+    
+    def touch(self, url: str, revalidated: bool = False) -> None:
+        """Mark a URL's image as used (and, after a 304, as freshly checked)"""
+        now = time.time()
+        with self.lock:
+            if revalidated:
+                self.conn.execute("UPDATE urls SET checked_at = ? WHERE url = ?", (now, url))
+            self.conn.execute("""
+                UPDATE objects SET last_access = ?
+                WHERE hash = (SELECT hash FROM urls WHERE url = ?)
+            """, (now, url))
+            self.conn.commit()
+    
+    def stats(self) -> Dict:
+        """Object/URL counts and stored size"""
+        with self.lock:
+            objects = self.conn.execute("SELECT COUNT(*) FROM objects").fetchone()[0]
+            urls = self.conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+        return {
+            'total_files': objects,
+            'total_urls': urls,
+            'total_size': self.total_bytes,
+            'total_size_mb': round(self.total_bytes / (1024 * 1024), 2)
+        }
+    
+    def close(self) -> None:
+        """Close the index"""
+        with self.lock:
+            self.conn.close()
+    
+    def _evict(self, keep: str) -> None:
+        """Remove least recently used objects (and their URLs) until under max_bytes"""
+        if self.total_bytes <= self.max_bytes:
+            return
+        
+        rows = self.conn.execute(
+            "SELECT hash, ext, size FROM objects WHERE hash != ? ORDER BY last_access", (keep,))
+        evicted = []
+        for content_hash, ext, size in rows:
+            if self.total_bytes <= self.max_bytes:
+                break
+            try:
+                self.object_path(content_hash, ext).unlink()
+            except OSError:
+                pass
+            self.total_bytes -= size
+            evicted.append((content_hash,))
+        
+        self.conn.executemany("DELETE FROM objects WHERE hash = ?", evicted)
+        self.conn.executemany("DELETE FROM urls WHERE hash = ?", evicted)
+        logger.debug(f"Evicted {len(evicted)} cached logos")
+
+
+class LogoFetcher:
+    """
+    Concurrent logo downloader feeding a LogoCache
+    - Bounded thread pool over one shared requests.Session (connection reuse)
+    - At most per_host requests in flight to any one host
+    - Cached URLs are served without a request until revalidate_after seconds,
+      then revalidated with If-None-Match / If-Modified-Since
+    """
+    
+    def __init__(self, cache: LogoCache, max_workers: int = 16, per_host: int = 4,
+                 timeout: float = 10, revalidate_after: float = 7 * 24 * 3600,
+                 validate: Optional[Callable[[bytes], bool]] = None):
+        """
+        Initialize the fetcher
+        
+        Args:
+            cache: Cache to read from and store into
+            max_workers: Concurrent downloads
+            per_host: Concurrent downloads per host
+            timeout: Request timeout in seconds
+            revalidate_after: Seconds before a cached URL is checked again
+            validate: Optional check on downloaded bytes (e.g. Pillow verify)
+        """
+        self.cache = cache
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.timeout = timeout
+        self.revalidate_after = revalidate_after
+        self.validate = validate
+        
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = 'M3U-Matrix-LogoFetcher/1.0'
+        
+        self.host_limits: Dict[str, threading.BoundedSemaphore] = {}
+        self.host_lock = threading.Lock()
+    
+    def fetch(self, url: str, timeout: Optional[float] = None) -> Tuple[Optional[str], str]:
+        """
+        Fetch one logo through the cache
+        
+        Args:
+            url: Logo URL
+            timeout: Request timeout override in seconds
+        
+        Returns:
+            (local_path, status): status is one of "cached", "revalidated",
+            "downloaded", "no_url", "invalid_image", "timeout" or "error: ..."
+        """
+        if not url or not url.startswith(('http://', 'https://')):
+            return None, "no_url"
+        
+        entry = self.cache.lookup(url)
+        if entry and time.time() - entry['checked_at'] < self.revalidate_after:
+            self.cache.touch(url)
+            return entry['path'], "cached"
+        
+        headers = {}
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        
+        try:
+            with self._host_slot(url):
+                response = self.session.get(url, headers=headers, timeout=timeout or self.timeout)
+            
+            if response.status_code == 304 and entry:
+                self.cache.touch(url, revalidated=True)
+                return entry['path'], "revalidated"
+            
+            response.raise_for_status()
+            data = response.content
+            if self.validate is not None and not self.validate(data):
+                return None, "invalid_image"
+            
+            path = self.cache.store(
+                url, data,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified'),
+                content_type=response.headers.get('Content-Type', '')
+            )
+            return path, "downloaded"
+        
+        except requests.Timeout:
+            logger.debug(f"Timeout downloading logo: {url}")
+            return (entry['path'], "cached") if entry else (None, "timeout")
+        except requests.RequestException as e:
+            logger.debug(f"Failed to download logo {url}: {e}")
+            return (entry['path'], "cached") if entry else (None, f"error: {str(e)[:50]}")
+    
+    def fetch_many(self, urls: Iterable[str],
+                   progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Tuple[Optional[str], str]]:
+        """
+        Fetch many logos concurrently; each distinct URL is requested once
+        
+        Args:
+            urls: Logo URLs (duplicates and blanks allowed)
+            progress: Called as progress(done, total) after each URL
+        
+        Returns:
+            {url: (local_path, status)}
+        """
+        unique = list(dict.fromkeys(u for u in urls if u))
+        results: Dict[str, Tuple[Optional[str], str]] = {}
+        if not unique:
+            return results
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for done, (url, result) in enumerate(zip(unique, pool.map(self.fetch, unique)), 1):
+                results[url] = result
+                if progress:
+                    progress(done, len(unique))
+        return results
+    
+    def close(self) -> None:
+        """Release pooled connections"""
+        self.session.close()
+    
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc.lower()
+        with self.host_lock:
+            slot = self.host_limits.get(host)
+            if slot is None:
+                slot = self.host_limits[host] = threading.BoundedSemaphore(self.per_host)
+        return slot
+
+
+_caches: Dict[str, LogoCache] = {}
+_fetchers: Dict[Tuple[str, Optional[Callable]], LogoFetcher] = {}
+_fetchers_lock = threading.Lock()
+
+
+def get_logo_fetcher(cache_dir: Path, validate: Optional[Callable[[bytes], bool]] = None) -> LogoFetcher:
+    """
+    Shared fetcher for a directory and validator
+    
+    Fetchers with different validators share the directory's single
+    LogoCache, so its lock, size accounting and index stay consistent
+    """
+    directory = str(Path(cache_dir).resolve())
+    with _fetchers_lock:
+        fetcher = _fetchers.get((directory, validate))
+        if fetcher is None:
+            cache = _caches.get(directory)
+            if cache is None:
+                cache = _caches[directory] = LogoCache(Path(cache_dir))
+            fetcher = _fetchers[(directory, validate)] = LogoFetcher(cache, validate=validate)
+        return fetcher
@@ -0,0 +1,145 @@
+"""
+LRU Cache
+Thread-safe O(1) least-recently-used cache with optional TTL,
+byte-size budget and hit/miss counters
+"""
+
+import sys
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate size of a cached value in bytes"""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode('utf-8', errors='ignore'))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """
+    Least-recently-used cache
+    
+    Entries live in an OrderedDict in recency order, so lookups, inserts and
+    evictions are O(1). Limits are optional and combine: max_size caps the
+    entry count, max_bytes caps the summed size of values (as measured by
+    sizeof), and ttl expires entries that many seconds after they were set.
+    All operations take an internal lock.
+    """
+    
+    def __init__(self, max_size: Optional[int] = 128, ttl: Optional[float] = None,
+                 max_bytes: Optional[int] = None, sizeof: Callable[[Any], int] = estimate_size):
+        """
+        Initialize the cache
+        
+        Args:
+            max_size: Maximum number of entries (None for no limit)
+            ttl: Seconds before an entry expires (None to never expire)
+            max_bytes: Maximum total size of values in bytes (None for no limit)
+            sizeof: Function measuring a value's size, used when max_bytes is set
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (value, expires_at, nbytes)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.lock = threading.RLock()
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a value, marking it most recently used"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            
+            if entry[1] is not None and entry[1] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting least recently used entries to stay within limits"""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        nbytes = self.sizeof(value) if self.max_bytes is not None else 0
+        
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            
+            # A value larger than the whole budget is never cached
+            if (self.max_bytes is not None and nbytes > self.max_bytes) or self.max_size == 0:
+                return
+            
+            self.entries[key] = (value, expires_at, nbytes)
+            self.total_bytes += nbytes
+            
+            while ((self.max_size is not None and len(self.entries) > self.max_size) or
+                   (self.max_bytes is not None and self.total_bytes > self.max_bytes)):
+                _, (_, _, evicted_bytes) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted_bytes
+                self.evictions += 1
+    
+    def delete(self, key: Hashable) -> bool:
+        """Remove an entry, returning whether it was present"""
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+                return True
+            return False
+    
+    def clear(self) -> None:
+        """Remove all entries (counters are kept)"""
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+    
+    def size(self) -> int:
+        """Number of entries (including any not yet noticed as expired)"""
+        return len(self.entries)
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def __contains__(self, key: Hashable) -> bool:
+        """Check for a live entry without changing recency or counters"""
+        with self.lock:
+            entry = self.entries.get(key)
+            return entry is not None and (entry[1] is None or entry[1] > time.monotonic())
+    
+    def stats(self) -> Dict[str, Any]:
+        """Counters and current usage"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+    
+    def _remove(self, key: Hashable) -> None:
+        _, _, nbytes = self.entries.pop(key)
+        self.total_bytes -= nbytes
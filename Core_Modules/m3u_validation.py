@@ -5,13 +5,13 @@ Provides security, validation, and helper functions
 
 import re
 import os
-import hashlib
 from pathlib import Path
 from urllib.parse import urlparse
 from typing import Optional, List, Dict, Any, Tuple
 import logging
-import requests
 from io import BytesIO
+from lru_cache import LRUCache
+from logo_cache import get_logo_fetcher
 
 logger = logging.getLogger(__name__)
 
@@ -208,40 +208,11 @@ def safe_get_nested(data: Dict, keys: List[str], default=None) -> Any:
 
 # ===== CACHING HELPERS =====
 
-class SimpleCache:
-    """Simple in-memory cache with size limit"""
+class SimpleCache(LRUCache):
+    """Simple in-memory cache with size limit (LRU, see lru_cache.LRUCache)"""
     
     def __init__(self, max_size: int = 100):
-        self.cache = {}
-        self.max_size = max_size
-        self.access_order = []
-    
-    def get(self, key: str) -> Optional[Any]:
-        """Get value from cache"""
-        if key in self.cache:
-            # Update access order (LRU)
-            self.access_order.remove(key)
-            self.access_order.append(key)
-            return self.cache[key]
-        return None
-    
-    def set(self, key: str, value: Any):
-        """Set value in cache"""
-        if key in self.cache:
-            self.access_order.remove(key)
-        
-        self.cache[key] = value
-        self.access_order.append(key)
-        
-        # Remove oldest if over limit
-        while len(self.cache) > self.max_size:
-            oldest = self.access_order.pop(0)
-            del self.cache[oldest]
-    
-    def clear(self):
-        """Clear cache"""
-        self.cache.clear()
-        self.access_order.clear()
+        super().__init__(max_size=max_size)
 
 
 # ===== FORMAT VALIDATORS =====
@@ -286,6 +257,9 @@ def download_and_cache_thumbnail(logo_url: str, channel_name: str, thumbnails_di
     """
     Download and cache channel logo/thumbnail
     
+    Logos are stored content-addressed by logo_cache (one file per distinct
+    image) and revalidated with conditional requests once stale.
+    
     Args:
         logo_url: URL of the logo to download
         channel_name: Name of the channel (for fallback filename)
@@ -302,66 +276,57 @@ def download_and_cache_thumbnail(logo_url: str, channel_name: str, thumbnails_di
     if not logo_url or not logo_url.startswith(('http://', 'https://')):
         return None, "Invalid URL"
     
-    try:
-        # Create hash of URL for unique filename
-        url_hash = hashlib.md5(logo_url.encode()).hexdigest()[:12]
-        
-        # Sanitize channel name for filename
-        safe_name = sanitize_filename(channel_name, max_length=50)
-        safe_name = re.sub(r'[^\w\-]', '_', safe_name)
-        
-        # Determine file extension from URL
-        ext = '.jpg'
-        if logo_url.lower().endswith(('.png', '.gif', '.webp', '.jpeg', '.jpg')):
-            ext = os.path.splitext(logo_url.lower())[1]
-        
-        # Create filename: channelname_hash.ext
-        filename = f"{safe_name}_{url_hash}{ext}"
-        local_path = thumbnails_dir / filename
-        
-        # Check if already cached
-        if local_path.exists():
-            return str(local_path), "Cached"
-        
-        # Download thumbnail
-        response = requests.get(logo_url, timeout=timeout, stream=True)
-        response.raise_for_status()
-        
-        # Verify it's an image (only if Pillow available)
-        try:
-            if not PILLOW_AVAILABLE:
-                # Skip image verification if Pillow not available
-                with open(local_path, 'wb') as f:
-                    f.write(response.content)
-                return str(local_path), "Downloaded (unverified)"
-            
-            if Image is None:  # type: ignore
-                raise ImportError("Pillow Image module not available")
-            
-            img = Image.open(BytesIO(response.content))  # type: ignore
-            img.verify()
-            
-            # Save to disk
-            with open(local_path, 'wb') as f:
-                f.write(response.content)
-            
-            return str(local_path), "Downloaded"
-            
-        except Exception as img_error:
-            logger.warning(f"Invalid image from {logo_url}: {img_error}")
-            return None, "Invalid image"
-    
-    except requests.Timeout:
-        logger.warning(f"Timeout downloading thumbnail: {logo_url}")
-        return None, "Timeout"
+    path, status = get_logo_fetcher(Path(thumbnails_dir), validate=_is_valid_image).fetch(logo_url, timeout=timeout)
+    return path, _thumbnail_status(status)
+
+
+def download_and_cache_thumbnails(logo_urls: List[str], thumbnails_dir: Path,
+                                  progress=None) -> Dict[str, Tuple[Optional[str], str]]:
+    """
+    Download and cache many channel logos concurrently
     
-    except requests.RequestException as e:
-        logger.warning(f"Failed to download thumbnail {logo_url}: {e}")
-        return None, f"Download failed: {str(e)[:50]}"
+    Args:
+        logo_urls: Logo URLs (duplicates are fetched once)
+        thumbnails_dir: Directory to save thumbnails
+        progress: Optional callback progress(done, total)
+        
+    Returns:
+        Dictionary of url -> (local_file_path, status_message)
+    """
+    if not PILLOW_AVAILABLE:
+        return {url: (None, "Pillow not installed") for url in logo_urls if url}
     
-    except Exception as e:
-        logger.error(f"Unexpected error caching thumbnail: {e}")
-        return None, f"Error: {str(e)[:50]}"
+    fetcher = get_logo_fetcher(Path(thumbnails_dir), validate=_is_valid_image)
+    results = fetcher.fetch_many(logo_urls, progress=progress)
+    return {url: (path, _thumbnail_status(status))
+            for url, (path, status) in results.items()}
+
+
+# logo_cache status -> status messages shown by the app
+_THUMBNAIL_STATUS = {
+    "cached": "Cached",
+    "revalidated": "Cached",
+    "downloaded": "Downloaded",
+    "no_url": "Invalid URL",
+    "invalid_image": "Invalid image",
+    "timeout": "Timeout",
+}
+
+
+def _thumbnail_status(status: str) -> str:
+    if status.startswith("error: "):
+        return "Download failed: " + status[len("error: "):]
+    return _THUMBNAIL_STATUS.get(status, status)
+
+
+def _is_valid_image(data: bytes) -> bool:
+    """Check downloaded bytes are an image Pillow can read"""
+    try:
+        img = Image.open(BytesIO(data))  # type: ignore
+        img.verify()
+        return True
+    except Exception:
+        return False
 
 
 def get_cached_thumbnail_stats(thumbnails_dir: Path) -> Dict[str, Any]:
@@ -382,7 +347,7 @@ def get_cached_thumbnail_stats(thumbnails_dir: Path) -> Dict[str, Any]:
             'newest': None
         }
     
-    files = list(thumbnails_dir.glob('*'))
+    files = [f for f in thumbnails_dir.rglob('*') if f.is_file()]
     image_files = [f for f in files if f.suffix.lower() in ['.jpg', '.jpeg', '.png', '.gif', '.webp']]
     
     if not image_files:
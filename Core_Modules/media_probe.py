@@ -0,0 +1,265 @@
+"""
+Media Probe
+ffprobe-based media inspection (duration, streams, keyframes) run in a
+worker pool, with results cached on disk by (path, size, mtime) so a file is
+only probed again after it changes
+"""
+
+import os
+import json
+import time
+import shutil
+import sqlite3
+import logging
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+REMOTE_PREFIXES = ('http://', 'https://', 'rtmp://', 'rtsp://', 'udp://', 'rtp://')
+
+
+def is_remote(path: str) -> bool:
+    """True for stream URLs, which are never probed"""
+    return str(path).lower().startswith(REMOTE_PREFIXES)
+
+
+class MediaProbe:
+    """
+    Cached, concurrent ffprobe
+    
+    probe() returns a dict with duration (seconds), width, height,
+    video_codec, audio_codec, bit_rate and format_name, plus keyframes
+    (seconds) when asked for. Keyframes come from packet flags, which ffprobe
+    reads from the container without decoding any frames.
+    """
+    
+    def __init__(self, cache_path: Optional[Path] = None, workers: int = 8,
+                 ffprobe: Optional[str] = None, timeout: float = 30):
+        """
+        Initialize the probe
+        
+        Args:
+            cache_path: SQLite cache file (default: metadata/video_metadata/media_probe.db
+                in the output directory)
+            workers: Concurrent ffprobe processes for probe_many()
+            ffprobe: ffprobe executable (default: found on PATH)
+            timeout: Seconds allowed per ffprobe call
+        """
+        self.ffprobe = ffprobe or shutil.which('ffprobe')
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        
+        if cache_path is None:
+            cache_path = _default_cache_dir() / "media_probe.db"
+        self.cache_path = Path(cache_path)
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.cache_path), check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS probes (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                info TEXT NOT NULL,
+                keyframes TEXT,
+                probed_at REAL NOT NULL
+            );
+        """)
+    
+    @property
+    def available(self) -> bool:
+        return self.ffprobe is not None
+    
+    def probe(self, path, keyframes: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Probe one local media file
+        
+        Args:
+            path: File path
+            keyframes: Also list keyframe timestamps
+        
+        Returns:
+            Probe result, or None for URLs, missing files or when ffprobe is unavailable
+        """
+        if is_remote(path):
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        
+        key = str(Path(path).resolve())
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT size, mtime_ns, info, keyframes FROM probes WHERE path = ?", (key,)
+            ).fetchone()
+        
+        info = json.loads(row[2]) if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns else None
+        if info is not None and info.get('error') is None:
+            cached_keyframes = json.loads(row[3]) if row[3] is not None else None
+            if not keyframes or cached_keyframes is not None:
+                if keyframes:
+                    info['keyframes'] = cached_keyframes
+                return info
+        else:
+            if not self.available:
+                return None
+            info = self._probe_streams(key)
+            cached_keyframes = None
+        
+        if keyframes and self.available:
+            # None (keyframe probe failed) is returned as [] but not cached
+            cached_keyframes = self._probe_keyframes(key) if info.get('error') is None else None
+            info['keyframes'] = cached_keyframes or []
+        
+        # Failures (timeouts on a slow share, a file still being written) may
+        # be transient, so only successful probes are cached
+        if info.get('error') is not None:
+            return info
+        
+        stored = {k: v for k, v in info.items() if k != 'keyframes'}
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO probes (path, size, mtime_ns, info, keyframes, probed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, stat.st_size, stat.st_mtime_ns, json.dumps(stored),
+                 json.dumps(cached_keyframes) if cached_keyframes is not None else None, time.time())
+            )
+            self.conn.commit()
+        return info
+    
+    def probe_many(self, paths: Iterable, keyframes: bool = False,
+                   progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Probe files concurrently (cached files return immediately)
+        
+        Args:
+            paths: File paths (duplicates are probed once)
+            keyframes: Also list keyframe timestamps
+            progress: Called as progress(done, total)
+        
+        Returns:
+            {path: probe result or None}
+        """
+        unique = list(dict.fromkeys(str(p) for p in paths))
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        if not unique:
+            return results
+        
+        done = 0
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(unique))) as pool:
+            for path, result in zip(unique, pool.map(lambda p: self._probe_safely(p, keyframes), unique)):
+                results[path] = result
+                done += 1
+                if progress:
+                    progress(done, len(unique))
+        return results
+    
+    def duration(self, path) -> Optional[float]:
+        """Duration in seconds, or None if unknown"""
+        info = self.probe(path)
+        return info.get('duration') if info else None
+    
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+    
+    def _probe_safely(self, path: str, keyframes: bool) -> Optional[Dict[str, Any]]:
+        try:
+            return self.probe(path, keyframes)
+        except Exception as e:
+            logger.warning(f"Probe failed for {path}: {e}")
+            return None
+    
+    def _run(self, args: List[str]) -> Optional[str]:
+        try:
+            result = subprocess.run([self.ffprobe, '-v', 'error'] + args, capture_output=True,
+                                    text=True, timeout=self.timeout)
+        except (subprocess.TimeoutExpired, subprocess.SubprocessError, OSError) as e:
+            logger.debug(f"ffprobe {args[-1]}: {e}")
+            return None
+        if result.returncode != 0:
+            return None
+        return result.stdout
+    
+    def _probe_streams(self, path: str) -> Dict[str, Any]:
+        """Format and stream details in one ffprobe call"""
+        output = self._run(['-print_format', 'json', '-show_format', '-show_streams', path])
+        info: Dict[str, Any] = {'duration': None, 'width': 0, 'height': 0, 'video_codec': None,
+                                'audio_codec': None, 'bit_rate': None, 'format_name': None, 'error': None}
+        if output is None:
+            info['error'] = 'ffprobe failed'
+            return info
+        try:
+            data = json.loads(output)
+        except ValueError:
+            info['error'] = 'unreadable ffprobe output'
+            return info
+        
+        fmt = data.get('format', {})
+        streams = data.get('streams', [])
+        video = next((s for s in streams if s.get('codec_type') == 'video'), {})
+        audio = next((s for s in streams if s.get('codec_type') == 'audio'), {})
+        
+        duration = _to_float(fmt.get('duration')) or _to_float(video.get('duration'))
+        info.update({
+            'duration': duration,
+            'width': video.get('width', 0),
+            'height': video.get('height', 0),
+            'video_codec': video.get('codec_name'),
+            'audio_codec': audio.get('codec_name'),
+            'bit_rate': int(_to_float(fmt.get('bit_rate')) or 0) or None,
+            'format_name': fmt.get('format_name'),
+        })
+        return info
+    
+    def _probe_keyframes(self, path: str) -> Optional[List[float]]:
+        """Keyframe timestamps from packet flags (no decoding); None if ffprobe failed"""
+        output = self._run(['-select_streams', 'v:0', '-show_entries', 'packet=pts_time,flags',
+                            '-of', 'csv=p=0', path])
+        if output is None:
+            return None
+        keyframes = []
+        for line in output.splitlines():
+            pts_time, _, flags = line.partition(',')
+            if flags.startswith('K'):
+                timestamp = _to_float(pts_time)
+                if timestamp is not None:
+                    keyframes.append(round(timestamp, 3))
+        keyframes.sort()
+        return keyframes
+
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _default_cache_dir() -> Path:
+    try:
+        from output_manager import get_output_manager
+    except ImportError:
+        try:
+            from Core_Modules.output_manager import get_output_manager
+        except ImportError:
+            return Path("M3U_Matrix_Output") / "metadata" / "video_metadata"
+    return get_output_manager().metadata_video_dir
+
+
+_probe: Optional[MediaProbe] = None
+_probe_lock = threading.Lock()
+
+
+def get_media_probe() -> MediaProbe:
+    """Shared probe (and cache) for the application"""
+    global _probe
+    with _probe_lock:
+        if _probe is None:
+            _probe = MediaProbe()
+        return _probe
@@ -8,14 +8,21 @@ Includes PyInstaller compatibility for executable distribution
 
 import re
 import json
-import subprocess
 import shutil
 import sys
-import os
 from pathlib import Path
+from functools import lru_cache
 from datetime import datetime, timedelta
 from urllib.parse import unquote, urlparse
 
+from file_utils import write_atomic
+from template_engine import get_template, read_cached, record_copy, record_dependency
+from asset_bundle import ASSET_MODES, get_asset_bundle, inline_script_break
+from data_shards import DATA_MODES, DEFAULT_SHARD_SIZE, data_expression, shard_loader_script, write_shards
+from lru_cache import LRUCache
+from media_probe import get_media_probe, is_remote
+from parsers.m3u_stream import iter_m3u_entries
+
 
 # ========== PyInstaller Compatibility Functions ==========
 def get_application_path():
@@ -101,6 +108,36 @@ def get_output_directory_for_pyinstaller(subfolder=""):
     return output_dir
 
 
+def copy_side_file(source, dest):
+    """
+    Copy a CSS/JS file next to a page if it exists, recording it for
+    incremental builds (a missing source is recorded too, so the page is
+    rebuilt once it appears)
+    """
+    source = Path(source)
+    if not source.exists():
+        record_dependency(source)
+        return
+    shutil.copy(source, dest)
+    record_copy(source, dest)
+
+
+def get_pages_dir():
+    """
+    Root of the generated site (generated_pages/), which holds the shared
+    assets/ directory and service worker
+    
+    Generators must not derive it from their own output_dir: not every page
+    type has a subfolder (Classic TV writes into the site root itself).
+    """
+    try:
+        from output_manager import get_output_manager
+        return get_output_manager().pages_dir
+    except ImportError:
+        return get_output_directory_for_pyinstaller()
+
+
+@lru_cache(maxsize=65536)
 def clean_title(raw_title):
     """
     Clean up titles from URL-encoded filenames or full URLs
@@ -135,6 +172,29 @@ def clean_title(raw_title):
     return title if title else 'Unknown'
 
 
+# Parsed playlists, shared by every generator rendering the same M3U content
+_playlist_cache = LRUCache(max_size=8)
+
+
+def parse_playlist(m3u_content):
+    """
+    Entries (parsers.m3u_stream.M3UEntry) of an M3U playlist
+    
+    The content is tokenized once and the entries reused by each generator
+    that renders it, so a playlist isn't re-parsed per page type.
+    """
+    entries = _playlist_cache.get(m3u_content)
+    if entries is None:
+        entries = tuple(iter_m3u_entries(m3u_content))
+        _playlist_cache.set(m3u_content, entries)
+    return entries
+
+
+def entry_name(entry):
+    """Display name of a playlist entry: tvg-name, else the EXTINF title"""
+    return clean_title(entry.attrs.get('tvg-name') or entry.title)
+
+
 def sanitize_directory_name(name):
     """
     Sanitize a string to be safe for directory names on all OS platforms
@@ -189,6 +249,108 @@ def sanitize_directory_name(name):
     return name
 
 
+# Marks the schedule_data array literal in the NEXUS TV template
+SCHEDULE_DATA_PLACEHOLDER = '\x00SCHEDULE_DATA\x00'
+
+# Marks the end of the NEXUS TV page body, where the data shard loader goes
+BODY_END_PLACEHOLDER = '\x00BODY_END\x00'
+
+NEXUS_TV_PLACEHOLDERS = (
+    '// PLACEHOLDER_HLS_JS',
+    '// PLACEHOLDER_DASH_JS',
+    '// PLACEHOLDER_THUMBNAIL_SYSTEM_JS',
+    SCHEDULE_DATA_PLACEHOLDER,
+    '<title>NEXUS TV - Classic Movies Channel</title>',
+    '{{EMBEDDED_CHANNELS}}',
+    '{{HUB_LINK}}',
+    BODY_END_PLACEHOLDER,
+)
+
+
+def mark_schedule_data(template):
+    """
+    Replace the template's 'let schedule_data = [...];' literal with
+    SCHEDULE_DATA_PLACEHOLDER (run once per template load)
+    """
+    start_marker = 'let schedule_data = ['
+    
+    start_idx = template.find(start_marker)
+    if start_idx == -1:
+        raise ValueError("Template does not contain 'let schedule_data = [' marker")
+    
+    # Find the closing bracket and semicolon
+    # Count brackets to handle nested arrays
+    bracket_count = 0
+    search_start = start_idx + len(start_marker) - 1  # -1 to include the opening [
+    end_idx = -1
+    
+    for i in range(search_start, len(template)):
+        if template[i] == '[':
+            bracket_count += 1
+        elif template[i] == ']':
+            bracket_count -= 1
+            if bracket_count == 0:
+                # Found the matching closing bracket
+                if i + 1 < len(template) and template[i + 1] == ';':
+                    end_idx = i + 2  # Include the semicolon
+                    break
+    
+    if end_idx == -1:
+        raise ValueError("Could not find matching end of schedule_data array")
+    
+    return template[:start_idx] + SCHEDULE_DATA_PLACEHOLDER + template[end_idx:]
+
+
+def mark_body_end(template):
+    """
+    Insert BODY_END_PLACEHOLDER before the template's last </body>, so a
+    '</body>' inside an inline script string is left alone
+    """
+    end_idx = template.rfind('</body>')
+    if end_idx == -1:
+        raise ValueError("Template does not contain a '</body>' tag")
+    return template[:end_idx] + BODY_END_PLACEHOLDER + template[end_idx:]
+
+
+def prepare_nexus_template(template):
+    """Mark the NEXUS TV template's data and body-end regions (run once per template load)"""
+    return mark_body_end(mark_schedule_data(template))
+
+
+def library_values(libraries, asset_mode, page_dir, pages_dir):
+    """
+    Render values for JS library placeholders that sit inside inline <script> blocks
+    
+    Args:
+        libraries: placeholder -> library file, in load order (missing files render empty)
+        asset_mode: 'inline' embeds each library in the page; 'external' writes it
+            once to the shared content-hashed assets/ directory and loads it by
+            relative URL (pages stay small and browsers cache the library once)
+        page_dir: Directory of the generated page
+        pages_dir: Root of the generated site (holds assets/)
+    
+    Returns:
+        placeholder -> replacement text
+    """
+    if asset_mode not in ASSET_MODES:
+        raise ValueError(f"Unknown asset mode: {asset_mode} (expected one of {', '.join(ASSET_MODES)})")
+    
+    if asset_mode == 'inline':
+        return {placeholder: read_cached(path, default="") for placeholder, path in libraries.items()}
+    
+    bundle = get_asset_bundle(pages_dir)
+    values = {}
+    register_worker = True
+    for placeholder, path in libraries.items():
+        if not Path(path).exists():
+            record_dependency(path)
+            values[placeholder] = ""
+            continue
+        values[placeholder] = inline_script_break(bundle.script_tags([path], page_dir, register_worker))
+        register_worker = False
+    return values
+
+
 class NexusTVPageGenerator:
     """
     NEXUS TV Page Generator - 24-hour scheduled playback
@@ -196,25 +358,12 @@ class NexusTVPageGenerator:
     """
     def parse_m3u_to_channels_simple(self, m3u_content):
         """Extract channel data from M3U for embedded offline support"""
-        channels = []
-        lines = m3u_content.strip().split('\n')
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            if line.startswith('#EXTINF'):
-                channel = {}
-                name_match = re.search(r',(.+)$', line)
-                channel['name'] = clean_title(name_match.group(1)) if name_match else 'Unknown'
-                logo_match = re.search(r'tvg-logo="([^"]*)"', line)
-                channel['logo'] = logo_match.group(1) if logo_match else ''
-                group_match = re.search(r'group-title="([^"]*)"', line)
-                channel['group'] = group_match.group(1) if group_match else 'Other'
-                if i + 1 < len(lines) and not lines[i + 1].startswith('#'):
-                    channel['url'] = lines[i + 1].strip()
-                    channels.append(channel)
-                    i += 1
-            i += 1
-        return channels
+        return [{
+            'name': clean_title(entry.title),
+            'logo': entry.attrs.get('tvg-logo', ''),
+            'group': entry.attrs.get('group-title', 'Other'),
+            'url': entry.url
+        } for entry in parse_playlist(m3u_content)]
     
     def __init__(self, template_path=None):
         if template_path is None:
@@ -239,41 +388,17 @@ class NexusTVPageGenerator:
     
     def extract_video_duration(self, video_url):
         """
-        Extract precise video duration using FFmpeg/ffprobe
+        Extract precise video duration using FFmpeg/ffprobe (cached per file)
         Returns duration in minutes, or None if extraction fails
         """
         if not self.ffprobe_available:
             return None
         
-        try:
-            # Only try ffprobe for local files
-            if video_url.startswith('http://') or video_url.startswith('https://'):
-                return None
-            
-            video_path = Path(video_url)
-            if not video_path.exists():
-                return None
-            
-            # Use ffprobe to get duration
-            cmd = [
-                'ffprobe',
-                '-v', 'error',
-                '-show_entries', 'format=duration',
-                '-of', 'default=noprint_wrappers=1:nokey=1',
-                str(video_path)
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-            
-            if result.returncode == 0 and result.stdout.strip():
-                duration_seconds = float(result.stdout.strip())
-                duration_minutes = int(duration_seconds / 60)
-                return duration_minutes if duration_minutes > 0 else 1
-            
-        except (subprocess.TimeoutExpired, subprocess.SubprocessError, ValueError, FileNotFoundError):
-            pass
-        
-        return None
+        duration_seconds = get_media_probe().duration(video_url)
+        if duration_seconds is None:
+            return None
+        duration_minutes = int(duration_seconds / 60)
+        return duration_minutes if duration_minutes > 0 else 1
     
     def extract_segment_markers(self, video_url, interval_seconds=300):
         """
@@ -283,215 +408,121 @@ class NexusTVPageGenerator:
         if not self.ffprobe_available:
             return []
         
-        try:
-            if not (video_url.startswith('http://') or video_url.startswith('https://')):
-                video_path = Path(video_url)
-                if not video_path.exists():
-                    return []
-                
-                # Get keyframe timestamps
-                cmd = [
-                    'ffprobe',
-                    '-v', 'error',
-                    '-select_streams', 'v:0',
-                    '-show_entries', 'frame=pts_time,pict_type',
-                    '-of', 'csv=p=0',
-                    str(video_path)
-                ]
-                
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-                
-                if result.returncode == 0:
-                    markers = []
-                    for line in result.stdout.strip().split('\n'):
-                        parts = line.split(',')
-                        if len(parts) == 2 and parts[1] == 'I':
-                            try:
-                                timestamp = float(parts[0])
-                                if timestamp > 0 and timestamp % interval_seconds < 10:
-                                    markers.append(int(timestamp))
-                            except ValueError:
-                                continue
-                    return markers[:10]
-        
-        except (subprocess.TimeoutExpired, subprocess.SubprocessError, FileNotFoundError):
-            pass
-        
-        return []
+        info = get_media_probe().probe(video_url, keyframes=True)
+        if not info:
+            return []
         
+        markers = [int(timestamp) for timestamp in info.get('keyframes') or []
+                   if timestamp > 0 and timestamp % interval_seconds < 10]
+        return markers[:10]
+    
     def parse_m3u_to_schedule(self, m3u_content, channel_name="Channel", use_ffmpeg=False):
         """Parse M3U content and convert to NEXUS TV schedule format"""
-        lines = m3u_content.strip().split('\n')
         schedule = []
         current_time = datetime.strptime("00:00", "%H:%M")
+        day_end = datetime.strptime("23:59", "%H:%M")
         default_duration = 30  # minutes
         
-        current_entry = {}
+        entries = parse_playlist(m3u_content)
+        probe_ahead = 0
         
-        for line in lines:
-            line = line.strip()
+        for index, entry in enumerate(entries):
+            line = entry.url
             
-            if line.startswith('#EXTINF'):
-                # Parse channel info
-                logo_match = re.search(r'tvg-logo="([^"]*)"', line)
-                name_match = re.search(r',(.+)$', line)
-                
-                raw_title = name_match.group(1).strip() if name_match else 'Unknown'
-                title = clean_title(raw_title)
-                if logo_match and logo_match.group(1):
-                    logo = logo_match.group(1)
-                else:
-                    # No logo available - use empty string for offline compatibility
-                    logo = ""
-                
-                current_entry = {
-                    'title': title,
-                    'logo': logo,
-                    'video': '',
-                    'start_time': current_time.strftime("%H:%M"),
-                    'end_time': ''
-                }
-                
-            elif line and not line.startswith('#'):
-                # This is the video URL
-                if current_entry:
-                    current_entry['video'] = line
-                    
-                    # Try to extract accurate duration using FFmpeg if enabled
-                    duration = default_duration
-                    if use_ffmpeg:
-                        extracted_duration = self.extract_video_duration(line)
-                        if extracted_duration:
-                            duration = extracted_duration
-                            current_entry['duration_seconds'] = duration * 60
-                    
-                    # Calculate end time
-                    end_time = current_time + timedelta(minutes=duration)
-                    if end_time.day > current_time.day:
-                        end_time = datetime.strptime("23:59", "%H:%M")
-                    
-                    current_entry['end_time'] = end_time.strftime("%H:%M")
-                    
-                    # Extract segment markers if FFmpeg is enabled
-                    if use_ffmpeg:
-                        markers = self.extract_segment_markers(line)
-                        if markers:
-                            current_entry['segment_markers'] = markers
-                    
-                    schedule.append(current_entry)
-                    
-                    # Move to next slot
-                    current_time = end_time
-                    if current_time >= datetime.strptime("23:59", "%H:%M"):
-                        break
-                    
-                    current_entry = {}
+            # Probe upcoming local files concurrently; the schedule stops at
+            # 23:59, so only probe a window ahead rather than the whole playlist
+            if use_ffmpeg and self.ffprobe_available and index >= probe_ahead:
+                probe_ahead = index + 32
+                get_media_probe().probe_many(
+                    [e.url for e in entries[index:probe_ahead] if not is_remote(e.url)], keyframes=True)
+            
+            current_entry = {
+                'title': clean_title(entry.title),
+                # No logo available - use empty string for offline compatibility
+                'logo': entry.attrs.get('tvg-logo', ''),
+                'video': line,
+                'start_time': current_time.strftime("%H:%M"),
+                'end_time': ''
+            }
+            
+            # Try to extract accurate duration using FFmpeg if enabled
+            duration = default_duration
+            if use_ffmpeg:
+                extracted_duration = self.extract_video_duration(line)
+                if extracted_duration:
+                    duration = extracted_duration
+                    current_entry['duration_seconds'] = duration * 60
+            
+            # Calculate end time
+            end_time = current_time + timedelta(minutes=duration)
+            if end_time.day > current_time.day:
+                end_time = day_end
+            
+            current_entry['end_time'] = end_time.strftime("%H:%M")
+            
+            # Extract segment markers if FFmpeg is enabled
+            if use_ffmpeg:
+                markers = self.extract_segment_markers(line)
+                if markers:
+                    current_entry['segment_markers'] = markers
+            
+            schedule.append(current_entry)
+            
+            # Move to next slot
+            current_time = end_time
+            if current_time >= day_end:
+                break
         
         return schedule
     
-    def generate_page(self, m3u_content, channel_name, output_filename=None):
-        """Generate a NEXUS TV page from M3U content"""
+    def generate_page(self, m3u_content, channel_name, output_filename=None, asset_mode='inline',
+                      data_mode='inline', shard_size=DEFAULT_SHARD_SIZE):
+        """
+        Generate a NEXUS TV page from M3U content
+        
+        asset_mode 'inline' embeds HLS.js/DASH.js/Thumbnail System in the page;
+        'external' references shared copies in generated_pages/assets/
+        
+        data_mode 'inline' embeds the whole schedule and channel list; 'sharded'
+        embeds the first shard_size records of each and writes the rest to
+        data/ shard files next to the page, loaded after first paint
+        """
+        if data_mode not in DATA_MODES:
+            raise ValueError(f"Unknown data mode: {data_mode} (expected one of {', '.join(DATA_MODES)})")
+        
         if not self.template_path.exists():
             raise FileNotFoundError(f"Template not found: {self.template_path}")
         
-        # Read template
-        with open(self.template_path, 'r', encoding='utf-8') as f:
-            template = f.read()
+        # Template and libraries are read and split once per process
+        template = get_template(self.template_path, NEXUS_TV_PLACEHOLDERS, prepare=prepare_nexus_template)
         
         # Embed HLS.js, DASH.js, and Thumbnail System libraries inline for offline support
         libs_path = Path(__file__).resolve().parent.parent / "templates" / "web-iptv-extension" / "js" / "libs"
         templates_path = Path(__file__).resolve().parent.parent / "templates"
         
-        # Read HLS.js (required for offline support)
+        # HLS.js (required for offline support)
         hls_js_path = libs_path / "hls.min.js"
         if not hls_js_path.exists():
             raise FileNotFoundError(f"HLS.js library required for offline support not found at: {hls_js_path}")
         
-        with open(hls_js_path, 'r', encoding='utf-8') as f:
-            hls_js_content = f.read()
-        template = template.replace('// PLACEHOLDER_HLS_JS', hls_js_content)
-        
-        # Read DASH.js (required for offline support)
+        # DASH.js (required for offline support)
         dash_js_path = libs_path / "dash.all.min.js"
         if not dash_js_path.exists():
             raise FileNotFoundError(f"DASH.js library required for offline support not found at: {dash_js_path}")
         
-        with open(dash_js_path, 'r', encoding='utf-8') as f:
-            dash_js_content = f.read()
-        template = template.replace('// PLACEHOLDER_DASH_JS', dash_js_content)
-        
-        # Read Thumbnail System (required for auto-screenshot feature)
+        # Thumbnail System (required for auto-screenshot feature)
         thumbnail_js_path = templates_path / "thumbnail-system.js"
         if not thumbnail_js_path.exists():
             raise FileNotFoundError(f"Thumbnail system required for auto-screenshot feature not found at: {thumbnail_js_path}")
         
-        with open(thumbnail_js_path, 'r', encoding='utf-8') as f:
-            thumbnail_js_content = f.read()
-        template = template.replace('// PLACEHOLDER_THUMBNAIL_SYSTEM_JS', thumbnail_js_content)
-        
         # Parse M3U to schedule
         schedule = self.parse_m3u_to_schedule(m3u_content, channel_name)
         
         if not schedule:
             raise ValueError("No valid entries found in M3U content")
         
-        # Convert schedule to JavaScript array with proper escaping
-        schedule_js = json.dumps(schedule, indent=12, ensure_ascii=False)
-        
-        # Sanitize any potential HTML/JS breaking characters
-        schedule_js = schedule_js.replace('</script>', '<\\/script>')
-        
-        # Find and replace the schedule_data array
-        # Split at the marker and rebuild to ensure clean replacement
-        start_marker = 'let schedule_data = ['
-        end_marker = '];'
-        
-        start_idx = template.find(start_marker)
-        if start_idx == -1:
-            raise ValueError("Template does not contain 'let schedule_data = [' marker")
-        
-        # Find the closing bracket and semicolon
-        # Count brackets to handle nested arrays
-        bracket_count = 0
-        search_start = start_idx + len(start_marker) - 1  # -1 to include the opening [
-        end_idx = -1
-        
-        for i in range(search_start, len(template)):
-            if template[i] == '[':
-                bracket_count += 1
-            elif template[i] == ']':
-                bracket_count -= 1
-                if bracket_count == 0:
-                    # Found the matching closing bracket
-                    if i + 1 < len(template) and template[i + 1] == ';':
-                        end_idx = i + 2  # Include the semicolon
-                        break
-        
-        if end_idx == -1:
-            raise ValueError("Could not find matching end of schedule_data array")
-        
-        # Rebuild the HTML with new schedule data
-        modified_html = (
-            template[:start_idx] +
-            f'let schedule_data = {schedule_js};' +
-            template[end_idx:]
-        )
-        
-        # Update channel name in title and display
-        modified_html = modified_html.replace(
-            '<title>NEXUS TV - Classic Movies Channel</title>',
-            f'<title>NEXUS TV - {channel_name}</title>'
-        )
-        
         # Extract channels for embedded data (offline support)
         embedded_channels = self.parse_m3u_to_channels_simple(m3u_content)
-        channels_json = json.dumps(embedded_channels, indent=2, ensure_ascii=False)
-        modified_html = modified_html.replace('{{EMBEDDED_CHANNELS}}', channels_json)
-        
-        # Replace HUB_LINK with correct relative path
-        # Since nexus_tv pages are in generated_pages/nexus_tv/[channel]/player.html
-        # They need to go back two levels to reach index.html
-        modified_html = modified_html.replace('{{HUB_LINK}}', '../../index.html')
         
         # Create output directory structure
         output_name = output_filename if output_filename else channel_name
@@ -499,11 +530,41 @@ class NexusTVPageGenerator:
         page_dir = self.output_dir / safe_name
         page_dir.mkdir(exist_ok=True)
         
+        if data_mode == 'sharded':
+            first_schedule, schedule_index = write_shards(schedule, page_dir, 'schedule', shard_size)
+            first_channels, channels_index = write_shards(embedded_channels, page_dir, 'channels', shard_size)
+            schedule_data = f'let schedule_data = {data_expression("schedule", first_schedule)};'
+            channels_json = data_expression('channels', first_channels)
+            body_end = shard_loader_script({'schedule': schedule_index, 'channels': channels_index}) + '\n'
+        else:
+            # Convert schedule to JavaScript array with proper escaping
+            schedule_js = json.dumps(schedule, indent=12, ensure_ascii=False)
+            
+            # Sanitize any potential HTML/JS breaking characters
+            schedule_js = schedule_js.replace('</script>', '<\\/script>')
+            schedule_data = f'let schedule_data = {schedule_js};'
+            channels_json = json.dumps(embedded_channels, indent=2, ensure_ascii=False)
+            body_end = ''
+        
+        modified_html = template.render({
+            **library_values({
+                '// PLACEHOLDER_HLS_JS': hls_js_path,
+                '// PLACEHOLDER_DASH_JS': dash_js_path,
+                '// PLACEHOLDER_THUMBNAIL_SYSTEM_JS': thumbnail_js_path,
+            }, asset_mode, page_dir, get_pages_dir()),
+            SCHEDULE_DATA_PLACEHOLDER: schedule_data,
+            '<title>NEXUS TV - Classic Movies Channel</title>': f'<title>NEXUS TV - {channel_name}</title>',
+            '{{EMBEDDED_CHANNELS}}': channels_json,
+            # nexus_tv pages are in generated_pages/nexus_tv/[channel]/player.html,
+            # two levels below index.html
+            '{{HUB_LINK}}': '../../index.html',
+            BODY_END_PLACEHOLDER: body_end
+        })
+        
         output_path = page_dir / "player.html"
         
         # Write generated page
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(modified_html)
+        write_atomic(output_path, modified_html)
         
         return output_path
     
@@ -797,272 +858,6 @@ class NexusTVPageGenerator:
         
         return selector_path
 
-class WebIPTVGenerator:
-    """
-    Web-IPTV-Extension Page Generator
-    Generates a Web IPTV player with channel list from M3U playlists
-    """
-    def __init__(self, template_path=None):
-        if template_path is None:
-            template_path = Path(__file__).resolve().parent.parent / "templates" / "web-iptv-extension"
-        self.template_dir = Path(template_path)
-        
-        # Use OutputManager for organized directory structure
-        try:
-            from output_manager import get_output_manager
-            manager = get_output_manager()
-            self.output_dir = manager.get_page_output_dir('web_iptv')
-        except ImportError:
-            # Fallback if OutputManager not available
-            self.output_dir = Path("M3U_Matrix_Output") / "generated_pages" / "web_iptv"
-            self.output_dir.mkdir(exist_ok=True, parents=True)
-    
-    def parse_m3u_to_channels(self, m3u_content):
-        """Parse M3U content and extract channel information"""
-        channels = []
-        lines = m3u_content.strip().split('\n')
-        current_channel = {}
-        
-        for line in lines:
-            line = line.strip()
-            
-            if line.startswith('#EXTINF'):
-                # Extract channel info
-                name_match = re.search(r'tvg-name="([^"]*)"', line)
-                logo_match = re.search(r'tvg-logo="([^"]*)"', line)
-                title_match = re.search(r',(.+)$', line)
-                
-                raw_name = name_match.group(1) if name_match else (title_match.group(1) if title_match else 'Unknown')
-                current_channel = {
-                    'name': clean_title(raw_name),
-                    'logo': logo_match.group(1) if logo_match else '',
-                    'url': ''
-                }
-            elif line and not line.startswith('#') and current_channel.get('name'):
-                current_channel['url'] = line
-                channels.append({**current_channel})
-                current_channel = {}
-        
-        return channels
-    
-    def generate_page(self, m3u_content, channel_name, output_filename=None):
-        """
-        Generate a Web IPTV player page from M3U content
-        
-        Args:
-            m3u_content: M3U playlist content as string
-            channel_name: Name for the channel/playlist
-            output_filename: Optional custom filename (defaults to channel_name)
-        
-        Returns:
-            Path to the generated player HTML file
-        """
-        # Parse channels
-        channels = self.parse_m3u_to_channels(m3u_content)
-        
-        if not channels:
-            raise ValueError("No valid channels found in M3U content")
-        
-        # Use channel_name as folder name if no custom filename specified
-        output_name = output_filename if output_filename else channel_name
-        
-        # Create output directory with sanitized name
-        safe_dir_name = sanitize_directory_name(output_name)
-        page_dir = self.output_dir / safe_dir_name
-        page_dir.mkdir(exist_ok=True)
-        
-        # Copy template files
-        import shutil
-        
-        # Copy CSS
-        css_dir = page_dir / "css"
-        css_dir.mkdir(exist_ok=True)
-        if (self.template_dir / "css" / "styles.css").exists():
-            shutil.copy(self.template_dir / "css" / "styles.css", css_dir / "styles.css")
-        
-        # Copy JS
-        js_dir = page_dir / "js"
-        js_dir.mkdir(exist_ok=True)
-        if (self.template_dir / "js" / "app.js").exists():
-            shutil.copy(self.template_dir / "js" / "app.js", js_dir / "app.js")
-        
-        # Copy JS libraries (HLS.js, DASH.js, Feather, Thumbnail System, etc) for offline use
-        libs_dir = js_dir / "libs"
-        libs_dir.mkdir(exist_ok=True)
-        if (self.template_dir / "js" / "libs").exists():
-            for lib_file in (self.template_dir / "js" / "libs").glob("*.js"):
-                shutil.copy(lib_file, libs_dir / lib_file.name)
-        
-        # Copy thumbnail-system.js from templates root
-        thumbnail_system_src = Path(__file__).resolve().parent.parent / "templates" / "thumbnail-system.js"
-        if thumbnail_system_src.exists():
-            shutil.copy(thumbnail_system_src, libs_dir / "thumbnail-system.js")
-        
-        # Copy icons if they exist
-        icons_dir = page_dir / "icons"
-        icons_dir.mkdir(exist_ok=True)
-        if (self.template_dir / "icons").exists():
-            for icon_file in (self.template_dir / "icons").glob("*.png"):
-                shutil.copy(icon_file, icons_dir / icon_file.name)
-        
-        # Generate channel list HTML
-        channel_html = ""
-        for i, channel in enumerate(channels):
-            channel_html += f'''
-                <div class="channel-item" data-index="{i}">
-                    <div class="channel-name">{channel['name']}</div>
-                    <div class="channel-url">{channel['url'][:50]}...</div>
-                </div>
-            '''
-        
-        # Read template
-        template_file = self.template_dir / "player.html"
-        if not template_file.exists():
-            raise FileNotFoundError(f"Template not found: {template_file}")
-        
-        with open(template_file, 'r', encoding='utf-8') as f:
-            template_html = f.read()
-        
-        # Inject channel data into template
-        # Use cleaned channel data (JSON) instead of raw M3U to preserve clean titles
-        channels_json = json.dumps(channels, ensure_ascii=False)
-        output_html = template_html.replace('__CHANNEL_DATA__', channels_json)
-        
-        # Write output file
-        output_file = page_dir / "player.html"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(output_html)
-        
-        # Copy manifest and background.js for Chrome extension
-        for file_name in ["manifest.json", "background.js"]:
-            src_file = self.template_dir / file_name
-            if src_file.exists():
-                shutil.copy(src_file, page_dir / file_name)
-        
-        return output_file
-    
-    def generate_selector_page(self, generated_pages):
-        """
-        Generate a selector/index page listing all generated players
-        
-        Args:
-            generated_pages: List of dicts with 'name' and 'file' keys
-        
-        Returns:
-            Path to the selector HTML file
-        """
-        selector_html = '''<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <meta http-equiv="Content-Security-Policy" content="default-src 'self' data:; script-src 'self' 'unsafe-inline'; style-src 'self' 'unsafe-inline'; font-src 'self' data:; img-src * data: blob:; media-src *; connect-src *;">
-    <title>Web IPTV Player - Channel Selector</title>
-    <style>
-        * { margin: 0; padding: 0; box-sizing: border-box; }
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            padding: 40px 20px;
-        }
-        .container {
-            max-width: 1200px;
-            margin: 0 auto;
-        }
-        h1 {
-            color: #fff;
-            text-align: center;
-            margin-bottom: 40px;
-            font-size: 2.5rem;
-        }
-        .grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fill, minmax(300px, 1fr));
-            gap: 24px;
-        }
-        .card {
-            background: #fff;
-            border-radius: 12px;
-            padding: 24px;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.2);
-            transition: transform 0.3s;
-        }
-        .card:hover {
-            transform: translateY(-5px);
-        }
-        .card h2 {
-            color: #333;
-            margin-bottom: 12px;
-        }
-        .card p {
-            color: #666;
-            margin-bottom: 16px;
-        }
-        .btn {
-            display: inline-block;
-            background: #667eea;
-            color: #fff;
-            padding: 12px 24px;
-            border-radius: 6px;
-            text-decoration: none;
-            transition: background 0.3s;
-        }
-        .btn:hover {
-            background: #5568d3;
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>🎬 Web IPTV Player</h1>
-        <div class="grid" id="grid"></div>
-    </div>
-    <script>
-        const channels = ''' + json.dumps([
-            {
-                'name': page['name'],
-                'file': page['file'],
-                'channels': page.get('channels', 0)
-            } for page in generated_pages
-        ], indent=12) + ''';
-        
-        const grid = document.getElementById('grid');
-        channels.forEach(channel => {
-            const card = document.createElement('div');
-            card.className = 'card';
-            
-            // Create h2 for channel name
-            const h2 = document.createElement('h2');
-            h2.textContent = channel.name;
-            
-            // Create p for channel info
-            const p = document.createElement('p');
-            p.textContent = channel.channels + ' channels available';
-            
-            // Create watch button
-            const btn = document.createElement('a');
-            btn.href = channel.file;
-            btn.className = 'btn';
-            btn.textContent = 'Watch Now';
-            
-            // Append all elements to card
-            card.appendChild(h2);
-            card.appendChild(p);
-            card.appendChild(btn);
-            
-            grid.appendChild(card);
-        });
-    </script>
-</body>
-</html>'''
-        
-        selector_path = self.output_dir / "index.html"
-        with open(selector_path, 'w', encoding='utf-8') as f:
-            f.write(selector_html)
-        
-        return selector_path
-
 class SimplePlayerGenerator:
     """
     Simple Player Generator
@@ -1085,32 +880,12 @@ class SimplePlayerGenerator:
     
     def parse_m3u_to_channels(self, m3u_content):
         """Parse M3U content and extract channel information with group support"""
-        channels = []
-        lines = m3u_content.strip().split('\n')
-        current_channel = {}
-        
-        for line in lines:
-            line = line.strip()
-            
-            if line.startswith('#EXTINF'):
-                name_match = re.search(r'tvg-name="([^"]*)"', line)
-                logo_match = re.search(r'tvg-logo="([^"]*)"', line)
-                group_match = re.search(r'group-title="([^"]*)"', line)
-                title_match = re.search(r',(.+)$', line)
-                
-                raw_name = name_match.group(1) if name_match else (title_match.group(1) if title_match else 'Unknown')
-                current_channel = {
-                    'name': clean_title(raw_name),
-                    'logo': logo_match.group(1) if logo_match else '',
-                    'group': group_match.group(1) if group_match else 'Uncategorized',
-                    'url': ''
-                }
-            elif line and not line.startswith('#') and current_channel.get('name'):
-                current_channel['url'] = line
-                channels.append({**current_channel})
-                current_channel = {}
-        
-        return channels
+        return [{
+            'name': entry_name(entry),
+            'logo': entry.attrs.get('tvg-logo', ''),
+            'group': entry.attrs.get('group-title', 'Uncategorized'),
+            'url': entry.url
+        } for entry in parse_playlist(m3u_content)]
     
     def generate_page(self, m3u_content, channel_name, output_filename=None):
         """
@@ -1137,46 +912,45 @@ class SimplePlayerGenerator:
         # Copy CSS
         css_dir = page_dir / "css"
         css_dir.mkdir(exist_ok=True)
-        if (self.template_dir / "css" / "styles.css").exists():
-            shutil.copy(self.template_dir / "css" / "styles.css", css_dir / "styles.css")
+        copy_side_file(self.template_dir / "css" / "styles.css", css_dir / "styles.css")
         
         # Copy JS
         js_dir = page_dir / "js"
         js_dir.mkdir(exist_ok=True)
-        if (self.template_dir / "js" / "app.js").exists():
-            shutil.copy(self.template_dir / "js" / "app.js", js_dir / "app.js")
+        copy_side_file(self.template_dir / "js" / "app.js", js_dir / "app.js")
         
         # Copy JS libraries (HLS.js, DASH.js, Feather, Thumbnail System, etc) for offline use
         libs_dir = js_dir / "libs"
         libs_dir.mkdir(exist_ok=True)
+        # (the directory is a dependency too, so adding or removing a library rebuilds the page)
+        record_dependency(self.template_dir / "js" / "libs")
         if (self.template_dir / "js" / "libs").exists():
             for lib_file in (self.template_dir / "js" / "libs").glob("*.js"):
-                shutil.copy(lib_file, libs_dir / lib_file.name)
+                copy_side_file(lib_file, libs_dir / lib_file.name)
         
         # Copy thumbnail-system.js from templates root
         thumbnail_system_src = Path(__file__).resolve().parent.parent / "templates" / "thumbnail-system.js"
-        if thumbnail_system_src.exists():
-            shutil.copy(thumbnail_system_src, libs_dir / "thumbnail-system.js")
+        copy_side_file(thumbnail_system_src, libs_dir / "thumbnail-system.js")
         
         # Read template
         template_file = self.template_dir / "player.html"
         if not template_file.exists():
             raise FileNotFoundError(f"Template not found: {template_file}")
         
-        with open(template_file, 'r', encoding='utf-8') as f:
-            html_content = f.read()
+        template = get_template(template_file, (
+            '__PLAYLIST_NAME__', "window.PLAYLIST_DATA = '__PLAYLIST_JSON__';"))
         
         # Replace placeholders
         channels_data = {'channels': channels}
         channels_json = json.dumps(channels_data, ensure_ascii=False)
-        html_content = html_content.replace('__PLAYLIST_NAME__', channel_name)
-        html_content = html_content.replace("window.PLAYLIST_DATA = '__PLAYLIST_JSON__';", 
-                                           f"window.PLAYLIST_DATA = {channels_json};")
+        html_content = template.render({
+            '__PLAYLIST_NAME__': channel_name,
+            "window.PLAYLIST_DATA = '__PLAYLIST_JSON__';": f"window.PLAYLIST_DATA = {channels_json};"
+        })
         
         # Write output
         output_path = page_dir / "player.html"
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        write_atomic(output_path, html_content)
         
         return output_path
     
@@ -1403,23 +1177,23 @@ class RumbleChannelGenerator:
             playlist_data.append(video_entry)
         
         # Read template
-        with open(self.template_path, 'r', encoding='utf-8') as f:
-            template = f.read()
+        template = get_template(self.template_path, ('{PAGE_TITLE}', '{TOTAL_VIDEOS}', '{PLAYLIST_JSON}'))
         
         # Replace placeholders with proper escaping
         # Escape HTML in page title
         safe_title = page_name.replace('_', ' ').title().replace('<', '&lt;').replace('>', '&gt;')
-        html_content = template.replace('{PAGE_TITLE}', safe_title)
-        html_content = html_content.replace('{TOTAL_VIDEOS}', str(len(playlist_data)))
         
         # Safely embed JSON - escape </script> to prevent script breakout
         playlist_json = json.dumps(playlist_data, indent=2).replace('</script>', '<\\/script>')
-        html_content = html_content.replace('{PLAYLIST_JSON}', playlist_json)
+        html_content = template.render({
+            '{PAGE_TITLE}': safe_title,
+            '{TOTAL_VIDEOS}': str(len(playlist_data)),
+            '{PLAYLIST_JSON}': playlist_json
+        })
         
         # Write HTML file
         html_path = page_folder / f"{page_name}.html"
-        with open(html_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        write_atomic(html_path, html_content)
         
         # Create README
         readme_path = page_folder / "README.txt"
@@ -1621,35 +1395,37 @@ class MultiChannelGenerator:
             }
             playlist_data.append(video_entry)
         
+        # Channel count <option>s, keyed by count
+        count_options = {
+            count: f'value="{count}">{count} Channel{"" if count == 1 else "s"}</option>'
+            for count in (1, 2, 3, 4, 6)
+        }
+        
         # Read template
-        with open(self.template_path, 'r', encoding='utf-8') as f:
-            template = f.read()
+        template = get_template(self.template_path, (
+            '{PAGE_TITLE}', '{TOTAL_CHANNELS}', '{PLAYLIST_JSON}', *count_options.values()))
         
         # Replace placeholders with proper escaping
         safe_title = page_name.replace('_', ' ').title().replace('<', '&lt;').replace('>', '&gt;')
-        html_content = template.replace('{PAGE_TITLE}', safe_title)
-        html_content = html_content.replace('{TOTAL_CHANNELS}', str(len(playlist_data)))
         
         # Safely embed JSON - escape </script> to prevent script breakout
         playlist_json = json.dumps(playlist_data, indent=2).replace('</script>', '<\\/script>')
-        html_content = html_content.replace('{PLAYLIST_JSON}', playlist_json)
+        
+        values = {
+            '{PAGE_TITLE}': safe_title,
+            '{TOTAL_CHANNELS}': str(len(playlist_data)),
+            '{PLAYLIST_JSON}': playlist_json
+        }
         
         # Set default channel count
-        html_content = html_content.replace('value="1">1 Channel</option>', 
-                                           f'value="1"{"selected" if default_channel_count==1 else ""}>1 Channel</option>')
-        html_content = html_content.replace('value="2">2 Channels</option>', 
-                                           f'value="2"{"selected" if default_channel_count==2 else ""}>2 Channels</option>')
-        html_content = html_content.replace('value="3">3 Channels</option>', 
-                                           f'value="3"{"selected" if default_channel_count==3 else ""}>3 Channels</option>')
-        html_content = html_content.replace('value="4">4 Channels</option>', 
-                                           f'value="4"{"selected" if default_channel_count==4 else ""}>4 Channels</option>')
-        html_content = html_content.replace('value="6">6 Channels</option>', 
-                                           f'value="6"{"selected" if default_channel_count==6 else ""}>6 Channels</option>')
+        for count, option in count_options.items():
+            values[option] = option.replace('">', f'"{"selected" if default_channel_count == count else ""}>', 1)
+        
+        html_content = template.render(values)
         
         # Write HTML file
         html_path = page_folder / f"{page_name}.html"
-        with open(html_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        write_atomic(html_path, html_content)
         
         # Create README
         readme_path = page_folder / "README.txt"
@@ -1810,142 +1586,6 @@ The active channel has a green border and glowing effect.
         return selector_path
 
 
-class BufferTVGenerator:
-    """
-    Buffer TV Generator
-    Generates TV player pages with buffering controls and numeric keypad
-    """
-    def __init__(self, template_path=None):
-        if template_path is None:
-            template_path = Path(__file__).resolve().parent.parent / "Web_Players" / "buffer_tv.html"
-        self.template_path = Path(template_path)
-        
-        # Use OutputManager for organized directory structure
-        try:
-            from output_manager import get_output_manager
-            manager = get_output_manager()
-            self.output_dir = manager.get_page_output_dir('buffer_tv')
-        except ImportError:
-            # Fallback if OutputManager not available
-            self.output_dir = Path("M3U_Matrix_Output") / "generated_pages" / "buffer_tv"
-            self.output_dir.mkdir(exist_ok=True, parents=True)
-    
-    def parse_m3u_to_channels(self, m3u_content):
-        """Parse M3U content and extract channel information"""
-        channels = []
-        lines = m3u_content.strip().split('\n')
-        current_channel = {}
-        channel_number = 1
-        
-        for line in lines:
-            line = line.strip()
-            
-            if line.startswith('#EXTINF'):
-                name_match = re.search(r'tvg-name="([^"]*)"', line)
-                logo_match = re.search(r'tvg-logo="([^"]*)"', line)
-                group_match = re.search(r'group-title="([^"]*)"', line)
-                title_match = re.search(r',(.+)$', line)
-                
-                raw_name = name_match.group(1) if name_match else (title_match.group(1) if title_match else 'Unknown')
-                current_channel = {
-                    'number': channel_number,
-                    'name': clean_title(raw_name),
-                    'category': group_match.group(1) if group_match else 'General',
-                    'urls': []
-                }
-            elif line and not line.startswith('#') and current_channel.get('name'):
-                current_channel['urls'].append(line)
-                channels.append({**current_channel})
-                current_channel = {}
-                channel_number += 1
-        
-        return channels
-    
-    def generate_page(self, m3u_content, page_name="buffer_tv"):
-        """
-        Generate Buffer TV player page from M3U content
-        
-        Args:
-            m3u_content: M3U playlist content as string
-            page_name: Name for the generated page folder
-            
-        Returns:
-            Path to generated HTML file
-        """
-        channels = self.parse_m3u_to_channels(m3u_content)
-        
-        if not channels:
-            raise ValueError("No valid channels found in M3U content")
-        
-        # Create page folder
-        safe_dir_name = sanitize_directory_name(page_name)
-        page_folder = self.output_dir / safe_dir_name
-        page_folder.mkdir(exist_ok=True)
-        
-        # Read template
-        with open(self.template_path, 'r', encoding='utf-8') as f:
-            template = f.read()
-        
-        # Replace title placeholder
-        safe_title = page_name.replace('_', ' ').title().replace('<', '&lt;').replace('>', '&gt;')
-        html_content = template.replace('<title>TV Player with Improved Buffering</title>', 
-                                       f'<title>{safe_title}</title>')
-        
-        # Safely embed JSON - escape </script> to prevent script breakout
-        channels_json = json.dumps(channels, indent=16).replace('</script>', '<\\/script>')
-        html_content = html_content.replace('const channels = [];', 
-                                           f'const channels = {channels_json};')
-        
-        # Write HTML file
-        html_path = page_folder / f"{page_name}.html"
-        with open(html_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        
-        # Create README
-        readme_path = page_folder / "README.txt"
-        with open(readme_path, 'w', encoding='utf-8') as f:
-            f.write(f"""Buffer TV: {page_name}
-Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-
-This is a standalone TV player page with buffering controls.
-
-Channels Available: {len(channels)}
-
-Features:
-• HLS.js integration for m3u8 streams
-• Numeric keypad for channel selection (0-9, +10, +20)
-• Advanced buffering controls:
-  - Load timeout adjustment (5-30 seconds)
-  - Retry delay configuration (1-10 seconds)
-  - Real-time buffering indicator
-• TV Guide overlay with all channels
-• Quick channel categories (Movies, Entertainment, Documentary, Music)
-• Full video controls (play/pause, volume, seek, fullscreen)
-• Progress bar with time display
-• Previous/Next channel navigation
-• CORS proxy support for remote streams
-• Blue to red gradient design (#003366 to #990000)
-
-Controls:
-• Click TV Guide button to see all channels
-• Click Keypad button for numeric channel entry
-• Use +10 and +20 buttons to jump channels quickly
-• Adjust buffer settings in the control panel
-• Use Previous/Next buttons to surf channels
-
-To use:
-1. Open {page_name}.html in any modern web browser
-2. Use the TV Guide or keypad to select a channel
-3. Adjust buffer settings if streams are slow to load
-4. Use quick category buttons for instant channel access
-
-Note: Buffering controls help optimize streaming for your connection speed.
-The player automatically retries failed streams and moves to the next channel.
-""")
-        
-        return html_path
-
-
 class ClassicTVGenerator:
     """
     Classic TV Player Generator
@@ -1969,46 +1609,29 @@ class ClassicTVGenerator:
     def parse_m3u_to_channels(self, m3u_content):
         """Parse M3U content and extract channel data"""
         channels = []
-        lines = m3u_content.strip().split('\n')
-        
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
+        for entry in parse_playlist(m3u_content):
+            url = entry.url
             
-            if line.startswith('#EXTINF'):
-                # Extract channel info
-                channel = {}
-                
-                # Get channel name
-                name_match = re.search(r',(.+)$', line)
-                channel['name'] = clean_title(name_match.group(1)) if name_match else 'Unknown Channel'
-                
-                # Get logo from tvg-logo attribute
-                logo_match = re.search(r'tvg-logo="([^"]*)"', line)
-                channel['logo'] = logo_match.group(1) if logo_match else ''
-                
-                # Get next line as URL
-                if i + 1 < len(lines) and not lines[i + 1].startswith('#'):
-                    url = lines[i + 1].strip()
-                    channel['url'] = url
-                    
-                    # Determine stream type
-                    if '.m3u8' in url or 'hls' in url.lower():
-                        channel['type'] = 'hls'
-                    elif '.mpd' in url:
-                        channel['type'] = 'dash'
-                    else:
-                        channel['type'] = 'mp4'
-                    
-                    channels.append(channel)
-                    i += 1
+            # Determine stream type
+            if '.m3u8' in url or 'hls' in url.lower():
+                stream_type = 'hls'
+            elif '.mpd' in url:
+                stream_type = 'dash'
+            else:
+                stream_type = 'mp4'
             
-            i += 1
+            channels.append({
+                'name': clean_title(entry.title) if entry.title else 'Unknown Channel',
+                'logo': entry.attrs.get('tvg-logo', ''),
+                'url': url,
+                'type': stream_type
+            })
         
         return channels
     
-    def generate_page(self, m3u_content, page_name="classic_tv_player", playlist_title="Classic TV"):
-        """Generate Classic TV player page from M3U content"""
+    def generate_page(self, m3u_content, page_name="classic_tv_player", playlist_title="Classic TV",
+                      asset_mode='inline'):
+        """Generate Classic TV player page from M3U content (asset_mode: 'inline' or 'external' libraries)"""
         
         # Parse M3U to get channels
         channels = self.parse_m3u_to_channels(m3u_content)
@@ -2022,22 +1645,15 @@ class ClassicTVGenerator:
         page_folder.mkdir(exist_ok=True)
         
         # Read template
-        with open(self.template_path, 'r', encoding='utf-8') as f:
-            template = f.read()
-        
-        # Get HLS.js and DASH.js libraries
-        hls_js = ""
-        dash_js = ""
-        
-        hls_path = Path(__file__).resolve().parent.parent / "Web_Players" / "libs" / "hls.min.js"
-        if hls_path.exists():
-            with open(hls_path, 'r', encoding='utf-8') as f:
-                hls_js = f.read()
+        template = get_template(self.template_path, (
+            '{{PLAYLIST_TITLE}}', '{{HUB_LINK}}', '{{HLS_JS}}', '{{DASH_JS}}', '{{PLAYLIST_DATA}}'))
         
-        dash_path = Path(__file__).resolve().parent.parent / "Web_Players" / "libs" / "dash.all.min.js"
-        if dash_path.exists():
-            with open(dash_path, 'r', encoding='utf-8') as f:
-                dash_js = f.read()
+        # Get HLS.js and DASH.js libraries (empty if missing)
+        libs_path = Path(__file__).resolve().parent.parent / "Web_Players" / "libs"
+        libraries = library_values({
+            '{{HLS_JS}}': libs_path / "hls.min.js",
+            '{{DASH_JS}}': libs_path / "dash.all.min.js",
+        }, asset_mode, page_folder, get_pages_dir())
         
         # Build playlist data
         playlist_data = []
@@ -2059,16 +1675,16 @@ class ClassicTVGenerator:
             hub_link = "../index.html"
         
         # Replace placeholders
-        html = template.replace('{{PLAYLIST_TITLE}}', playlist_title)
-        html = html.replace('{{HUB_LINK}}', hub_link)
-        html = html.replace('{{HLS_JS}}', hls_js)
-        html = html.replace('{{DASH_JS}}', dash_js)
-        html = html.replace('{{PLAYLIST_DATA}}', json.dumps(playlist_data, indent=2))
+        html = template.render({
+            '{{PLAYLIST_TITLE}}': playlist_title,
+            '{{HUB_LINK}}': hub_link,
+            **libraries,
+            '{{PLAYLIST_DATA}}': json.dumps(playlist_data, indent=2)
+        })
         
         # Write the HTML file
         output_file = page_folder / "index.html"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(html)
+        write_atomic(output_file, html)
         
         print(f"""
 ✓ Classic TV Player Generated Successfully!
@@ -2123,36 +1739,13 @@ class StreamHubGenerator:
     
     def parse_m3u_to_channels(self, m3u_content):
         """Parse M3U content and extract channel information"""
-        channels = []
-        lines = m3u_content.strip().split('\n')
-        current_channel = {}
-        channel_number = 1
-        
-        for line in lines:
-            line = line.strip()
-            
-            if line.startswith('#EXTINF'):
-                name_match = re.search(r'tvg-name="([^"]*)"', line)
-                logo_match = re.search(r'tvg-logo="([^"]*)"', line)
-                group_match = re.search(r'group-title="([^"]*)"', line)
-                title_match = re.search(r',(.+)$', line)
-                
-                raw_name = name_match.group(1) if name_match else (title_match.group(1) if title_match else 'Unknown')
-                current_channel = {
-                    'number': channel_number,
-                    'name': clean_title(raw_name),
-                    'logo': logo_match.group(1) if logo_match else '',
-                    'group': group_match.group(1) if group_match else 'General'
-                }
-                channel_number += 1
-                
-            elif line and not line.startswith('#'):
-                if current_channel:
-                    current_channel['url'] = line
-                    channels.append(current_channel)
-                    current_channel = {}
-        
-        return channels
+        return [{
+            'number': number,
+            'name': entry_name(entry),
+            'logo': entry.attrs.get('tvg-logo', ''),
+            'group': entry.attrs.get('group-title', 'General'),
+            'url': entry.url
+        } for number, entry in enumerate(parse_playlist(m3u_content), 1)]
     
     def generate_page(self, m3u_content, page_name="Stream Hub Live"):
         """Generate a complete Stream Hub page from M3U content"""
@@ -2173,14 +1766,10 @@ class StreamHubGenerator:
         if not self.template_path.exists():
             raise FileNotFoundError(f"Template not found: {self.template_path}")
         
-        with open(self.template_path, 'r', encoding='utf-8') as f:
-            html_content = f.read()
+        template = get_template(self.template_path, ('{{page_name}}', '{{playlist_json}}'))
         
-        # Replace placeholders
+        # Replace placeholders (the <title> uses {{page_name}} too)
         safe_title = page_name.replace("'", "\\'")
-        html_content = html_content.replace('{{page_name}}', safe_title)
-        html_content = html_content.replace('<title>{{page_name}} - Stream Hub Live TV</title>',
-                                           f'<title>{safe_title} - Stream Hub Live TV</title>')
         
         # Create playlist JSON
         playlist_data = {
@@ -2192,12 +1781,14 @@ class StreamHubGenerator:
         
         # Safely embed JSON
         playlist_json = json.dumps(playlist_data, indent=4).replace('</script>', '<\\/script>')
-        html_content = html_content.replace('{{playlist_json}}', playlist_json)
+        html_content = template.render({
+            '{{page_name}}': safe_title,
+            '{{playlist_json}}': playlist_json
+        })
         
         # Write HTML file
         html_path = page_folder / f"{safe_name}.html"
-        with open(html_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        write_atomic(html_path, html_content)
         
         # Create README
         readme_path = page_folder / "README.txt"
@@ -2289,16 +1880,16 @@ class StandaloneSecurePageGenerator:
             self.output_dir.mkdir(exist_ok=True, parents=True)
         
         # Load HLS.js library for embedding
+        self.hls_library_path = Path(__file__).resolve().parent.parent / "templates" / "simple-player" / "js" / "libs" / "hls.min.js"
         self.hls_library = self._load_hls_library()
     
     def _load_hls_library(self):
         """Load HLS.js library content for embedding"""
         try:
             # Try to load HLS.js from templates directory
-            hls_path = Path(__file__).resolve().parent.parent / "templates" / "simple-player" / "js" / "libs" / "hls.min.js"
+            hls_path = self.hls_library_path
             if hls_path.exists():
-                with open(hls_path, 'r', encoding='utf-8') as f:
-                    return f.read()
+                return read_cached(hls_path)
             
             # Fallback: Use a minimal HLS.js placeholder
             return "/* HLS.js library will be embedded here */"
@@ -2308,36 +1899,15 @@ class StandaloneSecurePageGenerator:
     
     def parse_m3u_to_channels(self, m3u_content):
         """Parse M3U content and extract channel information without exposing URLs"""
-        channels = []
-        lines = m3u_content.strip().split('\n')
-        
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            
-            if line.startswith('#EXTINF:'):
-                # Parse channel info
-                name_match = re.search(r',(.+)$', line)
-                logo_match = re.search(r'tvg-logo="([^"]+)"', line)
-                group_match = re.search(r'group-title="([^"]+)"', line)
-                
-                channel = {
-                    'name': name_match.group(1) if name_match else 'Channel',
-                    'logo': logo_match.group(1) if logo_match else '',
-                    'group': group_match.group(1) if group_match else 'General'
-                }
-                
-                # Get URL from next line but store internally
-                i += 1
-                if i < len(lines) and not lines[i].startswith('#'):
-                    channel['_src'] = lines[i].strip()
-                    channels.append(channel)
-            
-            i += 1
-        
-        return channels
+        # URL is stored internally under '_src', never displayed
+        return [{
+            'name': entry.title or 'Channel',
+            'logo': entry.attrs.get('tvg-logo', ''),
+            'group': entry.attrs.get('group-title') or 'General',
+            '_src': entry.url
+        } for entry in parse_playlist(m3u_content)]
     
-    def generate_page(self, m3u_content, page_name="Secure Player", metadata=None):
+    def generate_page(self, m3u_content, page_name="Secure Player", metadata=None, asset_mode='inline'):
         """
         Generate a completely self-contained HTML page
         
@@ -2345,14 +1915,16 @@ class StandaloneSecurePageGenerator:
             m3u_content: M3U playlist content
             page_name: Name for the page
             metadata: Optional metadata dictionary
+            asset_mode: 'inline' embeds HLS.js; 'external' references the shared
+                copy in generated_pages/assets/ (the page is no longer self-contained)
         
         Returns:
             Path to generated HTML file
         """
         try:
             # Read template
-            with open(self.template_path, 'r', encoding='utf-8') as f:
-                template = f.read()
+            template = get_template(self.template_path, (
+                '{{PAGE_TITLE}}', '{{PLAYLIST_DATA}}', '{{HLS_LIBRARY}}', '{{METADATA}}'))
             
             # Parse channels
             channels = self.parse_m3u_to_channels(m3u_content)
@@ -2383,28 +1955,32 @@ class StandaloneSecurePageGenerator:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f"{safe_name}_{timestamp}.html"
             
-            # Replace placeholders in template
-            html_content = template.replace('{{PAGE_TITLE}}', page_name)
-            html_content = html_content.replace('{{PLAYLIST_DATA}}', encoded_playlist)
-            html_content = html_content.replace('{{HLS_LIBRARY}}', self.hls_library)
-            
-            # Add metadata if provided
-            if metadata:
-                meta_json = json.dumps(metadata, indent=2)
-                html_content = html_content.replace('{{METADATA}}', meta_json)
+            if asset_mode == 'inline':
+                hls_library = self.hls_library
             else:
-                html_content = html_content.replace('{{METADATA}}', '{}')
+                hls_library = library_values({'{{HLS_LIBRARY}}': self.hls_library_path}, asset_mode,
+                                             self.output_dir, get_pages_dir())['{{HLS_LIBRARY}}']
+            
+            # Replace placeholders in template (metadata if provided)
+            html_content = template.render({
+                '{{PAGE_TITLE}}': page_name,
+                '{{PLAYLIST_DATA}}': encoded_playlist,
+                '{{HLS_LIBRARY}}': hls_library,
+                '{{METADATA}}': json.dumps(metadata, indent=2) if metadata else '{}'
+            })
             
             # Write output file
             output_path = self.output_dir / filename
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
+            write_atomic(output_path, html_content)
             
             print(f"✅ Generated standalone secure page: {output_path}")
             print(f"   • {len(channels)} channels embedded")
             print(f"   • URLs hidden from display")
             print(f"   • 20% chunked loading enabled")
-            print(f"   • Completely self-contained (no external dependencies)")
+            if asset_mode == 'inline':
+                print(f"   • Completely self-contained (no external dependencies)")
+            else:
+                print("   • HLS.js loaded from the shared assets/ directory")
             
             # Create README for GitHub Pages
             self._create_github_pages_readme()
@@ -2499,35 +2075,12 @@ class WebIPTVGenerator:
     
     def parse_m3u_to_channels(self, m3u_content):
         """Parse M3U content and extract channel information"""
-        channels = []
-        lines = m3u_content.strip().split('\n')
-        current_channel = {}
-        
-        for line in lines:
-            line = line.strip()
-            
-            if line.startswith('#EXTINF'):
-                # Parse channel info
-                logo_match = re.search(r'tvg-logo="([^"]*)"', line)
-                name_match = re.search(r',(.+)$', line)
-                group_match = re.search(r'group-title="([^"]*)"', line)
-                
-                raw_title = name_match.group(1).strip() if name_match else 'Unknown'
-                current_channel = {
-                    'name': clean_title(raw_title),
-                    'logo': logo_match.group(1) if logo_match else '',
-                    'group': group_match.group(1) if group_match else 'General',
-                    'url': ''
-                }
-                
-            elif line and not line.startswith('#'):
-                # This is the video URL
-                if current_channel:
-                    current_channel['url'] = line
-                    channels.append(current_channel)
-                    current_channel = {}
-        
-        return channels
+        return [{
+            'name': clean_title(entry.title),
+            'logo': entry.attrs.get('tvg-logo', ''),
+            'group': entry.attrs.get('group-title', 'General'),
+            'url': entry.url
+        } for entry in parse_playlist(m3u_content)]
     
     def generate_page(self, m3u_content, channel_name, output_filename=None):
         """Generate a Web IPTV page from M3U content with inline data"""
@@ -2549,51 +2102,44 @@ class WebIPTVGenerator:
         css_dir = page_dir / "css"
         css_dir.mkdir(exist_ok=True)
         css_src = self.template_path.parent.parent / "templates" / "web-iptv-extension" / "css" / "styles.css"
-        if css_src.exists():
-            shutil.copy(css_src, css_dir / "styles.css")
+        copy_side_file(css_src, css_dir / "styles.css")
         
         # Copy JS
         js_dir = page_dir / "js"
         js_dir.mkdir(exist_ok=True)
         js_src = self.template_path.parent.parent / "templates" / "web-iptv-extension" / "js" / "app.js"
-        if js_src.exists():
-            shutil.copy(js_src, js_dir / "app.js")
+        copy_side_file(js_src, js_dir / "app.js")
         
         # Copy JS libs for offline support (HLS, DASH, Feather icons, Thumbnail System)
         libs_dir = js_dir / "libs"
         libs_dir.mkdir(exist_ok=True)
         libs_src = self.template_path.parent.parent / "templates" / "web-iptv-extension" / "js" / "libs"
+        record_dependency(libs_src)
         if libs_src.exists():
             for lib in libs_src.glob("*"):
                 if lib.is_file():
-                    shutil.copy(lib, libs_dir / lib.name)
+                    copy_side_file(lib, libs_dir / lib.name)
         
         # Copy thumbnail system from templates root
         thumbnail_system_src = Path(__file__).resolve().parent.parent / "templates" / "thumbnail-system.js"
-        if thumbnail_system_src.exists():
-            shutil.copy(thumbnail_system_src, libs_dir / "thumbnail-system.js")
+        copy_side_file(thumbnail_system_src, libs_dir / "thumbnail-system.js")
         
         # Read template
-        with open(self.template_path, 'r', encoding='utf-8') as f:
-            template = f.read()
-        
-        # Replace title
-        html_content = template.replace(
-            '<title>Web IPTV Player</title>',
-            f'<title>{channel_name} - Web IPTV Player</title>'
-        )
+        template = get_template(self.template_path, ('<title>Web IPTV Player</title>', '__CHANNEL_DATA__'))
         
         # CRITICAL: Inline channel data directly into HTML instead of separate JSON file
         channels_json = json.dumps({'channels': channels}, indent=2, ensure_ascii=False)
         channels_json = channels_json.replace('</script>', '<\\/script>')  # Escape for safety
         
-        # Replace the __CHANNEL_DATA__ placeholder with actual data
-        html_content = html_content.replace('__CHANNEL_DATA__', channels_json)
+        # Replace title and the __CHANNEL_DATA__ placeholder with actual data
+        html_content = template.render({
+            '<title>Web IPTV Player</title>': f'<title>{channel_name} - Web IPTV Player</title>',
+            '__CHANNEL_DATA__': channels_json
+        })
         
         # Write output
         output_path = page_dir / "player.html"
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        write_atomic(output_path, html_content)
         
         return output_path
 
@@ -2619,36 +2165,14 @@ class BufferTVGenerator:
     
     def parse_m3u_to_channels(self, m3u_content):
         """Parse M3U content and extract channel information"""
-        channels = []
-        lines = m3u_content.strip().split('\n')
-        current_channel = {}
-        
-        for line in lines:
-            line = line.strip()
-            
-            if line.startswith('#EXTINF'):
-                # Parse channel info
-                logo_match = re.search(r'tvg-logo="([^"]*)"', line)
-                name_match = re.search(r',(.+)$', line)
-                
-                raw_title = name_match.group(1).strip() if name_match else 'Unknown'
-                current_channel = {
-                    'name': clean_title(raw_title),
-                    'logo': logo_match.group(1) if logo_match else '',
-                    'url': ''
-                }
-                
-            elif line and not line.startswith('#'):
-                # This is the video URL
-                if current_channel:
-                    current_channel['url'] = line
-                    channels.append(current_channel)
-                    current_channel = {}
-        
-        return channels
+        return [{
+            'name': clean_title(entry.title),
+            'logo': entry.attrs.get('tvg-logo', ''),
+            'url': entry.url
+        } for entry in parse_playlist(m3u_content)]
     
-    def generate_page(self, m3u_content, channel_name, output_filename=None):
-        """Generate Buffer TV page with inline channel data"""
+    def generate_page(self, m3u_content, channel_name, output_filename=None, asset_mode='inline'):
+        """Generate Buffer TV page with inline channel data (asset_mode: 'inline' or 'external' HLS.js)"""
         if not self.template_path.exists():
             raise FileNotFoundError(f"Template not found: {self.template_path}")
         
@@ -2664,42 +2188,35 @@ class BufferTVGenerator:
         page_dir.mkdir(exist_ok=True)
         
         # Read template
-        with open(self.template_path, 'r', encoding='utf-8') as f:
-            template = f.read()
+        template = get_template(self.template_path, (
+            'let channels = [];', '<title>TV Player with Improved Buffering</title>', '</head>'))
         
         # CRITICAL: Inline channels data directly into the JavaScript
         channels_json = json.dumps(channels, indent=12, ensure_ascii=False)
         channels_json = channels_json.replace('</script>', '<\\/script>')  # Escape for safety
         
-        # Find and replace the empty channels array
-        # The template has: let channels = [];
-        template = template.replace(
-            'let channels = [];',
-            f'let channels = {channels_json};'
-        )
-        
-        # Update title
-        template = template.replace(
-            '<title>TV Player with Improved Buffering</title>',
-            f'<title>{channel_name} - Buffer TV</title>'
-        )
+        values = {
+            # The template has: let channels = [];
+            'let channels = [];': f'let channels = {channels_json};',
+            '<title>TV Player with Improved Buffering</title>': f'<title>{channel_name} - Buffer TV</title>'
+        }
         
         # Remove CDN dependencies and embed them inline for offline support
         # Read HLS.js library
         hls_path = Path(__file__).resolve().parent.parent / "templates" / "web-iptv-extension" / "js" / "libs" / "hls.min.js"
+        if asset_mode not in ASSET_MODES:
+            raise ValueError(f"Unknown asset mode: {asset_mode} (expected one of {', '.join(ASSET_MODES)})")
         if hls_path.exists():
-            with open(hls_path, 'r', encoding='utf-8') as f:
-                hls_js = f.read()
-            # Add HLS.js inline before the closing </head>
-            template = template.replace(
-                '</head>',
-                f'<script>\n{hls_js}\n</script>\n</head>'
-            )
+            if asset_mode == 'external':
+                bundle = get_asset_bundle(get_pages_dir())
+                values['</head>'] = f'{bundle.script_tags([hls_path], page_dir)}\n</head>'
+            else:
+                # Add HLS.js inline before the closing </head>
+                values['</head>'] = f'<script>\n{read_cached(hls_path)}\n</script>\n</head>'
         
         # Write output
         output_path = page_dir / f"{safe_name}.html"
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(template)
+        write_atomic(output_path, template.render(values))
         
         return output_path
 
@@ -5,13 +5,16 @@ M3U Parser - Handles parsing of M3U/M3U8 playlist files
 import re
 import logging
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from urllib.parse import unquote
 import requests
 from datetime import datetime
 
 # Import models - works with sys.path injection in Core_Modules
 from models.channel import Channel, ChannelDict, ChannelUtils
+from parsers.m3u_stream import M3UEntry, iter_m3u_entries
+from m3u_validation import download_and_cache_thumbnails
+from thumbnail_processor import ThumbnailProcessor, PILLOW_AVAILABLE
 
 
 class M3UParser:
@@ -43,63 +46,8 @@ class M3UParser:
         Returns:
             List of channel dictionaries
         """
-        channels = []
-        current_channel = None
-        custom_tags = {}
-        
         try:
-            lines = self._read_file_lines(file_path)
-            if not lines:
-                return []
-            
-            i = 0
-            while i < len(lines):
-                line = lines[i].strip()
-                
-                # Skip empty lines or M3U header
-                if not line or line == "#EXTM3U" or line == "#EXTMM3U":
-                    i += 1
-                    continue
-                
-                # Parse EXTINF line
-                if line.startswith("#EXTINF") or line.startswith("#EXTM:") or line.startswith("#EXTMM:"):
-                    current_channel = self._parse_extinf_line(line)
-                    
-                    # Check for EXTGRP on next line
-                    if i + 1 < len(lines) and lines[i + 1].startswith("#EXTGRP"):
-                        current_channel["group"] = lines[i + 1].split(":")[1].strip()
-                        i += 1
-                    i += 1
-                    continue
-                
-                # Parse custom tags
-                if line.startswith("#") and ":" in line and not line.startswith("#EXTINF"):
-                    tag_parts = line[1:].split(":", 1)
-                    if len(tag_parts) == 2:
-                        tag_name, tag_value = tag_parts
-                        custom_tags[tag_name.strip()] = tag_value.strip()
-                    i += 1
-                    continue
-                
-                # Process URL line
-                if current_channel and not line.startswith("#"):
-                    current_channel["url"] = line.strip()
-                    current_channel["custom_tags"] = custom_tags.copy()
-                    
-                    # Detect and enrich Rumble URLs
-                    rumble_info = self._detect_rumble_url(current_channel["url"])
-                    if rumble_info:
-                        self._enrich_rumble_channel(current_channel, rumble_info)
-                    
-                    # Add UUID if not present
-                    channel = ChannelUtils.validate_channel_dict(current_channel)
-                    channels.append(channel)
-                    
-                    current_channel = None
-                    custom_tags = {}
-                
-                i += 1
-            
+            channels = list(self.iter_file(file_path))
             self.logger.info(f"Parsed {len(channels)} channels from {Path(file_path).name}")
             return channels
             
@@ -107,47 +55,146 @@ class M3UParser:
             self.logger.error(f"Failed to parse M3U file {file_path}: {e}")
             return []
     
-    def _read_file_lines(self, file_path: str) -> List[str]:
+    def iter_file(self, file_path: str) -> Iterator[ChannelDict]:
         """
-        Read lines from a file with encoding detection.
+        Stream channels from an M3U file without reading it into memory.
         
         Args:
-            file_path: Path to the file
+            file_path: Path to the M3U file
+            
+        Yields:
+            Channel dictionaries in playlist order
+        """
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            for entry in iter_m3u_entries(f):
+                yield self._entry_to_channel(entry)
+    
+    def parse_content(self, content: str) -> List[ChannelDict]:
+        """
+        Parse M3U text already in memory.
+        
+        Args:
+            content: M3U playlist content
             
         Returns:
-            List of lines from the file
+            List of channel dictionaries
         """
-        try:
-            # Try UTF-8 first
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    return f.readlines()
-            except:
-                # Fallback to Latin-1
-                with open(file_path, 'r', encoding='latin-1') as f:
-                    return f.readlines()
-        except Exception as e:
-            self.logger.error(f"Cannot read file {file_path}: {e}")
-            return []
+        return [self._entry_to_channel(entry) for entry in iter_m3u_entries(content)]
+    
+    def cache_logos(self, channels: List[ChannelDict], progress=None) -> Dict[str, int]:
+        """
+        Download and cache channel logos in one batch.
+        
+        Each distinct logo URL is fetched once; channels whose logo was cached
+        get its local file in 'logo_path'.
+        
+        Args:
+            channels: Channel dictionaries (updated in place)
+            progress: Optional callback progress(done, total)
+            
+        Returns:
+            Dictionary with counts (cached, failed)
+        """
+        stats = {'cached': 0, 'failed': 0}
+        if not self.cache_thumbnails:
+            return stats
+        
+        urls = [ch.get('logo', '') for ch in channels
+                if ch.get('logo', '').startswith(('http://', 'https://'))]
+        results = download_and_cache_thumbnails(urls, self.thumbnails_dir / "channel_logos", progress=progress)
+        
+        for ch in channels:
+            if ch.get('logo', '') not in results:
+                continue
+            path, status = results[ch['logo']]
+            if path:
+                ch['logo_path'] = path
+                stats['cached'] += 1
+            else:
+                self.logger.debug(f"Logo not cached for {ch.get('name', 'Unknown')}: {status}")
+                stats['failed'] += 1
+        
+        return stats
     
-    def _parse_extinf_line(self, line: str) -> ChannelDict:
+    def build_thumbnails(self, channels: List[ChannelDict], workers: Optional[int] = None) -> Dict[str, int]:
         """
-        Parse an EXTINF line to extract channel attributes.
+        Create uniform thumbnails for channels.
+        
+        Cached logos (see cache_logos) are resized/transcoded; channels without
+        one get a placeholder drawn from name, group and number. The result is
+        stored in the channel's 'thumbnail'.
         
         Args:
-            line: The EXTINF line to parse
+            channels: Channel dictionaries (updated in place)
+            workers: Process pool size (1 renders in the calling process)
+            
+        Returns:
+            Dictionary with counts (logos, placeholders, failed)
+        """
+        stats = {'logos': 0, 'placeholders': 0, 'failed': 0}
+        if not self.cache_thumbnails or not PILLOW_AVAILABLE or not channels:
+            return stats
+        
+        processor = ThumbnailProcessor(self.thumbnails_dir / "processed", workers=workers)
+        logos = processor.process_images(ch['logo_path'] for ch in channels if ch.get('logo_path'))
+        
+        missing = []
+        for ch in channels:
+            thumbnail = logos.get(ch.get('logo_path', ''))
+            if thumbnail:
+                ch['thumbnail'] = thumbnail
+                stats['logos'] += 1
+            else:
+                missing.append(ch)
+        
+        for ch, thumbnail in zip(missing, processor.generate_placeholders(missing)):
+            if thumbnail:
+                ch['thumbnail'] = thumbnail
+                stats['placeholders'] += 1
+            else:
+                stats['failed'] += 1
+        
+        return stats
+    
+    def _entry_to_channel(self, entry: M3UEntry) -> ChannelDict:
+        """
+        Build a channel from a tokenized playlist entry.
+        
+        Args:
+            entry: Entry from iter_m3u_entries
+            
+        Returns:
+            Validated channel dictionary
+        """
+        channel = self._channel_from_extinf(entry.attrs, entry.title)
+        
+        custom_tags = dict(entry.tags)
+        if "EXTGRP" in custom_tags:
+            channel["group"] = custom_tags.pop("EXTGRP")
+        channel["url"] = entry.url
+        channel["custom_tags"] = custom_tags
+        
+        # Detect and enrich Rumble URLs
+        rumble_info = self._detect_rumble_url(channel["url"])
+        if rumble_info:
+            self._enrich_rumble_channel(channel, rumble_info)
+        
+        # Add UUID if not present
+        return ChannelUtils.validate_channel_dict(channel)
+    
+    def _channel_from_extinf(self, attributes: Dict[str, str], name_part: str) -> ChannelDict:
+        """
+        Build a channel from EXTINF attributes and title.
+        
+        Args:
+            attributes: EXTINF key="value" attributes
+            name_part: Title after the attribute list
             
         Returns:
             Dictionary containing channel information
         """
         channel = ChannelUtils.create_default_channel()
         
-        # Extract attributes using regex
-        attr_pattern = r'([a-zA-Z-]+)="([^"]*)"'
-        attributes = dict(re.findall(attr_pattern, line))
-        
-        # Extract channel name from the end of the line
-        name_part = line.split(',')[-1].strip()
         if name_part:
             channel["name"] = unquote(name_part)
         
@@ -0,0 +1,99 @@
+"""
+M3U Stream - Single-pass M3U/M3U8 tokenizer shared by M3UParser and the page generators
+"""
+
+import io
+import re
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional, Tuple, Union
+
+# key="value" attributes on an EXTINF line (tvg-name, tvg-logo, group-title, ...)
+_ATTR_PATTERN = re.compile(r'([\w-]+)="([^"]*)"')
+
+# Leading EXTINF duration: "-1", "120", "12.5" (ends at the comma or first attribute)
+_DURATION_PATTERN = re.compile(r'\s*(-?\d+(?:\.\d*)?)')
+
+# #EXTM: and #EXTMM: are misspelled EXTINF tags found in some hand-edited playlists
+EXTINF_PREFIXES = ('#EXTINF', '#EXTM:', '#EXTMM:')
+HEADER_PREFIXES = ('#EXTM3U', '#EXTMM3U')
+
+
+class M3UEntry(NamedTuple):
+    """One playlist item: an EXTINF line and the URL that follows it"""
+    duration: Optional[float]  # EXTINF duration in seconds (None if missing or negative)
+    attrs: Dict[str, str]      # EXTINF attributes, first occurrence wins
+    title: str                 # display title after the attribute list, stripped
+    url: str
+    tags: Dict[str, str]       # other #TAG:value lines since the previous entry (EXTGRP, ...)
+
+
+def parse_extinf(line: str) -> Tuple[Optional[float], Dict[str, str], str]:
+    """
+    Split an EXTINF line into duration, attributes and title
+    
+    The title starts after the first comma that follows the last attribute,
+    so commas inside quoted attribute values don't cut it short.
+    
+    Args:
+        line: Stripped EXTINF line
+    
+    Returns:
+        (duration, attrs, title)
+    """
+    colon = line.find(':')
+    rest = line[colon + 1:] if colon != -1 else ''
+    
+    attrs: Dict[str, str] = {}
+    attrs_end = 0
+    for match in _ATTR_PATTERN.finditer(rest):
+        attrs.setdefault(match.group(1), match.group(2))
+        attrs_end = match.end()
+    
+    comma = rest.find(',', attrs_end)
+    title = rest[comma + 1:].strip() if comma != -1 else ''
+    
+    duration = None
+    match = _DURATION_PATTERN.match(rest)
+    if match:
+        duration = float(match.group(1))
+        if duration < 0:
+            duration = None
+    
+    return duration, attrs, title
+
+
+def iter_m3u_entries(source: Union[str, Iterable[str]]) -> Iterator[M3UEntry]:
+    """
+    Stream entries from an M3U playlist
+    
+    An entry is an EXTINF line followed by the first non-comment line (its URL);
+    URLs without an EXTINF are skipped. Nothing is buffered beyond the current
+    entry, so an open file can be parsed without reading it into memory.
+    
+    Args:
+        source: Playlist text, or any iterable of lines (e.g. an open file)
+    
+    Yields:
+        M3UEntry in playlist order
+    """
+    lines = io.StringIO(source) if isinstance(source, str) else source
+    pending = None
+    tags: Dict[str, str] = {}
+    
+    for raw_line in lines:
+        line = raw_line.strip()
+        if not line:
+            continue
+        
+        if line[0] == '#':
+            if line.startswith(EXTINF_PREFIXES):
+                pending = parse_extinf(line)
+            elif not line.startswith(HEADER_PREFIXES):
+                name, sep, value = line[1:].partition(':')
+                if sep:
+                    tags[name.strip()] = value.strip()
+            continue
+        
+        if pending is not None:
+            yield M3UEntry(pending[0], pending[1], pending[2], line, tags)
+            pending = None
+            tags = {}
@@ -5,13 +5,25 @@ Provides REST API for NEXUS TV to access Redis-cached channel data
 
 import os
 import json
-import redis
+import time
+import asyncio
+import redis.asyncio as aioredis
 from datetime import datetime
 from typing import List, Dict, Optional, Any
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import uvicorn
+from redis_exporter import (
+    EXPORT_META_KEY, CHANNEL_INDEX_KEY, GROUP_COUNTS_KEY, GROUP_NAMES_KEY, EPG_INDEX_KEY,
+    channel_key, group_index_key, epg_key
+)
+from response_cache import ResponseCache, CachePolicy, etag_matches
+from channel_formats import (
+    MEDIA_TYPES, negotiate_format, encode_compact, encode_msgpack, ndjson_lines
+)
+from search_index import SearchIndex
+from lazy_loader import LazyPlaylistLoader, IndexedPlaylist
 
 # Initialize FastAPI
 app = FastAPI(
@@ -29,32 +41,109 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Redis connection
+# Redis connection settings
+REDIS_HOST = os.environ.get('REDIS_HOST', 'localhost')
+REDIS_PORT = int(os.environ.get('REDIS_PORT', 6379))
+REDIS_MAX_CONNECTIONS = int(os.environ.get('REDIS_MAX_CONNECTIONS', 64))
+
+# Async Redis client backed by a bounded connection pool; requests wait
+# for a free connection instead of opening one socket per concurrent client
 redis_client = None
+_redis_lock = asyncio.Lock()
 
-def get_redis():
-    """Get or create Redis connection"""
+async def get_redis():
+    """Get or create the async Redis client"""
     global redis_client
-    if redis_client is None:
-        try:
-            redis_client = redis.Redis(
-                host='localhost',
-                port=6379,
+    if redis_client is not None:
+        return redis_client
+    
+    async with _redis_lock:
+        if redis_client is None:
+            pool = aioredis.BlockingConnectionPool(
+                host=REDIS_HOST,
+                port=REDIS_PORT,
                 decode_responses=True,
-                socket_connect_timeout=5
+                socket_connect_timeout=5,
+                max_connections=REDIS_MAX_CONNECTIONS,
+                timeout=5
             )
-            redis_client.ping()
-            print("✅ Connected to Redis")
-        except Exception as e:
-            print(f"❌ Redis connection failed: {e}")
-            redis_client = None
+            client = aioredis.Redis(connection_pool=pool)
+            try:
+                await client.ping()
+                redis_client = client
+                print("✅ Connected to Redis")
+            except Exception as e:
+                print(f"❌ Redis connection failed: {e}")
+                await pool.disconnect()
     return redis_client
 
 
+# Response cache: per-endpoint freshness, stale-while-revalidate, and
+# invalidation whenever the exporter bumps the export revision
+response_cache = ResponseCache()
+CACHE_POLICIES = {
+    "channels": CachePolicy(ttl=30, stale_ttl=300),
+    "groups": CachePolicy(ttl=60, stale_ttl=600),
+    "stats": CachePolicy(ttl=5, stale_ttl=30),
+}
+EXPORT_VERSION_POLL = float(os.environ.get('EXPORT_VERSION_POLL', 1.0))
+_export_version = {"value": "0", "checked_at": float('-inf')}
+
+
+async def export_version(r) -> str:
+    """Current export revision, re-read from Redis at most every EXPORT_VERSION_POLL seconds"""
+    now = time.monotonic()
+    if now - _export_version["checked_at"] >= EXPORT_VERSION_POLL:
+        revision = await r.hget(EXPORT_META_KEY, 'revision')
+        _export_version.update(value=revision or "0", checked_at=now)
+    return _export_version["value"]
+
+
+def encode_json(data: Any) -> bytes:
+    """Serialize a response body the way JSONResponse does"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+CHANNEL_ENCODERS = {
+    "json": encode_json,
+    "compact": encode_compact,
+    "msgpack": encode_msgpack,
+}
+NDJSON_BATCH_SIZE = 1000
+
+
+async def cached_response(request: Request, r, endpoint: str, build,
+                          fmt: str = "json", encode=encode_json) -> Response:
+    """Serve a cached response, answering 304 when the client's ETag still matches"""
+    async def compute():
+        return encode(await build())
+    
+    # The format is part of the key since it may come from the Accept header
+    key = (endpoint, fmt, tuple(sorted(request.query_params.multi_items())))
+    version = await export_version(r)
+    entry = await response_cache.get(key, version, CACHE_POLICIES[endpoint], compute)
+    
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+    if etag_matches(request.headers.get('if-none-match'), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type=MEDIA_TYPES[fmt], headers=headers)
+
+
 @app.on_event("startup")
 async def startup_event():
-    """Initialize Redis connection on startup"""
-    get_redis()
+    """Initialize Redis connection and start building the search index"""
+    r = await get_redis()
+    if r is not None:
+        _search["task"] = asyncio.ensure_future(load_search_index(r, await export_version(r)))
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled Redis connections"""
+    global redis_client
+    if redis_client is not None:
+        await redis_client.aclose()
+        redis_client = None
 
 
 @app.get("/")
@@ -70,6 +159,9 @@ async def root():
             "channel_detail": "/api/channels/{channel_id}",
             "groups": "/api/groups",
             "epg": "/api/epg/{channel_id}",
+            "search": "/api/search?q=",
+            "playlist_chunk": "/api/playlist/chunk?start=&size=",
+            "playlist_search": "/api/playlist/search?q=",
             "stats": "/api/stats"
         }
     }
@@ -78,7 +170,7 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    r = get_redis()
+    r = await get_redis()
     
     if r is None:
         return JSONResponse(
@@ -91,8 +183,8 @@ async def health_check():
         )
     
     try:
-        r.ping()
-        db_size = r.dbsize()
+        async with r.pipeline(transaction=False) as pipe:
+            _, db_size = await pipe.ping().dbsize().execute()
         return {
             "status": "healthy",
             "redis": "connected",
@@ -113,35 +205,49 @@ async def health_check():
 
 @app.get("/api/channels")
 async def get_channels(
+    request: Request,
     group: Optional[str] = None,
-    limit: int = Query(default=100, le=1000),
-    offset: int = Query(default=0, ge=0)
+    limit: Optional[int] = Query(default=None, ge=1),
+    offset: int = Query(default=0, ge=0),
+    format: Optional[str] = None
 ):
-    """Get all channels or filter by group"""
-    r = get_redis()
+    """
+    Get all channels or filter by group
+    
+    Formats (?format= or Accept header): json (default), compact (columnar
+    {"fields", "rows"}), msgpack (columnar, application/x-msgpack) and ndjson
+    (application/x-ndjson, streamed; without a limit it runs to the end).
+    """
+    fmt = negotiate_format(format, request.headers.get('accept'))
+    if fmt is None:
+        raise HTTPException(status_code=406, detail=f"Unsupported format: {format or request.headers.get('accept')}")
+    
+    r = await get_redis()
     if r is None:
         raise HTTPException(status_code=503, detail="Redis unavailable")
     
+    if fmt == "ndjson":
+        return await stream_channels(r, group, limit, offset)
+    
+    limit = limit or 100
+    if limit > 1000:
+        raise HTTPException(status_code=422, detail="limit must be at most 1000")
+    
+    return await cached_response(request, r, "channels",
+                                 lambda: build_channels_page(r, group, limit, offset),
+                                 fmt=fmt, encode=CHANNEL_ENCODERS[fmt])
+
+
+async def build_channels_page(r, group: Optional[str], limit: int, offset: int) -> Dict[str, Any]:
+    """Read one page of channels from the index"""
     try:
-        # Get all channel keys
-        pattern = "channel:*" if group is None else f"channel:*:group:{group}"
-        channel_keys = list(r.scan_iter(match="channel:*:metadata", count=100))
-        
-        # Apply pagination
-        total = len(channel_keys)
-        channel_keys = channel_keys[offset:offset + limit]
+        # Page through the exporter's sorted-set index (global or per-group)
+        index_key = CHANNEL_INDEX_KEY if group is None else group_index_key(group)
+        async with r.pipeline(transaction=False) as pipe:
+            total, channel_ids = await pipe.zcard(index_key).zrange(
+                index_key, offset, offset + limit - 1).execute()
         
-        channels = []
-        for key in channel_keys:
-            try:
-                channel_data = r.hgetall(key)
-                if channel_data:
-                    # Filter by group if specified
-                    if group is None or channel_data.get('group', '').lower() == group.lower():
-                        channels.append(channel_data)
-            except Exception as e:
-                print(f"Error reading channel {key}: {e}")
-                continue
+        channels = await fetch_channels(r, channel_ids)
         
         return {
             "channels": channels,
@@ -155,17 +261,164 @@ async def get_channels(
         raise HTTPException(status_code=500, detail=f"Error fetching channels: {str(e)}")
 
 
+async def stream_channels(r, group: Optional[str], limit: Optional[int], offset: int) -> StreamingResponse:
+    """Stream channels as NDJSON, reading the index in batches"""
+    index_key = CHANNEL_INDEX_KEY if group is None else group_index_key(group)
+    total = await r.zcard(index_key)
+    end = total if limit is None else min(total, offset + limit)
+    
+    async def lines():
+        for start in range(offset, end, NDJSON_BATCH_SIZE):
+            stop = min(start + NDJSON_BATCH_SIZE, end)
+            channel_ids = await r.zrange(index_key, start, stop - 1)
+            if not channel_ids:
+                break
+            for line in ndjson_lines(await fetch_channels(r, channel_ids)):
+                yield line
+    
+    return StreamingResponse(lines(), media_type=MEDIA_TYPES["ndjson"],
+                             headers={"X-Total-Count": str(total)})
+
+
+async def fetch_channels(r, channel_ids: List[str]) -> List[Dict[str, str]]:
+    """Read channel metadata hashes in one pipelined round trip, skipping expired keys"""
+    async with r.pipeline(transaction=False) as pipe:
+        for channel_id in channel_ids:
+            pipe.hgetall(channel_key(channel_id))
+        results = await pipe.execute()
+    return [data for data in results if data]
+
+
+# Search index over name/tvg_id/group, rebuilt in the background whenever the
+# export revision changes; the previous index keeps serving until it is ready
+SEARCH_LOAD_BATCH = 5000
+_search = {"index": None, "version": None, "task": None}
+
+
+async def load_search_index(r, version: str):
+    """Read the indexed fields of every channel and build a fresh index"""
+    docs = []
+    total = await r.zcard(CHANNEL_INDEX_KEY)
+    for start in range(0, total, SEARCH_LOAD_BATCH):
+        channel_ids = await r.zrange(CHANNEL_INDEX_KEY, start, start + SEARCH_LOAD_BATCH - 1)
+        async with r.pipeline(transaction=False) as pipe:
+            for channel_id in channel_ids:
+                pipe.hmget(channel_key(channel_id), 'name', 'tvg_id', 'group')
+            rows = await pipe.execute()
+        for channel_id, (name, tvg_id, group) in zip(channel_ids, rows):
+            docs.append((channel_id, {"name": name, "tvg_id": tvg_id, "group": group}))
+    
+    # Tokenizing and flattening is CPU-bound; keep it off the event loop
+    index = await asyncio.to_thread(SearchIndex.build, docs)
+    _search.update(index=index, version=version)
+    print(f"🔎 Search index built: {len(index)} channels, {len(index.terms)} terms")
+    return index
+
+
+async def get_search_index(r) -> SearchIndex:
+    """Current search index, starting a rebuild when the export has changed"""
+    version = await export_version(r)
+    task = _search["task"]
+    if _search["version"] != version and (task is None or task.done()):
+        task = _search["task"] = asyncio.ensure_future(load_search_index(r, version))
+    
+    if _search["index"] is None:
+        return await asyncio.shield(task)
+    return _search["index"]
+
+
+@app.get("/api/search")
+async def search_channels(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(default=20, ge=1, le=200)
+):
+    """Ranked channel search by name, tvg-id and group (prefix and substring matches)"""
+    r = await get_redis()
+    if r is None:
+        raise HTTPException(status_code=503, detail="Redis unavailable")
+    
+    try:
+        index = await get_search_index(r)
+        started = time.perf_counter()
+        hits, total = index.search(q, limit)
+        took_ms = (time.perf_counter() - started) * 1000
+        
+        channels = await fetch_channels(r, [channel_id for channel_id, _ in hits])
+        scores = dict(hits)
+        for channel in channels:
+            channel["score"] = scores.get(channel.get("id"), 0)
+        
+        return {
+            "query": q,
+            "results": channels,
+            "total": total,
+            "count": len(channels),
+            "took_ms": round(took_ms, 2)
+        }
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching channels: {str(e)}")
+
+
+# Lazy playlist pages (lazy_loader.create_lazy_playlist_html) read from an
+# on-disk IndexedPlaylist: PLAYLIST_PATH is an .m3u (indexed beside it on
+# first use) or a prebuilt index database
+PLAYLIST_PATH = os.environ.get('PLAYLIST_PATH')
+_playlist = {"index": None}
+_playlist_lock = asyncio.Lock()
+
+
+async def get_playlist() -> IndexedPlaylist:
+    """Open (building if needed) the configured playlist index"""
+    if _playlist["index"] is not None:
+        return _playlist["index"]
+    if not PLAYLIST_PATH:
+        raise HTTPException(status_code=404, detail="No playlist configured (set PLAYLIST_PATH)")
+    
+    async with _playlist_lock:
+        if _playlist["index"] is None:
+            try:
+                if PLAYLIST_PATH.endswith('.db'):
+                    playlist = await asyncio.to_thread(IndexedPlaylist, PLAYLIST_PATH)
+                else:
+                    playlist = await asyncio.to_thread(IndexedPlaylist.from_m3u, PLAYLIST_PATH)
+            except (OSError, ValueError) as e:
+                raise HTTPException(status_code=500, detail=f"Error opening playlist: {str(e)}")
+            _playlist["index"] = playlist
+    return _playlist["index"]
+
+
+@app.get("/api/playlist/chunk")
+async def get_playlist_chunk(
+    start: int = Query(default=0, ge=0),
+    size: int = Query(default=2, ge=1, le=500)
+):
+    """Get a range of playlist items"""
+    playlist = await get_playlist()
+    loader = LazyPlaylistLoader(playlist, chunk_size=size, cache_size=size)
+    return await asyncio.to_thread(loader.get_chunk, start)
+
+
+@app.get("/api/playlist/search")
+async def search_playlist(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(default=50, ge=1, le=500)
+):
+    """Search playlist items by name, tvg-id and group"""
+    playlist = await get_playlist()
+    return await asyncio.to_thread(playlist.search, q, None, limit)
+
+
 @app.get("/api/channels/{channel_id}")
 async def get_channel(channel_id: str):
     """Get specific channel details"""
-    r = get_redis()
+    r = await get_redis()
     if r is None:
         raise HTTPException(status_code=503, detail="Redis unavailable")
     
     try:
         # Try to get channel metadata
-        key = f"channel:{channel_id}:metadata"
-        channel_data = r.hgetall(key)
+        channel_data = await r.hgetall(channel_key(channel_id))
         
         if not channel_data:
             raise HTTPException(status_code=404, detail=f"Channel {channel_id} not found")
@@ -179,39 +432,48 @@ async def get_channel(channel_id: str):
 
 
 @app.get("/api/groups")
-async def get_groups():
-    """Get all channel groups"""
-    r = get_redis()
+async def get_groups(request: Request, include_channels: bool = False):
+    """Get all channel groups (member lists only when include_channels=true)"""
+    r = await get_redis()
     if r is None:
         raise HTTPException(status_code=503, detail="Redis unavailable")
     
+    return await cached_response(request, r, "groups",
+                                 lambda: build_groups(r, include_channels))
+
+
+async def build_groups(r, include_channels: bool) -> Dict[str, Any]:
+    """Read group counts (and optionally member names) from the indexes"""
     try:
-        # Get all channel keys and extract unique groups
-        channel_keys = list(r.scan_iter(match="channel:*:metadata", count=100))
+        # Group counts are maintained by the exporter
+        group_counts = await r.hgetall(GROUP_COUNTS_KEY)
+        group_names = await r.hgetall(GROUP_NAMES_KEY)
         
-        groups = {}
-        for key in channel_keys:
-            try:
-                channel_data = r.hgetall(key)
-                group = channel_data.get('group', 'Uncategorized')
-                
-                if group not in groups:
-                    groups[group] = {
-                        "name": group,
-                        "channel_count": 0,
-                        "channels": []
-                    }
-                
-                groups[group]["channel_count"] += 1
-                groups[group]["channels"].append({
-                    "id": channel_data.get('id'),
-                    "name": channel_data.get('name')
-                })
-            except Exception:
-                continue
+        groups = sorted((
+            {"name": group_names.get(key, key), "channel_count": int(count)}
+            for key, count in group_counts.items()
+        ), key=lambda group: group["name"].lower())
+        
+        if include_channels:
+            async with r.pipeline(transaction=False) as pipe:
+                for group in groups:
+                    pipe.zrange(group_index_key(group["name"]), 0, -1)
+                member_ids = await pipe.execute()
+            
+            async with r.pipeline(transaction=False) as pipe:
+                for channel_ids in member_ids:
+                    for channel_id in channel_ids:
+                        pipe.hmget(channel_key(channel_id), 'id', 'name')
+                names = iter(await pipe.execute())
+            
+            for group, channel_ids in zip(groups, member_ids):
+                group["channels"] = [
+                    {"id": channel_id, "name": name}
+                    for channel_id, (_, name) in zip(channel_ids, names)
+                ]
         
         return {
-            "groups": list(groups.values()),
+            "groups": groups,
             "total_groups": len(groups)
         }
     
@@ -222,14 +484,13 @@ async def get_groups():
 @app.get("/api/epg/{channel_id}")
 async def get_epg(channel_id: str):
     """Get EPG data for a channel"""
-    r = get_redis()
+    r = await get_redis()
     if r is None:
         raise HTTPException(status_code=503, detail="Redis unavailable")
     
     try:
         # Get EPG data from Redis
-        key = f"epg:{channel_id}"
-        epg_data = r.get(key)
+        epg_data = await r.get(epg_key(channel_id))
         
         if epg_data is None:
             return {
@@ -248,24 +509,27 @@ async def get_epg(channel_id: str):
 
 
 @app.get("/api/stats")
-async def get_stats():
+async def get_stats(request: Request):
     """Get Redis cache statistics"""
-    r = get_redis()
+    r = await get_redis()
     if r is None:
         raise HTTPException(status_code=503, detail="Redis unavailable")
     
+    return await cached_response(request, r, "stats", lambda: build_stats(r))
+
+
+async def build_stats(r) -> Dict[str, Any]:
+    """Collect cache statistics"""
     try:
-        # Count different types of keys
-        channel_count = len(list(r.scan_iter(match="channel:*:metadata", count=100)))
-        epg_count = len(list(r.scan_iter(match="epg:*", count=100)))
-        
-        # Get Redis info
-        info = r.info()
+        # Counts come from the exporter's indexes, all in one round trip
+        async with r.pipeline(transaction=False) as pipe:
+            channel_count, epg_count, db_size, info = await pipe.zcard(CHANNEL_INDEX_KEY).zcount(
+                EPG_INDEX_KEY, time.time(), '+inf').dbsize().info().execute()
         
         return {
             "channels": channel_count,
             "epg_entries": epg_count,
-            "total_keys": r.dbsize(),
+            "total_keys": db_size,
             "memory_used": info.get('used_memory_human', 'N/A'),
             "uptime_seconds": info.get('uptime_in_seconds', 0),
             "connected_clients": info.get('connected_clients', 0)
@@ -278,12 +542,15 @@ async def get_stats():
 @app.post("/api/clear-cache")
 async def clear_cache():
     """Clear all cached data"""
-    r = get_redis()
+    r = await get_redis()
     if r is None:
         raise HTTPException(status_code=503, detail="Redis unavailable")
     
     try:
-        r.flushdb()
+        # FLUSHDB ASYNC frees memory in a background thread
+        await r.flushdb(asynchronous=True)
+        response_cache.invalidate()
+        _search.update(index=None, version=None)
         return {
             "status": "success",
             "message": "Cache cleared successfully"
@@ -299,7 +566,9 @@ if __name__ == "__main__":
     print("\n🚀 Starting server...")
     print(f"📡 API will be available at: http://localhost:3000")
     print(f"📖 API docs at: http://localhost:3000/docs")
-    print(f"💾 Redis connection: localhost:6379")
+    print(f"💾 Redis connection: {REDIS_HOST}:{REDIS_PORT} (pool of {REDIS_MAX_CONNECTIONS})")
+    if PLAYLIST_PATH:
+        print(f"📃 Lazy playlist: {PLAYLIST_PATH}")
     print("\nPress Ctrl+C to stop\n")
     
     uvicorn.run(
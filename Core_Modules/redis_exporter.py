@@ -8,21 +8,54 @@ import json
 import logging
 import hashlib
 import uuid
-from typing import List, Dict, Any, Optional
+import time
+from typing import List, Dict, Any, Iterable, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Keyspace layout shared with redis_api_server.py and dashboard.py
+EXPORT_META_KEY = 'm3u_matrix:export_meta'
+CHANNEL_INDEX_KEY = 'm3u_matrix:channels'          # ZSET channel_id -> export position
+GROUP_COUNTS_KEY = 'm3u_matrix:group_counts'        # HASH group_id -> channel count
+GROUP_NAMES_KEY = 'm3u_matrix:group_names'          # HASH group_id -> display name
+EXPORT_MANIFEST_KEY = 'm3u_matrix:export_manifest'  # HASH channel_id -> "content_hash:position:group"
+EPG_INDEX_KEY = 'm3u_matrix:epg_index'              # ZSET channel_id -> EPG expiry timestamp
+EXPORT_REVISION_KEY = 'm3u_matrix:export_revision'  # Counter bumped by every export that changes data
+CACHE_TTL = 86400  # 24 hours
+
+
+def channel_key(channel_id: str) -> str:
+    """Metadata hash key for a channel"""
+    return f"channel:{channel_id}:metadata"
+
+
+def group_id(group: str) -> str:
+    """Normalized group name; groups are matched case-insensitively"""
+    return group.lower()
+
+
+def group_index_key(group: str) -> str:
+    """Per-group ZSET of channel IDs"""
+    return f"group:{group_id(group)}:index"
+
+
+def epg_key(channel_id: str) -> str:
+    """EPG JSON key for a channel"""
+    return f"epg:{channel_id}"
+
 
 class RedisExporter:
     """Exports M3U Matrix channel data to Redis"""
     
-    def __init__(self, host='localhost', port=6379, password=None):
+    def __init__(self, host='localhost', port=6379, password=None, batch_size=1000):
         """Initialize Redis connection"""
         self.host = host
         self.port = port
         self.password = password
+        self.batch_size = batch_size
         self.redis_client = None
         self.connected = False
+        self.last_export_stats: Dict[str, int] = {}
         
     def connect(self) -> bool:
         """Connect to Redis server"""
@@ -58,12 +91,61 @@ class RedisExporter:
             self.connected = False
             return False
     
-    def export_channels(self, channels: List[Dict[str, Any]]) -> bool:
+    @staticmethod
+    def _channel_metadata(channel: Dict[str, Any]) -> Tuple[str, Dict[str, str]]:
+        """Build the stable channel ID and Redis metadata hash for a channel"""
+        # Generate deterministic channel ID
+        # Priority: explicit ID > UUID > deterministic hash from URL+name
+        channel_id = channel.get('id') or channel.get('uuid')
+        
+        if not channel_id:
+            # Create stable UUID from channel URL and name
+            # This ensures same channel always gets same ID across exports
+            url = channel.get('url', '')
+            name = channel.get('name', '')
+            stable_string = f"{url}|{name}"
+            
+            # Use UUID5 (deterministic) based on URL namespace
+            namespace = uuid.UUID('6ba7b810-9dad-11d1-80b4-00c04fd430c8')  # URL namespace
+            channel_id = str(uuid.uuid5(namespace, stable_string))
+        
+        metadata = {
+            'id': channel_id,
+            'name': channel.get('name', 'Unknown'),
+            'url': channel.get('url', ''),
+            'logo': channel.get('logo', ''),
+            'group': channel.get('group', 'Uncategorized'),
+            'tvg_id': channel.get('tvg-id', ''),
+            'tvg_name': channel.get('tvg-name', ''),
+            'duration': str(channel.get('duration', 0)),
+            'start_time': channel.get('start_time', ''),
+            'end_time': channel.get('end_time', ''),
+            'uuid': channel.get('uuid', ''),
+            'exported_at': str(channel.get('exported_at', ''))
+        }
+        
+        # Remove empty values
+        return str(channel_id), {k: v for k, v in metadata.items() if v}
+    
+    @staticmethod
+    def _content_hash(metadata: Dict[str, str]) -> str:
+        """Hash channel content, ignoring the per-export timestamp"""
+        content = {k: v for k, v in metadata.items() if k != 'exported_at'}
+        return hashlib.sha1(json.dumps(content, sort_keys=True).encode('utf-8')).hexdigest()
+    
+    def export_channels(self, channels: List[Dict[str, Any]], batch_size: Optional[int] = None) -> bool:
         """
-        Export channel list to Redis
+        Export channel list to Redis, writing only what changed since the last export
+        
+        A manifest hash (channel_id -> "content_hash:position:group") records the
+        previous export. Unchanged channels cost no writes; changed and new channels
+        are rewritten, moved channels get new index scores, and channels missing
+        from this export are removed. Commands are sent in pipelines of batch_size.
+        Per-export counts are left in self.last_export_stats.
         
         Args:
             channels: List of channel dictionaries
+            batch_size: Commands per pipeline flush (defaults to self.batch_size)
             
         Returns:
             bool: True if export successful, False otherwise
@@ -72,71 +154,137 @@ class RedisExporter:
             if not self.connect():
                 return False
         
+        batch_size = batch_size or self.batch_size
+        stats = {'total': 0, 'added': 0, 'updated': 0, 'moved': 0, 'unchanged': 0,
+                 'removed': 0, 'keys_written': 0, 'commands': 0}
+        
         try:
-            pipe = self.redis_client.pipeline()
-            exported_count = 0
+            old_manifest = self.redis_client.hgetall(EXPORT_MANIFEST_KEY)
             
-            for channel in channels:
-                # Generate deterministic channel ID
-                # Priority: explicit ID > UUID > deterministic hash from URL+name
-                channel_id = channel.get('id') or channel.get('uuid')
-                
-                if not channel_id:
-                    # Create stable UUID from channel URL and name
-                    # This ensures same channel always gets same ID across exports
-                    url = channel.get('url', '')
-                    name = channel.get('name', '')
-                    stable_string = f"{url}|{name}"
-                    
-                    # Use UUID5 (deterministic) based on URL namespace
-                    namespace = uuid.UUID('6ba7b810-9dad-11d1-80b4-00c04fd430c8')  # URL namespace
-                    channel_id = str(uuid.uuid5(namespace, stable_string))
+            pipe = self.redis_client.pipeline(transaction=False)
+            
+            old_groups = self.redis_client.hkeys(GROUP_COUNTS_KEY)
+            if not old_manifest:
+                # No manifest yet: start the indexes from scratch
+                pipe.delete(CHANNEL_INDEX_KEY, GROUP_COUNTS_KEY, GROUP_NAMES_KEY,
+                            *{group_index_key(g) for g in old_groups})
+            elif not self.redis_client.exists(GROUP_NAMES_KEY) or any(g != group_id(g) for g in old_groups):
+                # Counts from before group names were normalized: rebuild them from the manifest
+                counts: Dict[str, int] = {}
+                names: Dict[str, str] = {}
+                for previous in old_manifest.values():
+                    group = previous.split(':', 2)[2]
+                    counts[group_id(group)] = counts.get(group_id(group), 0) + 1
+                    names[group_id(group)] = group
+                pipe.delete(GROUP_COUNTS_KEY, GROUP_NAMES_KEY)
+                pipe.hset(GROUP_COUNTS_KEY, mapping=counts)
+                pipe.hset(GROUP_NAMES_KEY, mapping=names)
+            
+            def flush(force=False):
+                if force or len(pipe) >= batch_size:
+                    stats['commands'] += len(pipe)
+                    pipe.execute()
+            
+            # Later duplicates of the same channel ID win, as with a full rewrite
+            entries = {}
+            for position, channel in enumerate(channels):
+                channel_id, metadata = self._channel_metadata(channel)
+                entries[channel_id] = (position, metadata)
+            stats['total'] = len(entries)
+            
+            group_deltas: Dict[str, int] = {}
+            
+            for channel_id, (position, metadata) in entries.items():
+                group = metadata.get('group') or 'Uncategorized'
+                digest = self._content_hash(metadata)
+                manifest_value = f"{digest}:{position}:{group}"
                 
-                # Create metadata hash
-                metadata_key = f"channel:{channel_id}:metadata"
-                metadata = {
-                    'id': channel_id,
-                    'name': channel.get('name', 'Unknown'),
-                    'url': channel.get('url', ''),
-                    'logo': channel.get('logo', ''),
-                    'group': channel.get('group', 'Uncategorized'),
-                    'tvg_id': channel.get('tvg-id', ''),
-                    'tvg_name': channel.get('tvg-name', ''),
-                    'duration': str(channel.get('duration', 0)),
-                    'start_time': channel.get('start_time', ''),
-                    'end_time': channel.get('end_time', ''),
-                    'uuid': channel.get('uuid', ''),
-                    'exported_at': str(channel.get('exported_at', ''))
-                }
+                previous = old_manifest.get(channel_id)
+                if previous == manifest_value:
+                    stats['unchanged'] += 1
+                    continue
                 
-                # Remove empty values
-                metadata = {k: v for k, v in metadata.items() if v}
+                if previous:
+                    old_digest, old_position, old_group = previous.split(':', 2)
+                else:
+                    old_digest = old_position = old_group = None
                 
-                # Store in Redis
-                pipe.delete(metadata_key)
-                pipe.hset(metadata_key, mapping=metadata)
-                pipe.expire(metadata_key, 86400)  # 24 hour TTL
+                # Metadata hash: rewrite only when the content changed
+                if digest != old_digest:
+                    metadata_key = channel_key(channel_id)
+                    pipe.delete(metadata_key)
+                    pipe.hset(metadata_key, mapping=metadata)
+                    stats['keys_written'] += 1
+                    stats['updated' if previous else 'added'] += 1
+                else:
+                    stats['moved'] += 1
                 
-                # Add to group index
-                group = channel.get('group', 'Uncategorized')
-                group_key = f"group:{group}:channels"
-                pipe.sadd(group_key, channel_id)
-                pipe.expire(group_key, 86400)
+                # Indexes: rescore on move, re-home on group change
+                if old_group != group:
+                    if old_group is not None:
+                        pipe.zrem(group_index_key(old_group), channel_id)
+                        old_id = group_id(old_group)
+                        group_deltas[old_id] = group_deltas.get(old_id, 0) - 1
+                    group_deltas[group_id(group)] = group_deltas.get(group_id(group), 0) + 1
+                    pipe.hset(GROUP_NAMES_KEY, group_id(group), group)
+                if old_group != group or str(position) != old_position:
+                    pipe.zadd(CHANNEL_INDEX_KEY, {channel_id: position})
+                    pipe.zadd(group_index_key(group), {channel_id: position})
                 
-                exported_count += 1
+                pipe.hset(EXPORT_MANIFEST_KEY, channel_id, manifest_value)
+                flush()
             
-            # Execute pipeline
-            pipe.execute()
+            # Remove channels that are no longer exported
+            for channel_id, previous in old_manifest.items():
+                if channel_id in entries:
+                    continue
+                old_group = previous.split(':', 2)[2]
+                pipe.delete(channel_key(channel_id))
+                pipe.zrem(CHANNEL_INDEX_KEY, channel_id)
+                pipe.zrem(group_index_key(old_group), channel_id)
+                pipe.hdel(EXPORT_MANIFEST_KEY, channel_id)
+                old_id = group_id(old_group)
+                group_deltas[old_id] = group_deltas.get(old_id, 0) - 1
+                stats['removed'] += 1
+                stats['keys_written'] += 1
+                flush()
+            
+            for group_key, delta in group_deltas.items():
+                if delta:
+                    pipe.hincrby(GROUP_COUNTS_KEY, group_key, delta)
+            flush(force=True)
+            
+            # Drop emptied groups; index keys no longer expire now that removals are explicit
+            group_counts = self.redis_client.hgetall(GROUP_COUNTS_KEY)
+            empty_groups = [g for g, count in group_counts.items() if int(count) <= 0]
+            if empty_groups:
+                pipe.hdel(GROUP_COUNTS_KEY, *empty_groups)
+                pipe.hdel(GROUP_NAMES_KEY, *empty_groups)
+            for key in [CHANNEL_INDEX_KEY, GROUP_COUNTS_KEY, GROUP_NAMES_KEY, EXPORT_MANIFEST_KEY] + \
+                       [group_index_key(g) for g in group_counts if g not in empty_groups]:
+                pipe.persist(key)
+            flush(force=True)
             
             # Store export metadata
             export_meta = {
-                'total_channels': len(channels),
+                'total_channels': len(entries),
                 'exported_at': json.dumps({'timestamp': str(channels[0].get('exported_at', '')) if channels else ''}),
                 'version': '1.0'
             }
-            self.redis_client.hset('m3u_matrix:export_meta', mapping=export_meta)
             
-            logger.info(f"✅ Exported {exported_count} channels to Redis")
+            # API response caches invalidate on a new revision; a no-op export keeps it
+            changed = stats['added'] + stats['updated'] + stats['moved'] + stats['removed']
+            if changed or not self.redis_client.hexists(EXPORT_META_KEY, 'revision'):
+                export_meta['revision'] = self.redis_client.incr(EXPORT_REVISION_KEY)
+            self.redis_client.hset(EXPORT_META_KEY, mapping=export_meta)
+            
+            self.last_export_stats = stats
+            logger.info(
+                f"✅ Exported {stats['total']} channels to Redis "
+                f"({stats['added']} added, {stats['updated']} updated, {stats['moved']} moved, "
+                f"{stats['removed']} removed, {stats['unchanged']} unchanged; "
+                f"{stats['commands']} commands)"
+            )
             return True
             
         except Exception as e:
@@ -150,60 +298,101 @@ class RedisExporter:
                 return False
         
         try:
-            key = f"epg:{channel_id}"
-            self.redis_client.set(key, json.dumps(epg_data), ex=86400)
+            # EPG keys expire, so the index is scored by expiry time and
+            # live entries are counted with ZCOUNT rather than a SCAN
+            pipe = self.redis_client.pipeline()
+            pipe.set(epg_key(channel_id), json.dumps(epg_data), ex=CACHE_TTL)
+            pipe.zadd(EPG_INDEX_KEY, {channel_id: time.time() + CACHE_TTL})
+            pipe.execute()
             logger.info(f"✅ Exported EPG for channel {channel_id}")
             return True
         except Exception as e:
             logger.error(f"❌ Error exporting EPG: {e}")
             return False
     
-    def clear_cache(self) -> bool:
-        """Clear all cached channel data"""
+    def _unlink_keys(self, keys: Iterable[str]) -> int:
+        """UNLINK keys in pipelined batches; memory is reclaimed off the main Redis thread"""
+        pipe = self.redis_client.pipeline(transaction=False)
+        batch = []
+        removed = 0
+        
+        for key in keys:
+            batch.append(key)
+            if len(batch) >= self.batch_size:
+                pipe.unlink(*batch)
+                batch = []
+                if len(pipe) >= 10:
+                    removed += sum(pipe.execute())
+        
+        if batch:
+            pipe.unlink(*batch)
+        if len(pipe):
+            removed += sum(pipe.execute())
+        return removed
+    
+    def clear_cache(self, sweep: bool = False) -> bool:
+        """
+        Clear all cached channel data
+        
+        Keys are located through the exporter's own indexes and removed with
+        batched UNLINK. With sweep=True, a SCAN pass also removes stray
+        channel:/group:/epg: keys not tracked by any index (e.g. from older exports).
+        """
         if not self.is_connected():
             if not self.connect():
                 return False
         
         try:
-            # Delete all channel keys
-            for key in self.redis_client.scan_iter("channel:*"):
-                self.redis_client.delete(key)
+            r = self.redis_client
             
-            # Delete all group keys
-            for key in self.redis_client.scan_iter("group:*"):
-                self.redis_client.delete(key)
+            def indexed_keys():
+                for channel_id in r.hkeys(EXPORT_MANIFEST_KEY):
+                    yield channel_key(channel_id)
+                for channel_id in r.zrange(CHANNEL_INDEX_KEY, 0, -1):
+                    yield channel_key(channel_id)
+                for group in r.hkeys(GROUP_COUNTS_KEY):
+                    yield group_index_key(group)
+                for channel_id in r.zrange(EPG_INDEX_KEY, 0, -1):
+                    yield epg_key(channel_id)
             
-            # Delete all EPG keys
-            for key in self.redis_client.scan_iter("epg:*"):
-                self.redis_client.delete(key)
+            removed = self._unlink_keys(indexed_keys())
             
-            # Delete metadata
-            self.redis_client.delete('m3u_matrix:export_meta')
+            if sweep:
+                for pattern in ("channel:*", "group:*", "epg:*"):
+                    removed += self._unlink_keys(r.scan_iter(pattern, count=1000))
             
-            logger.info("✅ Cleared Redis cache")
+            # Delete metadata and indexes
+            removed += r.unlink(EXPORT_META_KEY, CHANNEL_INDEX_KEY, GROUP_COUNTS_KEY,
+                                GROUP_NAMES_KEY, EXPORT_MANIFEST_KEY, EPG_INDEX_KEY)
+            
+            logger.info(f"✅ Cleared Redis cache ({removed} keys)")
             return True
         except Exception as e:
             logger.error(f"❌ Error clearing cache: {e}")
             return False
     
     def get_stats(self) -> Dict[str, Any]:
-        """Get Redis cache statistics"""
+        """Get Redis cache statistics from the exporter-maintained indexes"""
         if not self.is_connected():
             return {"connected": False}
         
         try:
-            channel_count = len(list(self.redis_client.scan_iter("channel:*:metadata")))
-            group_count = len(list(self.redis_client.scan_iter("group:*")))
-            epg_count = len(list(self.redis_client.scan_iter("epg:*")))
-            
-            info = self.redis_client.info()
+            now = time.time()
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.zcard(CHANNEL_INDEX_KEY)
+            pipe.hlen(GROUP_COUNTS_KEY)
+            pipe.zremrangebyscore(EPG_INDEX_KEY, '-inf', now)
+            pipe.zcard(EPG_INDEX_KEY)
+            pipe.dbsize()
+            pipe.info()
+            channel_count, group_count, _, epg_count, total_keys, info = pipe.execute()
             
             return {
                 "connected": True,
                 "channels": channel_count,
                 "groups": group_count,
                 "epg_entries": epg_count,
-                "total_keys": self.redis_client.dbsize(),
+                "total_keys": total_keys,
                 "memory_used": info.get('used_memory_human', 'N/A'),
                 "uptime": info.get('uptime_in_seconds', 0)
             }
@@ -0,0 +1,141 @@
+"""
+Response Cache for the M3U Matrix API
+In-process cache of serialized API responses with per-endpoint TTLs,
+stale-while-revalidate refresh and export-version invalidation
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    """A serialized response and the export version it was built from"""
+    body: bytes
+    etag: str
+    version: str
+    created_at: float
+
+
+@dataclass
+class CachePolicy:
+    """Freshness rules for one endpoint"""
+    ttl: float            # Seconds an entry is served as fresh
+    stale_ttl: float = 0  # Further seconds it is served stale while refreshing in the background
+
+
+class ResponseCache:
+    """
+    Async response cache keyed by endpoint + query
+    
+    An entry is only reused while its export version matches the current one,
+    so a new export invalidates everything. Within a version, entries younger
+    than ttl are served directly; entries within the stale window are served
+    while a single background task rebuilds them. Concurrent misses for the
+    same key share one computation.
+    """
+    
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self.inflight: Dict[Hashable, asyncio.Task] = {}
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'refresh_errors': 0}
+    
+    async def get(self, key: Hashable, version: str, policy: CachePolicy,
+                  compute: Callable[[], Awaitable[bytes]]) -> CacheEntry:
+        """Return a cached response, computing or refreshing it as needed"""
+        entry = self.entries.get(key)
+        
+        if entry is not None and entry.version == version:
+            age = time.monotonic() - entry.created_at
+            if age < policy.ttl:
+                self.stats['hits'] += 1
+                self.entries.move_to_end(key)
+                return entry
+            if age < policy.ttl + policy.stale_ttl:
+                self.stats['stale_hits'] += 1
+                self.entries.move_to_end(key)
+                self._refresh_in_background(key, version, compute)
+                return entry
+        
+        self.stats['misses'] += 1
+        return await self._compute(key, version, compute)
+    
+    def invalidate(self):
+        """Drop every cached response"""
+        self.entries.clear()
+    
+    async def _compute(self, key: Hashable, version: str,
+                       compute: Callable[[], Awaitable[bytes]]) -> CacheEntry:
+        """Build an entry, joining an in-flight computation for the same key and version"""
+        inflight_key = (key, version)
+        task = self.inflight.get(inflight_key)
+        if task is None:
+            task = asyncio.ensure_future(self._build(key, version, compute))
+            self.inflight[inflight_key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(inflight_key, None))
+        
+        entry = await asyncio.shield(task)
+        if entry is None:
+            # Joined a background refresh that failed; compute directly
+            entry = await self._build(key, version, compute)
+        return entry
+    
+    async def _build(self, key: Hashable, version: str,
+                     compute: Callable[[], Awaitable[bytes]]) -> CacheEntry:
+        """Run the computation and store the result"""
+        started_at = time.monotonic()
+        body = await compute()
+        entry = CacheEntry(
+            body=body,
+            etag='"%s"' % hashlib.sha1(body).hexdigest()[:20],
+            version=version,
+            created_at=started_at
+        )
+        
+        # Don't let a slow build overwrite an entry that was stored after it started
+        current = self.entries.get(key)
+        if current is not None and current.created_at > started_at:
+            return entry
+        
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return entry
+    
+    def _refresh_in_background(self, key: Hashable, version: str,
+                               compute: Callable[[], Awaitable[bytes]]):
+        """Start a background rebuild unless one is already running"""
+        inflight_key = (key, version)
+        if inflight_key in self.inflight:
+            return
+        
+        async def refresh():
+            try:
+                return await self._build(key, version, compute)
+            except Exception as e:
+                self.stats['refresh_errors'] += 1
+                logger.warning(f"Background refresh failed for {key}: {e}")
+                return None
+        
+        task = asyncio.ensure_future(refresh())
+        self.inflight[inflight_key] = task
+        task.add_done_callback(lambda _: self.inflight.pop(inflight_key, None))
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return any(tag.removeprefix('W/') == etag for tag in candidates)
@@ -7,6 +7,7 @@ import random
 from datetime import datetime, timedelta, time
 from typing import List, Dict, Optional, Tuple
 from Core_Modules.tv_schedule_db import TVScheduleDB
+from Core_Modules.schedule_solver import ScheduleSolver, load_cooldown_history, save_cooldown_history
 
 class ScheduleManager:
     """Manages TV scheduling logic and algorithms"""
@@ -57,7 +58,8 @@ class ScheduleManager:
                               start_date: str, end_date: str,
                               max_consecutive: int = 3,
                               respect_duration: bool = True,
-                              prime_time_weight: float = 1.5) -> Dict:
+                              prime_time_weight: float = 1.5,
+                              cooldown_hours: float = 0) -> Dict:
         """
         Fill schedule with shows randomly with intelligent distribution
         
@@ -69,86 +71,95 @@ class ScheduleManager:
             max_consecutive: Maximum consecutive episodes of same show
             respect_duration: If True, respect show durations
             prime_time_weight: Weight factor for prime time slots (1.0 = no weight)
+            cooldown_hours: Minimum hours between airings of a show
         
         Returns:
             Dictionary with scheduling results
         """
-        # Get available shows for the channel
-        shows = self.db.get_shows(channel_id)
-        if not shows:
+        return self.fill_schedules(schedule_id, [channel_id], start_date, end_date,
+                                   max_consecutive=max_consecutive,
+                                   respect_duration=respect_duration,
+                                   prime_time_weight=prime_time_weight,
+                                   cooldown_hours=cooldown_hours)
+    
+    def fill_schedules(self, schedule_id: int, channel_ids: List[int],
+                       start_date: str, end_date: str,
+                       max_consecutive: int = 3,
+                       respect_duration: bool = True,
+                       prime_time_weight: float = 1.5,
+                       cooldown_hours: float = 0,
+                       cooldown_history: Optional[str] = None,
+                       seed: Optional[int] = None) -> Dict:
+        """
+        Fill the free time of several channels in one pass
+        
+        Slots already in the schedule are kept and packed around, so nothing
+        overlaps. See ScheduleSolver for the constraints applied.
+        
+        Args:
+            schedule_id: Schedule to fill
+            channel_ids: Channels to schedule for
+            start_date: Start date (YYYY-MM-DD)
+            end_date: End date (YYYY-MM-DD), inclusive
+            max_consecutive: Maximum consecutive episodes of same show
+            respect_duration: If True, respect show durations
+            prime_time_weight: Weight factor for prime time slots (1.0 = no weight)
+            cooldown_hours: Minimum hours between airings of a show
+            cooldown_history: JSON file of last-played times ({key: ISO timestamp}),
+                read before solving and updated afterwards
+            seed: Random seed, for reproducible schedules
+        
+        Returns:
+            Dictionary with scheduling results
+        """
+        channel_shows = {channel_id: [] for channel_id in channel_ids}
+        for show in self.db.get_shows():
+            if show['channel_id'] in channel_shows:
+                channel_shows[show['channel_id']].append(show)
+        
+        if not any(channel_shows.values()):
             return {
                 'success': False,
                 'message': 'No shows available for this channel',
                 'slots_filled': 0
             }
         
-        # Create time grid
-        time_slots = self.create_time_grid(start_date, end_date, self.time_slot_duration)
+        start_dt = datetime.strptime(start_date, "%Y-%m-%d")
+        end_dt = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
         
-        # Track scheduling
-        slots_filled = 0
-        conflicts = 0
-        last_show_id = None
-        consecutive_count = 0
+        # Existing slots in the window, per channel
+        busy = {channel_id: [] for channel_id in channel_ids}
+        existing = 0
+        for slot in self.db.iter_time_slots(schedule_id, channel_ids,
+                                            window_start=start_dt.strftime("%Y-%m-%d %H:%M:%S"),
+                                            window_end=end_dt.strftime("%Y-%m-%d %H:%M:%S")):
+            busy[slot['channel_id']].append((datetime.fromisoformat(slot['start_time']),
+                                             datetime.fromisoformat(slot['end_time'])))
+            existing += 1
         
-        for slot_start, slot_end in time_slots:
-            # Check if slot is already occupied
-            if self.db.check_time_conflict(schedule_id, channel_id, slot_start, slot_end):
-                conflicts += 1
-                continue
-            
-            # Apply prime time weighting (7 PM - 11 PM)
-            slot_hour = datetime.strptime(slot_start, "%Y-%m-%d %H:%M:%S").hour
-            is_prime_time = 19 <= slot_hour <= 23
-            
-            # Select show
-            if consecutive_count >= max_consecutive or last_show_id is None:
-                # Need to switch shows
-                available_shows = [s for s in shows if s['show_id'] != last_show_id]
-                if not available_shows:
-                    available_shows = shows
-                
-                # Weight shows for prime time
-                if is_prime_time and prime_time_weight > 1.0:
-                    # Prefer longer/featured shows in prime time
-                    weights = [
-                        prime_time_weight if show['duration_minutes'] >= 60 else 1.0
-                        for show in available_shows
-                    ]
-                    show = random.choices(available_shows, weights=weights)[0]
-                else:
-                    show = random.choice(available_shows)
-                
-                last_show_id = show['show_id']
-                consecutive_count = 1
-            else:
-                # Continue with same show
-                show = next((s for s in shows if s['show_id'] == last_show_id), shows[0])
-                consecutive_count += 1
-            
-            # Calculate actual end time based on show duration
-            if respect_duration:
-                actual_end = datetime.strptime(slot_start, "%Y-%m-%d %H:%M:%S") + \
-                           timedelta(minutes=show['duration_minutes'])
-                slot_end = actual_end.strftime("%Y-%m-%d %H:%M:%S")
-            
-            # Add time slot
-            try:
-                self.db.add_time_slot(
-                    schedule_id, channel_id, show['show_id'],
-                    slot_start, slot_end, is_repeat=(consecutive_count > 1),
-                    notes=f"Auto-scheduled{'(Prime Time)' if is_prime_time else ''}"
-                )
-                slots_filled += 1
-            except Exception as e:
-                conflicts += 1
-                continue
+        history = load_cooldown_history(cooldown_history) if cooldown_history else {}
+        
+        solver = ScheduleSolver(max_consecutive=max_consecutive,
+                                prime_time_weight=prime_time_weight,
+                                cooldown_hours=cooldown_hours,
+                                respect_duration=respect_duration,
+                                grid_minutes=self.time_slot_duration,
+                                seed=seed)
+        result = solver.solve(channel_shows, start_dt, end_dt, busy=busy, last_played=history)
+        
+        slots_filled = self.db.add_time_slots(schedule_id, result['slots']) if result['slots'] else 0
+        
+        if cooldown_history:
+            save_cooldown_history(cooldown_history, result['last_played'])
         
         return {
             'success': True,
             'slots_filled': slots_filled,
-            'conflicts': conflicts,
-            'total_slots': len(time_slots)
+            'conflicts': 0,
+            'existing_slots': existing,
+            'total_slots': slots_filled + existing,
+            'cooldown_relaxed': result['cooldown_relaxed'],
+            'channels': result['channels']
         }
     
     def fill_schedule_sequential(self, schedule_id: int, channel_id: int,
@@ -0,0 +1,346 @@
+"""
+Schedule Solver
+Fills many channels over a date range in one chronological pass. Each
+channel's free time (the window minus slots already booked) is packed with
+runs of whole shows, subject to show durations, a maximum run of the same
+show, prime-time weighting and replay cooldowns shared across channels.
+"""
+
+import json
+import heapq
+import random
+import logging
+from bisect import bisect_right
+from itertools import accumulate
+from pathlib import Path
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from Core_Modules.file_utils import write_atomic
+
+logger = logging.getLogger(__name__)
+
+PRIME_TIME_HOURS = range(19, 24)  # 7 PM - 11 PM slots, as in ScheduleManager
+SAMPLE_ATTEMPTS = 8               # weighted draws before scanning every candidate
+
+
+def cooldown_key(show: Dict) -> str:
+    """
+    Identity used for replay cooldowns: the show's file or URL when known,
+    so the same video shares one cooldown across channels, else its name
+    """
+    metadata = show.get('metadata')
+    if isinstance(metadata, dict):
+        for field in ('file_path', 'url'):
+            if metadata.get(field):
+                return str(metadata[field])
+    return show['name']
+
+
+def load_cooldown_history(path) -> Dict[str, datetime]:
+    """
+    Read last-played times ({key: ISO timestamp}) from a cooldown history file
+    
+    A missing or corrupt file gives an empty history; unreadable entries are skipped.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable cooldown history {path}: {e}")
+        return {}
+    
+    history = {}
+    for key, value in (data.items() if isinstance(data, dict) else ()):
+        try:
+            played = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        except ValueError:
+            continue
+        if played.tzinfo is not None:
+            # Schedule times are naive local time
+            played = played.astimezone().replace(tzinfo=None)
+        history[key] = played
+    return history
+
+
+def save_cooldown_history(path, history: Dict[str, datetime]) -> None:
+    """Write last-played times back to a cooldown history file"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(path, json.dumps({key: played.isoformat() for key, played in sorted(history.items())}, indent=2))
+
+
+class _Channel:
+    """Per-channel solver state"""
+    
+    __slots__ = ('channel_id', 'show_ids', 'keys', 'durations', 'cum_weights', 'cum_prime',
+                 'gaps', 'gap', 'last', 'filled', 'unfilled')
+    
+    def __init__(self, channel_id: int, shows: List[Dict], gaps: List[Tuple[int, int]],
+                 respect_duration: bool, grid_minutes: int, prime_time_weight: float):
+        # Candidates sorted by duration, so the shows fitting a gap are a prefix
+        if respect_duration:
+            shows = sorted(shows, key=lambda s: max(int(s['duration_minutes']), 1))
+        self.channel_id = channel_id
+        self.show_ids = [s['show_id'] for s in shows]
+        self.keys = [cooldown_key(s) for s in shows]
+        self.durations = [max(int(s['duration_minutes']), 1) if respect_duration else grid_minutes
+                          for s in shows]
+        self.cum_weights = list(accumulate(1.0 for _ in shows))
+        self.cum_prime = list(accumulate(prime_time_weight if s['duration_minutes'] >= 60 else 1.0
+                                         for s in shows))
+        self.gaps = gaps
+        self.gap = 0
+        self.last = -1
+        self.filled = 0
+        self.unfilled = 0
+
+
+class ScheduleSolver:
+    """
+    Constraint-based scheduler for many channels at once
+    
+    Time runs in whole minutes from the window start. Channels are advanced
+    through a heap keyed on their next free minute, so every decision is made
+    in time order across channels and a show's cooldown (which can be shared
+    by several channels through cooldown_key) is always up to date.
+    
+    At each free minute the solver picks a show that fits the rest of the
+    free gap (a bisect over durations), is not the show that just ran, and is
+    out of cooldown; prime-time starts favour shows of an hour or more. The
+    show then runs up to max_consecutive times back to back, which counts as
+    one airing for its cooldown. If every fitting show is cooling down, the
+    one available soonest is used and the relaxation is counted.
+    """
+    
+    def __init__(self, max_consecutive: int = 3, prime_time_weight: float = 1.5,
+                 cooldown_hours: float = 0, respect_duration: bool = True,
+                 grid_minutes: int = 30, seed: Optional[int] = None):
+        """
+        Initialize the solver
+        
+        Args:
+            max_consecutive: Maximum consecutive airings of the same show
+            prime_time_weight: Weight of 60+ minute shows starting in prime time (1.0 = no weight)
+            cooldown_hours: Minimum gap between airings of a show (0 = no cooldown)
+            respect_duration: If False, every airing takes one grid slot
+            grid_minutes: Slot length when respect_duration is False
+            seed: Random seed, for reproducible schedules
+        """
+        self.max_consecutive = max(1, max_consecutive)
+        self.prime_time_weight = max(prime_time_weight, 1.0)
+        self.cooldown_minutes = int(cooldown_hours * 60)
+        self.respect_duration = respect_duration
+        self.grid_minutes = grid_minutes
+        self.random = random.Random(seed)
+    
+    def solve(self, channel_shows: Dict[int, List[Dict]], start_dt: datetime, end_dt: datetime,
+              busy: Optional[Dict[int, Iterable[Tuple[datetime, datetime]]]] = None,
+              last_played: Optional[Dict[str, datetime]] = None) -> Dict:
+        """
+        Plan airings for every channel between start_dt and end_dt
+        
+        Args:
+            channel_shows: channel_id -> shows (dicts with show_id, name,
+                duration_minutes and optional metadata)
+            start_dt: Window start
+            end_dt: Window end
+            busy: channel_id -> (start, end) of slots already booked
+            last_played: cooldown_key -> end of the show's last airing
+        
+        Returns:
+            Dict with 'slots' ((channel_id, show_id, start_time, end_time,
+            is_repeat, notes) tuples, as taken by TVScheduleDB.add_time_slots),
+            per-channel 'channels' stats, 'cooldown_relaxed' and the updated
+            'last_played'
+        """
+        busy = busy or {}
+        window = int((end_dt - start_dt).total_seconds() // 60)
+        day_offset = start_dt.hour * 60 + start_dt.minute
+        cooldown = self.cooldown_minutes
+        max_run = self.max_consecutive
+        rand = self.random.random
+        
+        # Minute from which each show may air again
+        available: Dict[str, int] = {}
+        for key, played in (last_played or {}).items():
+            available[key] = int((played - start_dt).total_seconds() // 60) + cooldown
+        
+        channels = []
+        heap = []
+        for channel_id, shows in channel_shows.items():
+            if not shows:
+                continue
+            gaps = self._free_gaps(busy.get(channel_id, ()), start_dt, window)
+            state = _Channel(channel_id, shows, gaps, self.respect_duration,
+                             self.grid_minutes, self.prime_time_weight)
+            channels.append(state)
+            if gaps:
+                heap.append((gaps[0][0], len(channels) - 1))
+        heapq.heapify(heap)
+        
+        slot_channels: List[int] = []
+        slot_shows: List[int] = []
+        slot_starts: List[int] = []
+        slot_minutes: List[int] = []
+        slot_repeats: List[bool] = []
+        slot_prime: List[bool] = []
+        aired: Dict[str, int] = {}
+        relaxed = 0
+        
+        while heap:
+            cursor, index = heapq.heappop(heap)
+            state = channels[index]
+            gap_end = state.gaps[state.gap][1]
+            remaining = gap_end - cursor
+            durations = state.durations
+            
+            fitting = bisect_right(durations, remaining) if self.respect_duration else \
+                (len(durations) if remaining >= self.grid_minutes else 0)
+            
+            if fitting == 0:
+                # Nothing fits the rest of this gap; move to the next one
+                state.unfilled += remaining
+                state.gap += 1
+                if state.gap < len(state.gaps):
+                    heapq.heappush(heap, (state.gaps[state.gap][0], index))
+                continue
+            
+            prime = ((day_offset + cursor) // 60) % 24 in PRIME_TIME_HOURS
+            cum = state.cum_prime if prime else state.cum_weights
+            keys = state.keys
+            last = state.last if fitting > 1 else -1
+            
+            # Weighted draws over the fitting prefix; almost always succeed
+            choice = -1
+            total = cum[fitting - 1]
+            for _ in range(SAMPLE_ATTEMPTS):
+                candidate = bisect_right(cum, rand() * total, 0, fitting - 1)
+                if candidate != last and available.get(keys[candidate], cursor) <= cursor:
+                    choice = candidate
+                    break
+            
+            if choice == -1:
+                eligible = [i for i in range(fitting)
+                            if i != last and available.get(keys[i], cursor) <= cursor]
+                if eligible:
+                    weights = [cum[i] - (cum[i - 1] if i else 0.0) for i in eligible]
+                    choice = self.random.choices(eligible, weights=weights)[0]
+                else:
+                    # Every fitting show is cooling down: take the one free soonest
+                    choice = min((i for i in range(fitting) if i != last),
+                                 key=lambda i: available.get(keys[i], cursor))
+                    relaxed += 1
+            
+            duration = durations[choice]
+            run = min(max_run, remaining // duration)
+            for episode in range(run):
+                slot_channels.append(state.channel_id)
+                slot_shows.append(state.show_ids[choice])
+                slot_starts.append(cursor + episode * duration)
+                slot_minutes.append(duration)
+                slot_repeats.append(episode > 0)
+                slot_prime.append(prime)
+            
+            cursor += run * duration
+            available[keys[choice]] = cursor + cooldown
+            aired[keys[choice]] = cursor
+            state.last = choice
+            state.filled += run
+            
+            if cursor < gap_end:
+                heapq.heappush(heap, (cursor, index))
+            else:
+                state.gap += 1
+                if state.gap < len(state.gaps):
+                    heapq.heappush(heap, (state.gaps[state.gap][0], index))
+        
+        starts = np.asarray(slot_starts, dtype=np.int64)
+        start_times = _timestamps(start_dt, starts)
+        end_times = _timestamps(start_dt, starts + np.asarray(slot_minutes, dtype=np.int64))
+        notes = ("Auto-scheduled", "Auto-scheduled (Prime Time)")
+        
+        history = dict(last_played or {})
+        for key, minute in aired.items():
+            history[key] = start_dt + timedelta(minutes=minute)
+        
+        return {
+            'slots': list(zip(slot_channels, slot_shows, start_times, end_times, slot_repeats,
+                              (notes[p] for p in slot_prime))),
+            'channels': {
+                state.channel_id: {
+                    'slots_filled': state.filled,
+                    'unfilled_minutes': state.unfilled,
+                } for state in channels
+            },
+            'cooldown_relaxed': relaxed,
+            'last_played': history,
+        }
+    
+    @staticmethod
+    def _free_gaps(booked: Iterable[Tuple[datetime, datetime]], start_dt: datetime,
+                   window: int) -> List[Tuple[int, int]]:
+        """Free (start, end) minute ranges of the window around the booked slots"""
+        intervals = []
+        for slot_start, slot_end in booked:
+            begin = max(int((slot_start - start_dt).total_seconds() // 60), 0)
+            end = min(-int(-(slot_end - start_dt).total_seconds() // 60), window)
+            if begin < end:
+                intervals.append((begin, end))
+        intervals.sort()
+        
+        gaps = []
+        cursor = 0
+        for begin, end in intervals:
+            if begin > cursor:
+                gaps.append((cursor, begin))
+            cursor = max(cursor, end)
+        if cursor < window:
+            gaps.append((cursor, window))
+        return gaps
+
+
+def _timestamps(start_dt: datetime, offsets: np.ndarray) -> List[str]:
+    """Format minute offsets from start_dt as "YYYY-MM-DD HH:MM:SS" in bulk"""
+    base = np.datetime64(start_dt.replace(microsecond=0), 's')
+    stamps = np.datetime_as_string(base + offsets.astype('timedelta64[m]'), unit='s')
+    return [stamp.replace('T', ' ') for stamp in stamps.tolist()]
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    
+    parser = argparse.ArgumentParser(description="Benchmark the schedule solver on synthetic channels")
+    parser.add_argument('--channels', type=int, default=100, help='Channels to fill')
+    parser.add_argument('--days', type=int, default=30, help='Days to fill')
+    parser.add_argument('--shows', type=int, default=40, help='Shows per channel')
+    parser.add_argument('--cooldown-hours', type=float, default=24, help='Replay cooldown')
+    parser.add_argument('--seed', type=int, default=1)
+    
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    channel_shows = {
+        channel_id: [{'show_id': channel_id * args.shows + n, 'name': f"Show {channel_id}-{n}",
+                      'duration_minutes': rng.choice((22, 30, 44, 60, 90, 120))}
+                     for n in range(args.shows)]
+        for channel_id in range(1, args.channels + 1)
+    }
+    start = datetime(2025, 1, 1)
+    
+    began = time.perf_counter()
+    result = ScheduleSolver(cooldown_hours=args.cooldown_hours, seed=args.seed).solve(
+        channel_shows, start, start + timedelta(days=args.days))
+    seconds = time.perf_counter() - began
+    
+    slots = len(result['slots'])
+    unfilled = sum(c['unfilled_minutes'] for c in result['channels'].values())
+    print(f"{args.channels} channels x {args.days} days: {slots} slots in {seconds:.2f}s "
+          f"({slots / seconds:,.0f} slots/s)")
+    print(f"unfilled: {unfilled} of {args.channels * args.days * 1440} minutes, "
+          f"cooldown relaxed {result['cooldown_relaxed']} times")
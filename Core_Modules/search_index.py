@@ -0,0 +1,207 @@
+"""
+Channel Search Index
+In-memory inverted index over channel fields with exact, prefix and
+substring (trigram) matching and field-weighted ranking
+"""
+
+import re
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Field weights used when none are given
+DEFAULT_FIELDS = {'name': 3.0, 'tvg_id': 2.0, 'group': 1.0}
+
+# Score multipliers by how a query token matched an indexed term
+EXACT_BOOST = 3.0
+PREFIX_BOOST = 2.0
+SUBSTRING_BOOST = 1.0
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: Any) -> List[str]:
+    """Split text into lowercase word tokens"""
+    if text is None:
+        return []
+    return _TOKEN_RE.findall(str(text).casefold())
+
+
+def _trigrams(term: str) -> set:
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+
+class SearchIndex:
+    """
+    Inverted index: term -> postings of (document, field)
+    
+    Every query token must match (AND). A token matches a term exactly, as a
+    prefix (bisect over the sorted vocabulary) or, for tokens of three or more
+    characters, as a substring (trigram lookup over the vocabulary). Documents
+    are ranked by the sum of field weight x match boost over query tokens, ties
+    broken by insertion order.
+    
+    finalize() lays the postings out as one flat array in vocabulary order, so
+    the postings of every term sharing a prefix form a single contiguous slice
+    and scoring is a handful of vectorized passes. Indexes are built once:
+    add() is only valid before finalize().
+    """
+    
+    def __init__(self, fields: Optional[Dict[str, float]] = None):
+        self.fields = dict(fields or DEFAULT_FIELDS)
+        self.field_names = list(self.fields)
+        self.field_weights = np.array([self.fields[f] for f in self.field_names], dtype=np.float32)
+        self.doc_ids: List[Any] = []
+        self.terms: List[str] = []
+        self._pending: Optional[Dict[str, array]] = {}
+        self._postings = np.zeros(0, dtype=np.int64)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._trigrams: Dict[str, np.ndarray] = {}
+    
+    @classmethod
+    def build(cls, docs: Iterable[Tuple[Any, Dict]],
+              fields: Optional[Dict[str, float]] = None) -> "SearchIndex":
+        """Build an index from (doc_id, document) pairs"""
+        index = cls(fields)
+        for doc_id, doc in docs:
+            index.add(doc_id, doc)
+        index.finalize()
+        return index
+    
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+    
+    def add(self, doc_id: Any, doc: Dict):
+        """Index one document"""
+        if self._pending is None:
+            raise RuntimeError("SearchIndex is finalized; build a new index to add documents")
+        
+        doc_number = len(self.doc_ids)
+        self.doc_ids.append(doc_id)
+        slots = len(self.field_names)
+        
+        for field_number, field in enumerate(self.field_names):
+            value = doc.get(field)
+            terms = set(tokenize(value))
+            # Identifiers like "bbc.one.uk" are also searchable as a whole
+            if value and field == 'tvg_id':
+                terms.add(str(value).casefold())
+            for term in terms:
+                postings = self._pending.get(term)
+                if postings is None:
+                    postings = self._pending[term] = array('q')
+                postings.append(doc_number * slots + field_number)
+    
+    def finalize(self):
+        """Flatten postings in vocabulary order and build the trigram map"""
+        if self._pending is None:
+            return
+        
+        self.terms = sorted(self._pending)
+        lengths = np.fromiter((len(self._pending[t]) for t in self.terms),
+                              dtype=np.int64, count=len(self.terms))
+        self._offsets = np.zeros(len(self.terms) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self._offsets[1:])
+        
+        postings = np.empty(int(self._offsets[-1]), dtype=np.int64)
+        for term_number, term in enumerate(self.terms):
+            postings[self._offsets[term_number]:self._offsets[term_number + 1]] = self._pending[term]
+        self._postings = postings
+        self._pending = None
+        
+        trigrams: Dict[str, array] = {}
+        for term_number, term in enumerate(self.terms):
+            for gram in _trigrams(term):
+                trigrams.setdefault(gram, array('q')).append(term_number)
+        self._trigrams = {gram: np.frombuffer(ids, dtype=np.int64) for gram, ids in trigrams.items()}
+    
+    def search(self, query: str, limit: Optional[int] = None) -> Tuple[List[Tuple[Any, float]], int]:
+        """
+        Search the index
+        
+        Returns:
+            ([(doc_id, score), ...] best first, total number of matches)
+        """
+        self.finalize()
+        
+        tokens = set(tokenize(query))
+        if not tokens or not self.doc_ids:
+            return [], 0
+        
+        total = np.zeros(len(self.doc_ids), dtype=np.float32)
+        matched = None
+        for token in tokens:
+            best = self._score_token(token)
+            matched = best > 0 if matched is None else matched & (best > 0)
+            total += best
+        
+        docs = np.flatnonzero(matched)
+        if limit is not None and len(docs) > limit:
+            # Keep everything above the limit-th best score, then fill ties in doc order
+            scores = total[docs]
+            threshold = np.partition(scores, len(scores) - limit)[len(scores) - limit]
+            above = docs[scores > threshold]
+            ties = docs[scores == threshold][:limit - len(above)]
+            docs = np.concatenate([above, ties])
+        
+        order = np.lexsort((docs, -total[docs]))
+        ranked = docs[order]
+        return [(self.doc_ids[d], float(total[d])) for d in ranked], int(matched.sum())
+    
+    def _score_token(self, token: str) -> np.ndarray:
+        """Best score per document for one query token (0 where it doesn't match)"""
+        best = np.zeros(len(self.doc_ids), dtype=np.float32)
+        slots = len(self.field_names)
+        
+        # Substring matches first so higher-scoring matches overwrite them
+        substring_terms = self._substring_terms(token)
+        if len(substring_terms):
+            starts = self._offsets[substring_terms]
+            lengths = self._offsets[substring_terms + 1] - starts
+            positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            self._assign(best, self._postings[positions], SUBSTRING_BOOST, slots)
+        
+        # Terms sharing the prefix are one contiguous run; the exact term (if any) leads it
+        start = bisect_left(self.terms, token)
+        end = bisect_left(self.terms, token + '\U0010ffff', start)
+        if start < end:
+            exact = start if self.terms[start] == token else None
+            prefix_from = start + 1 if exact is not None else start
+            self._assign(best, self._postings[self._offsets[prefix_from]:self._offsets[end]],
+                         PREFIX_BOOST, slots)
+            if exact is not None:
+                self._assign(best, self._postings[self._offsets[exact]:self._offsets[exact + 1]],
+                             EXACT_BOOST, slots)
+        return best
+    
+    def _assign(self, best: np.ndarray, postings: np.ndarray, boost: float, slots: int):
+        """Raise best[doc] to weight x boost for each posting"""
+        if not len(postings):
+            return
+        docs, fields = np.divmod(postings, slots)
+        # One pass per field, lowest weight first, so the best match per doc wins
+        for field_number in np.argsort(self.field_weights, kind='stable'):
+            field_docs = docs[fields == field_number]
+            if len(field_docs):
+                score = self.field_weights[field_number] * boost
+                best[field_docs] = np.maximum(best[field_docs], score)
+    
+    def _substring_terms(self, token: str) -> np.ndarray:
+        """Vocabulary terms containing the token other than at the start"""
+        if len(token) < 3:
+            return np.zeros(0, dtype=np.int64)
+        
+        grams = sorted(_trigrams(token), key=lambda g: len(self._trigrams.get(g, ())))
+        candidates = self._trigrams.get(grams[0])
+        if candidates is None:
+            return np.zeros(0, dtype=np.int64)
+        for gram in grams[1:]:
+            candidates = np.intersect1d(candidates, self._trigrams.get(gram, ()), assume_unique=True)
+            if not len(candidates):
+                return candidates
+        
+        terms = self.terms
+        return np.array([t for t in candidates.tolist()
+                         if token in terms[t] and not terms[t].startswith(token)], dtype=np.int64)
@@ -23,6 +23,7 @@ class SettingsManager:
         "default_epg_url": "",
         "recent_files": [],
         "cache_thumbnails": True,
+        "cache_logos_on_load": False,
         "use_ffmpeg_extraction": False,
         "output_base_dir": None,  # None means use default
         "max_recent_files": 10,
@@ -107,7 +108,7 @@ class SettingsManager:
                     self.settings[key] = self.DEFAULT_SETTINGS.get(key, 1)
         
         # Validate boolean settings
-        boolean_settings = ['auto_check_channels', 'cache_thumbnails', 'use_ffmpeg_extraction',
+        boolean_settings = ['auto_check_channels', 'cache_thumbnails', 'cache_logos_on_load', 'use_ffmpeg_extraction',
                           'enable_auto_save', 'enable_logging', 'show_tooltips',
                           'confirm_delete', 'auto_organize_on_load', 'preserve_channel_numbers',
                           'backup_on_save']
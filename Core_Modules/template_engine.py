@@ -0,0 +1,192 @@
+"""
+Template Engine
+Process-wide cache of page templates and inlined JS libraries for the page
+generators. Templates are split once into literal segments and placeholders,
+so rendering a page is a single join instead of repeated whole-document
+str.replace calls. Cached files are reloaded when their mtime or size changes.
+"""
+
+import os
+import re
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class Template:
+    """
+    A template pre-split on a fixed set of placeholder strings
+    
+    Every occurrence of each placeholder is replaced in one left-to-right pass
+    (longest placeholder first where they overlap). Placeholders missing from
+    the render values are left as they are.
+    """
+    
+    def __init__(self, text: str, placeholders: Iterable[str]):
+        """
+        Initialize the template
+        
+        Args:
+            text: Template source
+            placeholders: Literal strings to substitute at render time
+        """
+        names = sorted(set(placeholders), key=len, reverse=True)
+        self.placeholders = tuple(names)
+        # Even indices are literal text, odd indices are placeholder names
+        self.segments: List[str] = (
+            re.split('(' + '|'.join(map(re.escape, names)) + ')', text) if names else [text]
+        )
+    
+    def render(self, values: Dict[str, str]) -> str:
+        """
+        Render the template
+        
+        Args:
+            values: placeholder -> replacement text
+        
+        Returns:
+            Rendered document
+        """
+        parts = self.segments[:]
+        for i in range(1, len(parts), 2):
+            parts[i] = values.get(parts[i], parts[i])
+        return ''.join(parts)
+    
+    def count(self, placeholder: str) -> int:
+        """Occurrences of a placeholder in the template"""
+        return self.segments[1::2].count(placeholder)
+
+
+_file_cache: Dict[str, Tuple[Tuple[int, int], str]] = {}
+_template_cache: Dict[Tuple, Tuple[Tuple[int, int], Template]] = {}
+_lock = threading.Lock()
+_tracking = threading.local()
+
+
+def _signature(path: Path) -> Tuple[int, int]:
+    stat = os.stat(path)
+    signature = stat.st_mtime_ns, stat.st_size
+    deps = getattr(_tracking, 'deps', None)
+    if deps is not None:
+        deps[str(path)] = list(signature)
+    return signature
+
+
+@contextmanager
+def track_dependencies(copies: Optional[List[str]] = None):
+    """
+    Collect the files read through the cache inside the block (for build
+    manifests)
+    
+    Args:
+        copies: Optional list that collects the files copied next to the
+            output (see record_copy)
+    
+    Yields:
+        Dict of path -> [mtime_ns, size], filled as files are used
+    """
+    previous = getattr(_tracking, 'deps', None), getattr(_tracking, 'copies', None)
+    deps: Dict[str, list] = {}
+    _tracking.deps = deps
+    _tracking.copies = copies
+    try:
+        yield deps
+    finally:
+        _tracking.deps, _tracking.copies = previous
+
+
+def record_dependency(path) -> None:
+    """Add a file the current build depends on without reading it (e.g. a published asset)"""
+    if getattr(_tracking, 'deps', None) is not None:
+        try:
+            _signature(Path(path))
+        except FileNotFoundError:
+            _tracking.deps[str(path)] = None
+
+
+def record_copy(source, dest) -> None:
+    """
+    Record a file copied next to the output (CSS, JS, libraries): the source
+    is a dependency and the copy must still exist for the output to be fresh
+    """
+    record_dependency(source)
+    copies = getattr(_tracking, 'copies', None)
+    if copies is not None:
+        copies.append(str(dest))
+
+
+def read_cached(path, default: Optional[str] = None) -> str:
+    """
+    Read a text file (template, JS library) through the cache
+    
+    Args:
+        path: File path
+        default: Returned when the file doesn't exist (None raises FileNotFoundError)
+    
+    Returns:
+        File contents
+    """
+    path = Path(path)
+    try:
+        signature = _signature(path)
+    except FileNotFoundError:
+        if default is None:
+            raise
+        # A build that used the default must notice the file appearing
+        deps = getattr(_tracking, 'deps', None)
+        if deps is not None:
+            deps[str(path)] = None
+        return default
+    
+    key = str(path)
+    with _lock:
+        cached = _file_cache.get(key)
+        if cached and cached[0] == signature:
+            return cached[1]
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    with _lock:
+        _file_cache[key] = (signature, text)
+    return text
+
+
+def get_template(path, placeholders: Iterable[str],
+                 prepare: Optional[Callable[[str], str]] = None) -> Template:
+    """
+    Load a template through the cache
+    
+    Args:
+        path: Template file
+        placeholders: Literal strings to substitute at render time
+        prepare: Optional one-off transform applied to the source before
+            splitting (e.g. turning a region into a placeholder)
+    
+    Returns:
+        Pre-split Template
+    """
+    path = Path(path)
+    placeholders = tuple(placeholders)
+    key = (str(path), placeholders, prepare)
+    signature = _signature(path)
+    
+    with _lock:
+        cached = _template_cache.get(key)
+        if cached and cached[0] == signature:
+            return cached[1]
+    
+    text = read_cached(path)
+    if prepare is not None:
+        text = prepare(text)
+    template = Template(text, placeholders)
+    with _lock:
+        _template_cache[key] = (signature, template)
+    return template
+
+
+def clear_cache() -> None:
+    """Drop all cached files and templates"""
+    with _lock:
+        _file_cache.clear()
+        _template_cache.clear()
@@ -0,0 +1,269 @@
+"""
+Thumbnail Processor
+Batch resizing/transcoding of channel logos and placeholder thumbnails in a
+process pool, with content-hash skipping and optional sprite sheets
+"""
+
+import io
+import os
+import json
+import math
+import hashlib
+import logging
+from pathlib import Path
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from file_utils import write_atomic
+
+try:
+    from PIL import Image, ImageDraw, ImageFont, ImageOps
+    PILLOW_AVAILABLE = True
+except ImportError:
+    PILLOW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# format name -> (Pillow format, file extension)
+THUMBNAIL_FORMATS = {
+    'webp': ('WEBP', '.webp'),
+    'jpeg': ('JPEG', '.jpg'),
+}
+
+BACKGROUND = (30, 30, 30)
+FONT_BOLD = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+FONT_REGULAR = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+
+
+class ThumbnailProcessor:
+    """
+    Produces fixed-size thumbnails
+    - Logos are letterboxed onto the target size, placeholders are drawn from
+      channel name/group/number
+    - Output files are named by a hash of their input and settings, so an
+      unchanged input is never processed twice
+    - Work is sent to a process pool in batches; small jobs run inline
+    """
+    
+    def __init__(self, output_dir: Path, size: Tuple[int, int] = (480, 270), fmt: str = 'webp',
+                 quality: int = 80, workers: Optional[int] = None, batch_size: int = 32):
+        """
+        Initialize the processor
+        
+        Args:
+            output_dir: Directory for generated thumbnails
+            size: Thumbnail (width, height)
+            fmt: 'webp' or 'jpeg'
+            quality: Encoder quality (1-100)
+            workers: Pool size (default: CPU count)
+            batch_size: Images per pool task
+        """
+        if not PILLOW_AVAILABLE:
+            raise ImportError("Pillow is required for thumbnail processing")
+        if fmt not in THUMBNAIL_FORMATS:
+            raise ValueError(f"Unsupported thumbnail format: {fmt}")
+        
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.size = tuple(size)
+        self.fmt = fmt
+        self.quality = quality
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.stats = {'processed': 0, 'skipped': 0, 'failed': 0}
+    
+    def process_images(self, sources: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Resize/transcode image files
+        
+        Args:
+            sources: Image paths (e.g. logos from logo_cache)
+        
+        Returns:
+            {source: thumbnail_path}, None for unreadable sources
+        """
+        jobs = []
+        results: Dict[str, Optional[str]] = {}
+        for source in dict.fromkeys(str(s) for s in sources if s):
+            try:
+                with open(source, 'rb') as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+            except OSError as e:
+                logger.warning(f"Cannot read thumbnail source {source}: {e}")
+                results[source] = None
+                self.stats['failed'] += 1
+                continue
+            jobs.append((source, ('image', source), self._output_path(digest)))
+        results.update(self._run(jobs))
+        return results
+    
+    def generate_placeholders(self, channels: List[Dict]) -> List[Optional[str]]:
+        """
+        Draw placeholder thumbnails for channels
+        
+        Args:
+            channels: Channel dictionaries (name, group, num)
+        
+        Returns:
+            Thumbnail path per channel, in order
+        """
+        jobs = []
+        for index, ch in enumerate(channels):
+            text = (str(ch.get('name', 'Unknown'))[:40], str(ch.get('group', 'Other')), str(ch.get('num', '?')))
+            digest = hashlib.sha256(json.dumps(text).encode('utf-8')).hexdigest()
+            jobs.append((index, ('placeholder', text), self._output_path(digest)))
+        
+        results = self._run(jobs)
+        return [results.get(index) for index in range(len(channels))]
+    
+    def build_sprite(self, thumbnails: Mapping[str, str], tile: Optional[Tuple[int, int]] = None,
+                     columns: Optional[int] = None, name: str = "sprite") -> Dict[str, Any]:
+        """
+        Pack thumbnails into one sprite sheet, with a JSON map and CSS classes
+        
+        Args:
+            thumbnails: {key: thumbnail_path}, e.g. channel id -> thumbnail
+            tile: Tile (width, height) (default: thumbnail size)
+            columns: Tiles per row (default: roughly square sheet)
+            name: Base name of the sheet files
+        
+        Returns:
+            {'image', 'map', 'css', 'tile', 'columns', 'positions': {key: [x, y]}, 'classes': {key: css_class}}
+        """
+        items = [(key, path) for key, path in thumbnails.items() if path]
+        tile_w, tile_h = tile or self.size
+        columns = columns or max(1, math.ceil(math.sqrt(len(items))))
+        rows = max(1, math.ceil(len(items) / columns))
+        
+        sheet = Image.new('RGB', (columns * tile_w, rows * tile_h), BACKGROUND)
+        positions = {}
+        for i, (key, path) in enumerate(items):
+            x, y = (i % columns) * tile_w, (i // columns) * tile_h
+            try:
+                with Image.open(path) as img:
+                    sheet.paste(_fit(img, (tile_w, tile_h)), (x, y))
+            except Exception as e:
+                logger.warning(f"Skipping {path} in sprite: {e}")
+                continue
+            positions[key] = [x, y]
+        
+        pil_format, ext = THUMBNAIL_FORMATS[self.fmt]
+        buffer = io.BytesIO()
+        sheet.save(buffer, pil_format, quality=self.quality)
+        data = buffer.getvalue()
+        image_name = f"{name}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+        write_atomic(self.output_dir / image_name, data)
+        
+        css = [f".{name} {{ width: {tile_w}px; height: {tile_h}px; "
+               f"background: url('{image_name}') no-repeat; }}"]
+        for i, (key, (x, y)) in enumerate(positions.items()):
+            css.append(f".{name}-{i} {{ background-position: -{x}px -{y}px; }}")
+        css_path = self.output_dir / f"{name}.css"
+        write_atomic(css_path, "\n".join(css))
+        
+        sprite = {
+            'image': image_name,
+            'tile': [tile_w, tile_h],
+            'columns': columns,
+            'positions': positions,
+            'classes': {key: f"{name}-{i}" for i, key in enumerate(positions)}
+        }
+        map_path = self.output_dir / f"{name}.json"
+        write_atomic(map_path, json.dumps(sprite, indent=2))
+        
+        sprite.update({'image': str(self.output_dir / image_name), 'map': str(map_path), 'css': str(css_path)})
+        return sprite
+    
+    def _output_path(self, input_digest: str) -> Path:
+        """Thumbnail path for an input hash under the current settings"""
+        settings = f"{input_digest}:{self.size[0]}x{self.size[1]}:{self.fmt}:{self.quality}"
+        name = hashlib.sha256(settings.encode('utf-8')).hexdigest()[:24]
+        return self.output_dir / f"{name}{THUMBNAIL_FORMATS[self.fmt][1]}"
+    
+    def _run(self, jobs: List[Tuple[Any, Tuple, Path]]) -> Dict[Any, Optional[str]]:
+        """Render the jobs whose output doesn't exist yet; jobs are (key, source, output_path)"""
+        results: Dict[Any, Optional[str]] = {}
+        pending = []
+        for key, source, out_path in jobs:
+            if out_path.exists():
+                results[key] = str(out_path)
+                self.stats['skipped'] += 1
+            else:
+                pending.append((key, source, str(out_path)))
+        
+        # Several channels can share one output (same logo / same text)
+        unique = list({out: (source, out) for _, source, out in pending}.values())
+        batches = [unique[i:i + self.batch_size] for i in range(0, len(unique), self.batch_size)]
+        settings = (self.size, self.fmt, self.quality)
+        
+        failed = set()
+        if len(batches) <= 1 or self.workers == 1:
+            for batch in batches:
+                failed.update(_render_batch(batch, settings))
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(batches))) as pool:
+                for batch_failed in pool.map(_render_batch, batches, [settings] * len(batches)):
+                    failed.update(batch_failed)
+        
+        for key, _, out in pending:
+            results[key] = None if out in failed else out
+        self.stats['processed'] += len(unique) - len(failed)
+        self.stats['failed'] += len(failed)
+        return results
+
+
+def _render_batch(batch: List[Tuple[Tuple, str]], settings: Tuple) -> List[str]:
+    """Pool worker: render (source, output_path) pairs, returning the outputs that failed"""
+    size, fmt, quality = settings
+    pil_format = THUMBNAIL_FORMATS[fmt][0]
+    failed = []
+    for (kind, payload), out_path in batch:
+        try:
+            if kind == 'image':
+                with Image.open(payload) as img:
+                    thumb = _fit(img, size)
+            else:
+                thumb = _draw_placeholder(payload, size)
+            
+            buffer = io.BytesIO()
+            thumb.save(buffer, pil_format, quality=quality)
+            write_atomic(Path(out_path), buffer.getvalue())
+        except Exception as e:
+            logger.warning(f"Thumbnail failed for {payload}: {e}")
+            failed.append(out_path)
+    return failed
+
+
+def _fit(img: "Image.Image", size: Tuple[int, int]) -> "Image.Image":
+    """Scale an image to fit size, centred on the background colour"""
+    img = ImageOps.exif_transpose(img)
+    if img.mode in ('RGBA', 'LA', 'P'):
+        img = img.convert('RGBA')
+        background = Image.new('RGBA', img.size, BACKGROUND + (255,))
+        img = Image.alpha_composite(background, img)
+    img = img.convert('RGB')
+    return ImageOps.pad(img, size, method=Image.LANCZOS, color=BACKGROUND)
+
+
+def _draw_placeholder(text: Tuple[str, str, str], size: Tuple[int, int]) -> "Image.Image":
+    """Channel name, group and number on a dark background (layout scaled from 480x270)"""
+    name, group, num = text
+    width, height = size
+    scale = width / 480
+    img = Image.new('RGB', size, BACKGROUND)
+    draw = ImageDraw.Draw(img)
+    font_title, font_sub = _fonts(max(8, round(24 * scale)), max(6, round(16 * scale)))
+    draw.text((width / 2, height * 0.37), name, fill=(255, 215, 0), font=font_title, anchor="mm")
+    draw.text((width / 2, height * 0.56), f"Group: {group}", fill=(150, 150, 150), font=font_sub, anchor="mm")
+    draw.text((width / 2, height * 0.67), f"Channel #{num}", fill=(100, 100, 100), font=font_sub, anchor="mm")
+    return img
+
+
+@lru_cache(maxsize=8)
+def _fonts(title_size: int, sub_size: int):
+    """Fonts are loaded once per worker process"""
+    try:
+        return ImageFont.truetype(FONT_BOLD, title_size), ImageFont.truetype(FONT_REGULAR, sub_size)
+    except OSError:
+        return ImageFont.load_default(), ImageFont.load_default()
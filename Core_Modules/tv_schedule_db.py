@@ -7,7 +7,7 @@ import sqlite3
 import json
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
 import threading
 
 class TVScheduleDB:
@@ -102,8 +102,52 @@ class TVScheduleDB:
                 ON time_slots (channel_id, start_time)
             """)
             
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_time_slots_schedule_channel 
+                ON time_slots (schedule_id, channel_id, start_time)
+            """)
+            
+            # Days whose EPG snapshot fragments need rebuilding
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS epg_dirty_days (
+                    schedule_id INTEGER NOT NULL,
+                    channel_id INTEGER NOT NULL,
+                    day DATE NOT NULL,
+                    PRIMARY KEY (schedule_id, channel_id, day)
+                )
+            """)
+            
+            conn.commit()
+            conn.close()
+    
+    @staticmethod
+    def _mark_days_dirty(cursor: sqlite3.Cursor, where: str, params: Tuple):
+        """Record the (schedule, channel, day) EPG fragments touched by matching time slots"""
+        cursor.execute(f"""
+            INSERT OR IGNORE INTO epg_dirty_days (schedule_id, channel_id, day)
+            SELECT DISTINCT schedule_id, channel_id, DATE(start_time)
+            FROM time_slots
+            WHERE {where}
+        """, params)
+    
+    def pop_dirty_days(self, schedule_id: int) -> List[Tuple[int, str]]:
+        """Return and clear the (channel_id, day) pairs changed since the last call"""
+        with self.lock:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT channel_id, day FROM epg_dirty_days
+                WHERE schedule_id = ?
+                ORDER BY channel_id, day
+            """, (schedule_id,))
+            days = [(row['channel_id'], row['day']) for row in cursor.fetchall()]
+            
+            cursor.execute("DELETE FROM epg_dirty_days WHERE schedule_id = ?", (schedule_id,))
+            
             conn.commit()
             conn.close()
+            return days
     
     # Channel operations
     def add_channel(self, name: str, description: str = "", 
@@ -151,6 +195,7 @@ class TVScheduleDB:
             cursor = conn.cursor()
             
             # Delete associated time slots
+            self._mark_days_dirty(cursor, "channel_id = ?", (channel_id,))
             cursor.execute("DELETE FROM time_slots WHERE channel_id = ?", (channel_id,))
             
             # Delete associated shows
@@ -187,6 +232,37 @@ class TVScheduleDB:
             conn.close()
             return show_id
     
+    def add_shows(self, shows: List[Dict]) -> List[int]:
+        """
+        Add many shows in one transaction
+        
+        Args:
+            shows: Dicts with add_show()'s arguments (channel_id, name and
+                duration_minutes required)
+        
+        Returns:
+            New show IDs, in input order
+        """
+        with self.lock:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            
+            show_ids = []
+            for show in shows:
+                metadata = show.get('metadata')
+                cursor.execute("""
+                    INSERT INTO shows (channel_id, name, duration_minutes, description,
+                                     genre, rating, thumbnail_url, metadata)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, (show['channel_id'], show['name'], show['duration_minutes'],
+                     show.get('description', ""), show.get('genre', ""), show.get('rating', ""),
+                     show.get('thumbnail_url', ""), json.dumps(metadata) if metadata else ""))
+                show_ids.append(cursor.lastrowid)
+            
+            conn.commit()
+            conn.close()
+            return show_ids
+    
     def get_shows(self, channel_id: Optional[int] = None) -> List[Dict]:
         """Get shows, optionally filtered by channel"""
         conn = self._get_connection()
@@ -240,8 +316,13 @@ class TVScheduleDB:
             query = f"UPDATE shows SET {', '.join(fields)} WHERE show_id = ?"
             
             cursor.execute(query, values)
-            conn.commit()
             success = cursor.rowcount > 0
+            
+            # Show names are baked into EPG fragments
+            if 'name' in kwargs:
+                self._mark_days_dirty(cursor, "show_id = ?", (show_id,))
+            
+            conn.commit()
             conn.close()
             return success
     
@@ -252,6 +333,7 @@ class TVScheduleDB:
             cursor = conn.cursor()
             
             # Delete associated time slots
+            self._mark_days_dirty(cursor, "show_id = ?", (show_id,))
             cursor.execute("DELETE FROM time_slots WHERE show_id = ?", (show_id,))
             
             # Delete show
@@ -280,6 +362,22 @@ class TVScheduleDB:
             conn.close()
             return schedule_id
     
+    def get_schedule(self, schedule_id: int) -> Optional[Dict]:
+        """Get a single schedule by ID"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT schedule_id, name, start_date, end_date, enable_looping,
+                   created_at, last_modified
+            FROM schedules
+            WHERE schedule_id = ?
+        """, (schedule_id,))
+        
+        row = cursor.fetchone()
+        conn.close()
+        return dict(row) if row else None
+    
     def get_schedules(self) -> List[Dict]:
         """Get all schedules"""
         conn = self._get_connection()
@@ -302,6 +400,7 @@ class TVScheduleDB:
             cursor = conn.cursor()
             
             # Delete time slots
+            self._mark_days_dirty(cursor, "schedule_id = ?", (schedule_id,))
             cursor.execute("DELETE FROM time_slots WHERE schedule_id = ?", (schedule_id,))
             
             # Delete schedule
@@ -329,6 +428,7 @@ class TVScheduleDB:
                  is_repeat, notes))
             
             slot_id = cursor.lastrowid
+            self._mark_days_dirty(cursor, "slot_id = ?", (slot_id,))
             
             # Update schedule modification time
             cursor.execute("""
@@ -340,6 +440,43 @@ class TVScheduleDB:
             conn.close()
             return slot_id
     
+    def add_time_slots(self, schedule_id: int, slots: Iterable[Tuple]) -> int:
+        """
+        Add many time slots to a schedule in one transaction
+        
+        Args:
+            schedule_id: Schedule to add to
+            slots: (channel_id, show_id, start_time, end_time, is_repeat, notes) tuples
+        
+        Returns:
+            Number of slots added
+        """
+        with self.lock:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT COALESCE(MAX(slot_id), 0) FROM time_slots")
+            last_slot_id = cursor.fetchone()[0]
+            
+            cursor.executemany("""
+                INSERT INTO time_slots (schedule_id, channel_id, show_id, 
+                                      start_time, end_time, is_repeat, notes)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, ((schedule_id,) + tuple(slot) for slot in slots))
+            added = cursor.rowcount
+            
+            # Slot IDs only grow, so the new rows are those past the previous maximum
+            self._mark_days_dirty(cursor, "schedule_id = ? AND slot_id > ?", (schedule_id, last_slot_id))
+            
+            cursor.execute("""
+                UPDATE schedules SET last_modified = CURRENT_TIMESTAMP
+                WHERE schedule_id = ?
+            """, (schedule_id,))
+            
+            conn.commit()
+            conn.close()
+            return added
+    
     def get_time_slots(self, schedule_id: int, channel_id: Optional[int] = None,
                        date: Optional[str] = None) -> List[Dict]:
         """Get time slots for a schedule, optionally filtered by channel or date"""
@@ -372,6 +509,56 @@ class TVScheduleDB:
         conn.close()
         return slots
     
+    def iter_time_slots(self, schedule_id: int, channel_ids: Optional[List[int]] = None,
+                        window_start: Optional[str] = None, window_end: Optional[str] = None,
+                        batch_size: int = 1000) -> Iterator[Dict]:
+        """
+        Stream time slots for a schedule from a DB cursor, ordered by channel then start time.
+        
+        Slots overlapping [window_start, window_end) are yielded; bounds use the
+        stored "%Y-%m-%d %H:%M:%S" format. Rows are fetched in batches so memory
+        stays constant regardless of schedule length.
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        query = """
+            SELECT ts.slot_id, ts.channel_id, ts.show_id, ts.start_time, ts.end_time,
+                   ts.is_repeat, c.name as channel_name,
+                   c.description as channel_description, s.name as show_name
+            FROM time_slots ts
+            JOIN channels c ON ts.channel_id = c.channel_id
+            LEFT JOIN shows s ON ts.show_id = s.show_id
+            WHERE ts.schedule_id = ?
+        """
+        
+        params: List = [schedule_id]
+        
+        if channel_ids:
+            query += f" AND ts.channel_id IN ({', '.join('?' * len(channel_ids))})"
+            params.extend(channel_ids)
+        
+        if window_start:
+            query += " AND ts.end_time > ?"
+            params.append(window_start)
+        
+        if window_end:
+            query += " AND ts.start_time < ?"
+            params.append(window_end)
+        
+        query += " ORDER BY ts.channel_id, ts.start_time"
+        
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(row)
+        finally:
+            conn.close()
+    
     def check_time_conflict(self, schedule_id: int, channel_id: int,
                            start_time: str, end_time: str,
                            exclude_slot_id: Optional[int] = None) -> bool:
@@ -422,7 +609,10 @@ class TVScheduleDB:
             values.append(slot_id)
             query = f"UPDATE time_slots SET {', '.join(fields)} WHERE slot_id = ?"
             
+            # Mark both the old and the new day in case the slot moved
+            self._mark_days_dirty(cursor, "slot_id = ?", (slot_id,))
             cursor.execute(query, values)
+            self._mark_days_dirty(cursor, "slot_id = ?", (slot_id,))
             
             # Update schedule modification time
             cursor.execute("""
@@ -449,6 +639,7 @@ class TVScheduleDB:
                 schedule_id = result[0]
                 
                 # Delete time slot
+                self._mark_days_dirty(cursor, "slot_id = ?", (slot_id,))
                 cursor.execute("DELETE FROM time_slots WHERE slot_id = ?", (slot_id,))
                 
                 # Update schedule modification time
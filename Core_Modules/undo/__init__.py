@@ -2,6 +2,7 @@
 Undo/Redo Module - State management for undo/redo functionality
 """
 
-from .undo_manager import UndoManager
+from .undo_manager import UndoManager, ListEditor, ListEdit, CommandManager
+from .history_journal import HistoryJournal
 
-__all__ = ['UndoManager']
\ No newline at end of file
+__all__ = ['UndoManager', 'ListEditor', 'ListEdit', 'CommandManager', 'HistoryJournal']
\ No newline at end of file
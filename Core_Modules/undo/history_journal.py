@@ -0,0 +1,181 @@
+"""
+History Journal - Compressed on-disk storage for spilled undo/redo history
+"""
+
+import io
+import os
+import zlib
+import pickle
+import logging
+import weakref
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+# (offset, length) of one record in the journal file
+JournalRef = Tuple[int, int]
+
+
+class _JournalPickler(pickle.Pickler):
+    """Pickler that writes registered live objects as references"""
+    
+    def __init__(self, file, shared_ids: Dict[int, str]):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.shared_ids = shared_ids
+    
+    def persistent_id(self, obj: Any) -> Optional[str]:
+        return self.shared_ids.get(id(obj))
+
+
+class _JournalUnpickler(pickle.Unpickler):
+    """Unpickler that resolves references to registered live objects"""
+    
+    def __init__(self, file, shared: Dict[str, Any]):
+        super().__init__(file)
+        self.shared = shared
+    
+    def persistent_load(self, pid: str) -> Any:
+        return self.shared[pid]
+
+
+class HistoryJournal:
+    """
+    Append-only file of zlib-compressed, pickled history records.
+    
+    Records are addressed by (offset, length). Released records leave dead
+    space that compact() reclaims by rewriting the live records. Objects that
+    must keep their identity across a spill (e.g. the live channel list a
+    command edits) can be registered and are stored as references.
+    
+    The journal holds this process's own history only; it is not a format for
+    exchanging data.
+    """
+    
+    def __init__(self, path: Optional[str] = None, compress_level: int = 6):
+        """
+        Initialize the journal.
+        
+        Args:
+            path: Journal file (default: a temporary file removed on close)
+            compress_level: zlib compression level (1-9)
+        """
+        self.temporary = path is None
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="undo_journal_", suffix=".bin")
+            os.close(fd)
+        self.path = path
+        self.compress_level = compress_level
+        self.file = open(self.path, 'w+b')
+        self.live_bytes = 0
+        self.dead_bytes = 0
+        self.shared: Dict[str, Any] = {}
+        self.shared_ids: Dict[int, str] = {}
+        self.logger = logging.getLogger(__name__)
+        # Temporary journals are removed even if close() is never called
+        self._finalizer = weakref.finalize(self, _remove_quietly, self.path) if self.temporary else None
+    
+    def register(self, name: str, obj: Any) -> None:
+        """
+        Store obj by reference: records containing it resolve back to this object.
+        
+        Args:
+            name: Stable name for the object
+            obj: Live object (must stay alive while the journal is used)
+        """
+        self.shared[name] = obj
+        self.shared_ids[id(obj)] = name
+    
+    def append(self, payload: Any) -> JournalRef:
+        """
+        Write a record.
+        
+        Args:
+            payload: Any picklable object
+        
+        Returns:
+            Reference for read()/release()
+        """
+        buffer = io.BytesIO()
+        _JournalPickler(buffer, self.shared_ids).dump(payload)
+        data = zlib.compress(buffer.getvalue(), self.compress_level)
+        
+        self.file.seek(0, os.SEEK_END)
+        offset = self.file.tell()
+        self.file.write(data)
+        self.live_bytes += len(data)
+        return offset, len(data)
+    
+    def read(self, ref: JournalRef) -> Any:
+        """
+        Read a record back.
+        
+        Args:
+            ref: Reference returned by append()
+        
+        Returns:
+            The stored payload
+        """
+        offset, length = ref
+        self.file.seek(offset)
+        data = zlib.decompress(self.file.read(length))
+        return _JournalUnpickler(io.BytesIO(data), self.shared).load()
+    
+    def release(self, ref: JournalRef) -> None:
+        """Mark a record as no longer needed"""
+        self.live_bytes -= ref[1]
+        self.dead_bytes += ref[1]
+    
+    def should_compact(self, min_dead_bytes: int = 16 * 1024 * 1024) -> bool:
+        """True when dead space outweighs live records and is worth reclaiming"""
+        return self.dead_bytes >= min_dead_bytes and self.dead_bytes > self.live_bytes
+    
+    def compact(self, refs: List[JournalRef]) -> List[JournalRef]:
+        """
+        Rewrite the journal keeping only the given records.
+        
+        Args:
+            refs: Every live reference
+        
+        Returns:
+            New references, in the same order
+        """
+        tmp_path = self.path + ".compact"
+        new_refs = []
+        with open(tmp_path, 'wb') as out:
+            for offset, length in refs:
+                self.file.seek(offset)
+                new_refs.append((out.tell(), length))
+                out.write(self.file.read(length))
+        
+        self.file.close()
+        os.replace(tmp_path, self.path)
+        self.file = open(self.path, 'r+b')
+        self.live_bytes = sum(length for _, length in new_refs)
+        self.dead_bytes = 0
+        self.logger.debug(f"Journal compacted to {self.live_bytes} bytes")
+        return new_refs
+    
+    def clear(self) -> None:
+        """Drop every record"""
+        self.file.seek(0)
+        self.file.truncate()
+        self.live_bytes = 0
+        self.dead_bytes = 0
+    
+    def size(self) -> int:
+        """Current file size in bytes"""
+        return self.live_bytes + self.dead_bytes
+    
+    def close(self) -> None:
+        """Close the journal, deleting it if it was temporary"""
+        if self.file.closed:
+            return
+        self.file.close()
+        if self._finalizer is not None:
+            self._finalizer()
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -4,27 +4,131 @@ Undo/Redo Manager - State management for reversible operations
 
 import copy
 import logging
-from typing import Any, List, Optional, Dict, Callable
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, List, Optional, Dict, Callable, Deque, Iterable, Union
 from datetime import datetime
 import json
+from lru_cache import estimate_size
+from .history_journal import HistoryJournal, JournalRef
+
+# Bytes per list slot, charged for items a delta references but doesn't own
+REFERENCE_SIZE = 8
+
+
+class ListEdit:
+    """
+    One range replacement on a list: at index, the items in removed were
+    replaced by the items in inserted. Inserts and deletes are the cases where
+    one side is empty.
+    """
+    
+    __slots__ = ('index', 'removed', 'inserted')
+    
+    def __init__(self, index: int, removed: List[Any], inserted: List[Any]):
+        self.index = index
+        self.removed = removed
+        self.inserted = inserted
+    
+    def apply(self, target: List[Any]) -> None:
+        """Perform the edit on a list"""
+        target[self.index:self.index + len(self.removed)] = self.inserted
+    
+    def revert(self, target: List[Any]) -> None:
+        """Reverse the edit on a list"""
+        target[self.index:self.index + len(self.inserted)] = self.removed
+    
+    def nbytes(self) -> int:
+        """
+        Memory held by the edit: removed items are only kept alive by history,
+        inserted items are shared with the live list
+        """
+        return sum(estimate_size(item) for item in self.removed) + REFERENCE_SIZE * len(self.inserted)
+
+
+class ListEditor:
+    """
+    Applies edits to a list while recording them for UndoManager.record_edits.
+    Items are treated as immutable: to change one, replace it with a new object
+    rather than mutating it, so history can share items with the list.
+    """
+    
+    def __init__(self, target: List[Any]):
+        """
+        Args:
+            target: The list to edit in place
+        """
+        self.target = target
+        self.edits: List[ListEdit] = []
+    
+    def insert(self, index: int, items: Iterable[Any]) -> None:
+        """Insert items before index"""
+        self._apply(ListEdit(index, [], list(items)))
+    
+    def append(self, items: Iterable[Any]) -> None:
+        """Add items at the end"""
+        self.insert(len(self.target), items)
+    
+    def delete(self, index: int, count: int = 1) -> None:
+        """Delete count items starting at index"""
+        self._apply(ListEdit(index, self.target[index:index + count], []))
+    
+    def replace(self, index: int, items: Iterable[Any]) -> None:
+        """Replace items starting at index with the same number of new items"""
+        items = list(items)
+        self._apply(ListEdit(index, self.target[index:index + len(items)], items))
+    
+    def _apply(self, edit: ListEdit) -> None:
+        edit.apply(self.target)
+        self.edits.append(edit)
+
+
+@dataclass
+class HistoryEntry:
+    """One undo/redo history step: either a state snapshot or a list of edits"""
+    description: str
+    timestamp: str
+    kind: str = ""
+    state: Any = None
+    edits: Optional[List[ListEdit]] = None
+    nbytes: int = 0
+    spilled: Optional[JournalRef] = None  # Set while the payload lives in the journal
 
 
 class UndoManager:
     """
-    Manages undo/redo functionality with state snapshots.
-    Implements a command pattern for reversible operations.
+    Manages undo/redo functionality.
+    
+    Two kinds of history entries share the stacks:
+    - Deltas (record_edits): the list edits an operation made. Saving, undoing
+      and redoing cost O(change size); edited items are shared with the live
+      list rather than copied.
+    - Snapshots (save_state): a deep copy of an arbitrary state.
+    
+    History held in memory is bounded by an estimated byte budget (and
+    optionally an entry count). Without a journal the oldest undo entries are
+    dropped first; with one they are compressed into it instead and read back
+    when undo reaches them, until the journal's own budget is exceeded.
     """
     
-    def __init__(self, max_history: int = 50):
+    def __init__(self, max_history: Optional[int] = None, max_bytes: int = 64 * 1024 * 1024,
+                 journal: Optional[HistoryJournal] = None, max_disk_bytes: int = 1024 * 1024 * 1024):
         """
         Initialize the undo manager.
         
         Args:
-            max_history: Maximum number of states to keep in history
+            max_history: Maximum number of entries to keep (None for no count limit)
+            max_bytes: Approximate memory budget for history in bytes
+            journal: Journal that older entries are spilled to (None to drop them)
+            max_disk_bytes: Budget for compressed entries in the journal
         """
-        self.undo_stack: List[Dict[str, Any]] = []
-        self.redo_stack: List[Dict[str, Any]] = []
+        self.undo_stack: Deque[HistoryEntry] = deque()
+        self.redo_stack: Deque[HistoryEntry] = deque()
         self.max_history = max_history
+        self.max_bytes = max_bytes
+        self.history_bytes = 0
+        self.journal = journal
+        self.max_disk_bytes = max_disk_bytes
         self.logger = logging.getLogger(__name__)
         self.enabled = True
         self.current_state: Optional[Dict[str, Any]] = None
@@ -41,28 +145,112 @@ class UndoManager:
             return
         
         try:
-            # Create state snapshot
-            snapshot = {
-                'timestamp': datetime.now().isoformat(),
-                'description': description,
-                'state': copy.deepcopy(state)
-            }
-            
-            # Add to undo stack
-            self.undo_stack.append(snapshot)
-            
-            # Clear redo stack when new action is performed
-            self.redo_stack.clear()
-            
-            # Limit undo history
-            if len(self.undo_stack) > self.max_history:
-                self.undo_stack.pop(0)
-            
+            snapshot = copy.deepcopy(state)
+            self._push(HistoryEntry(
+                description=description,
+                timestamp=datetime.now().isoformat(),
+                kind=state.get('type', '') if isinstance(state, dict) else '',
+                state=snapshot,
+                nbytes=estimate_size(snapshot)
+            ))
             self.logger.debug(f"State saved: {description}")
             
         except Exception as e:
             self.logger.error(f"Failed to save state: {e}")
     
+    def record_edits(self, edits: List[ListEdit], description: str = "", kind: str = "") -> None:
+        """
+        Record list edits that have already been applied (see ListEditor).
+        
+        Args:
+            edits: Edits in the order they were applied
+            description: Description of the operation
+            kind: Short operation type reported back by undo()/redo()
+        """
+        if not self.enabled or not edits:
+            return
+        
+        self._push(HistoryEntry(
+            description=description,
+            timestamp=datetime.now().isoformat(),
+            kind=kind,
+            edits=list(edits),
+            nbytes=sum(edit.nbytes() for edit in edits)
+        ))
+        self.logger.debug(f"Edits recorded: {description} ({len(edits)} edit(s))")
+    
+    def _push(self, entry: HistoryEntry) -> None:
+        """Add a new entry, clearing redo history and enforcing the limits"""
+        self.undo_stack.append(entry)
+        self.history_bytes += entry.nbytes
+        
+        # Clear redo stack when new action is performed
+        for undone in self.redo_stack:
+            self.history_bytes -= undone.nbytes
+        self.redo_stack.clear()
+        
+        # Over the entry limit: drop the oldest
+        while self.max_history is not None and len(self.undo_stack) > max(self.max_history, 1):
+            self._discard(self.undo_stack.popleft())
+        
+        # Over the memory budget: spill (or drop) the oldest in-memory entries,
+        # always keeping the newest one in memory
+        for entry in list(self.undo_stack)[:-1]:
+            if self.history_bytes <= self.max_bytes:
+                break
+            if entry.spilled is not None:
+                continue
+            if self.journal is None:
+                self.undo_stack.remove(entry)
+                self._discard(entry)
+            else:
+                self._spill(entry)
+        
+        # Over the disk budget: drop the oldest spilled entries
+        if self.journal is not None:
+            while self.journal.live_bytes > self.max_disk_bytes and self.undo_stack[0].spilled is not None:
+                self._discard(self.undo_stack.popleft())
+            self._compact_journal()
+    
+    def _spill(self, entry: HistoryEntry) -> None:
+        """Move an entry's payload into the journal"""
+        if entry.edits is not None:
+            payload = {'edits': [(e.index, e.removed, e.inserted) for e in entry.edits]}
+        else:
+            payload = {'state': entry.state}
+        entry.spilled = self.journal.append(payload)
+        entry.edits = None
+        entry.state = None
+        self.history_bytes -= entry.nbytes
+    
+    def _load(self, entry: HistoryEntry) -> None:
+        """Bring a spilled entry's payload back into memory"""
+        if entry.spilled is None:
+            return
+        payload = self.journal.read(entry.spilled)
+        if 'edits' in payload:
+            entry.edits = [ListEdit(*edit) for edit in payload['edits']]
+        else:
+            entry.state = payload['state']
+        self.journal.release(entry.spilled)
+        entry.spilled = None
+        self.history_bytes += entry.nbytes
+    
+    def _discard(self, entry: HistoryEntry) -> None:
+        """Account for an entry leaving history"""
+        if entry.spilled is not None:
+            self.journal.release(entry.spilled)
+        else:
+            self.history_bytes -= entry.nbytes
+    
+    def _compact_journal(self) -> None:
+        """Reclaim journal space once released records dominate it"""
+        if not self.journal.should_compact():
+            return
+        spilled = [e for e in self.undo_stack if e.spilled is not None]
+        for entry, ref in zip(spilled, self.journal.compact([e.spilled for e in spilled])):
+            entry.spilled = ref
+    
     def can_undo(self) -> bool:
         """
         Check if undo operation is available.
@@ -81,67 +269,108 @@ class UndoManager:
         """
         return len(self.redo_stack) > 0
     
-    def undo(self) -> Optional[Any]:
+    def undo(self, target: Optional[List[Any]] = None) -> Optional[Any]:
         """
         Perform undo operation.
         
+        Args:
+            target: The list that recorded edits apply to (needed for delta entries)
+        
         Returns:
-            The previous state, or None if undo is not possible
+            For a delta entry, {'type', 'description'} after reverting the edits
+            on target in place; for a snapshot, the previous state. None if undo
+            is not possible.
         """
         if not self.can_undo():
             self.logger.debug("No undo history available")
             return None
         
         try:
-            # Get the last state
-            snapshot = self.undo_stack.pop()
+            entry = self.undo_stack.pop()
+            self._load(entry)
+            
+            if entry.edits is not None:
+                if target is None:
+                    self.undo_stack.append(entry)
+                    raise ValueError("undo of recorded edits needs the target list")
+                for edit in reversed(entry.edits):
+                    edit.revert(target)
+                self.redo_stack.append(entry)
+                self.logger.debug(f"Undo performed: {entry.description}")
+                return {'type': entry.kind, 'description': entry.description}
+            
+            self.history_bytes -= entry.nbytes
             
             # Save current state to redo stack if we have it
             if self.current_state is not None:
-                self.redo_stack.append({
-                    'timestamp': datetime.now().isoformat(),
-                    'description': f"Redo: {snapshot['description']}",
-                    'state': copy.deepcopy(self.current_state)
-                })
+                redo_entry = HistoryEntry(
+                    description=f"Redo: {entry.description}",
+                    timestamp=datetime.now().isoformat(),
+                    kind=entry.kind,
+                    state=self.current_state,
+                    nbytes=estimate_size(self.current_state)
+                )
+                self.redo_stack.append(redo_entry)
+                self.history_bytes += redo_entry.nbytes
             
             # Return the previous state
-            self.current_state = snapshot['state']
-            self.logger.debug(f"Undo performed: {snapshot['description']}")
+            self.current_state = entry.state
+            self.logger.debug(f"Undo performed: {entry.description}")
             
-            return copy.deepcopy(snapshot['state'])
+            return copy.deepcopy(entry.state)
             
         except Exception as e:
             self.logger.error(f"Failed to perform undo: {e}")
             return None
     
-    def redo(self) -> Optional[Any]:
+    def redo(self, target: Optional[List[Any]] = None) -> Optional[Any]:
         """
         Perform redo operation.
         
+        Args:
+            target: The list that recorded edits apply to (needed for delta entries)
+        
         Returns:
-            The redone state, or None if redo is not possible
+            For a delta entry, {'type', 'description'} after re-applying the
+            edits on target in place; for a snapshot, the redone state. None if
+            redo is not possible.
         """
         if not self.can_redo():
             self.logger.debug("No redo history available")
             return None
         
         try:
-            # Get the state to redo
-            snapshot = self.redo_stack.pop()
+            entry = self.redo_stack.pop()
+            
+            if entry.edits is not None:
+                if target is None:
+                    self.redo_stack.append(entry)
+                    raise ValueError("redo of recorded edits needs the target list")
+                for edit in entry.edits:
+                    edit.apply(target)
+                self.undo_stack.append(entry)
+                self.logger.debug(f"Redo performed: {entry.description}")
+                return {'type': entry.kind, 'description': entry.description}
+            
+            self.history_bytes -= entry.nbytes
             
             # Save current state to undo stack if we have it
             if self.current_state is not None:
-                self.undo_stack.append({
-                    'timestamp': datetime.now().isoformat(),
-                    'description': f"Before redo: {snapshot['description']}",
-                    'state': copy.deepcopy(self.current_state)
-                })
+                undo_entry = HistoryEntry(
+                    description=f"Before redo: {entry.description}",
+                    timestamp=datetime.now().isoformat(),
+                    kind=entry.kind,
+                    state=self.current_state,
+                    nbytes=estimate_size(self.current_state)
+                )
+                self.undo_stack.append(undo_entry)
+                self.history_bytes += undo_entry.nbytes
             
             # Return the redone state
-            self.current_state = snapshot['state']
-            self.logger.debug(f"Redo performed: {snapshot['description']}")
+            self.current_state = entry.state
+            self.logger.debug(f"Redo performed: {entry.description}")
             
-            return copy.deepcopy(snapshot['state'])
+            return copy.deepcopy(entry.state)
             
         except Exception as e:
             self.logger.error(f"Failed to perform redo: {e}")
@@ -151,7 +380,10 @@ class UndoManager:
         """Clear all undo/redo history"""
         self.undo_stack.clear()
         self.redo_stack.clear()
+        self.history_bytes = 0
         self.current_state = None
+        if self.journal is not None:
+            self.journal.clear()
         self.logger.debug("Undo/redo history cleared")
     
     def get_undo_description(self) -> str:
@@ -162,7 +394,7 @@ class UndoManager:
             Description string or empty string
         """
         if self.can_undo():
-            return self.undo_stack[-1].get('description', 'Undo')
+            return self.undo_stack[-1].description or 'Undo'
         return ""
     
     def get_redo_description(self) -> str:
@@ -173,7 +405,7 @@ class UndoManager:
             Description string or empty string
         """
         if self.can_redo():
-            return self.redo_stack[-1].get('description', 'Redo')
+            return self.redo_stack[-1].description or 'Redo'
         return ""
     
     def set_current_state(self, state: Any) -> None:
@@ -206,6 +438,10 @@ class UndoManager:
             'undo_count': len(self.undo_stack),
             'redo_count': len(self.redo_stack),
             'max_history': self.max_history,
+            'history_bytes': self.history_bytes,
+            'max_bytes': self.max_bytes,
+            'spilled_count': sum(1 for e in self.undo_stack if e.spilled is not None),
+            'journal_bytes': self.journal.live_bytes if self.journal is not None else 0,
             'enabled': self.enabled,
             'can_undo': self.can_undo(),
             'can_redo': self.can_redo(),
@@ -213,37 +449,29 @@ class UndoManager:
             'last_redo': self.get_redo_description()
         }
     
-    def export_history(self, filepath: str) -> bool:
+    def export_history(self, filepath: str, include_changes: bool = False) -> bool:
         """
         Export undo/redo history to a file for debugging.
+        Entries are written one at a time; spilled entries are read from the
+        journal one record at a time when their changes are included.
         
         Args:
             filepath: Path to export file
+            include_changes: Also list each entry's edit ranges
             
         Returns:
             True if successful
         """
         try:
-            history = {
-                'undo_stack': [
-                    {
-                        'timestamp': s['timestamp'],
-                        'description': s['description']
-                    }
-                    for s in self.undo_stack
-                ],
-                'redo_stack': [
-                    {
-                        'timestamp': s['timestamp'],
-                        'description': s['description']
-                    }
-                    for s in self.redo_stack
-                ],
-                'info': self.get_history_info()
-            }
-            
             with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(history, f, indent=2)
+                f.write('{\n')
+                for name, stack in (('undo_stack', self.undo_stack), ('redo_stack', self.redo_stack)):
+                    f.write(f'  "{name}": [')
+                    for i, entry in enumerate(stack):
+                        f.write(',\n    ' if i else '\n    ')
+                        f.write(json.dumps(self._describe_entry(entry, include_changes)))
+                    f.write('\n  ],\n' if stack else '],\n')
+                f.write('  "info": %s\n}\n' % json.dumps(self.get_history_info()))
             
             self.logger.info(f"History exported to {filepath}")
             return True
@@ -251,6 +479,29 @@ class UndoManager:
         except Exception as e:
             self.logger.error(f"Failed to export history: {e}")
             return False
+    
+    def _describe_entry(self, entry: HistoryEntry, include_changes: bool) -> Dict[str, Any]:
+        """Summary of one history entry for export_history"""
+        info = {
+            'timestamp': entry.timestamp,
+            'description': entry.description,
+            'type': entry.kind,
+            'spilled': entry.spilled is not None
+        }
+        if include_changes:
+            if entry.spilled is not None:
+                payload = self.journal.read(entry.spilled)
+                edits = [ListEdit(*edit) for edit in payload['edits']] if 'edits' in payload else None
+            else:
+                edits = entry.edits
+            if edits is None:
+                info['snapshot'] = True
+            else:
+                info['changes'] = [
+                    {'index': e.index, 'removed': len(e.removed), 'inserted': len(e.inserted)}
+                    for e in edits
+                ]
+        return info
 
 
 class Command:
@@ -297,22 +548,43 @@ class Command:
         return self.execute()
 
 
+class SpilledCommand:
+    """Placeholder for an undoable command stored in a HistoryJournal"""
+    
+    __slots__ = ('description', 'ref')
+    
+    def __init__(self, description: str, ref: JournalRef):
+        self.description = description
+        self.ref = ref
+
+
 class CommandManager:
     """
     Manages command-based undo/redo operations.
     Alternative to state-based undo/redo.
+    
+    With a journal, only the newest max_memory_commands undoable commands stay
+    in memory; older ones are pickled into the journal and loaded back when
+    undo reaches them. Live objects a command operates on should be registered
+    with the journal (HistoryJournal.register) so they come back by reference.
+    Commands that cannot be pickled simply stay in memory.
     """
     
-    def __init__(self, max_history: int = 50):
+    def __init__(self, max_history: int = 50, journal: Optional[HistoryJournal] = None,
+                 max_memory_commands: int = 20):
         """
         Initialize the command manager.
         
         Args:
             max_history: Maximum number of commands to keep
+            journal: Journal that older commands are spilled to
+            max_memory_commands: Undoable commands kept in memory when spilling
         """
-        self.undo_stack: List[Command] = []
+        self.undo_stack: Deque[Union[Command, SpilledCommand]] = deque()
         self.redo_stack: List[Command] = []
         self.max_history = max_history
+        self.journal = journal
+        self.max_memory_commands = max_memory_commands
         self.logger = logging.getLogger(__name__)
     
     def execute_command(self, command: Command) -> bool:
@@ -331,8 +603,11 @@ class CommandManager:
                 self.redo_stack.clear()
                 
                 # Limit history
-                if len(self.undo_stack) > self.max_history:
-                    self.undo_stack.pop(0)
+                while len(self.undo_stack) > self.max_history:
+                    self._discard(self.undo_stack.popleft())
+                
+                if self.journal is not None:
+                    self._spill_old_commands()
                 
                 self.logger.debug(f"Command executed: {command.description}")
                 return True
@@ -354,7 +629,7 @@ class CommandManager:
             return False
         
         try:
-            command = self.undo_stack.pop()
+            command = self._load(self.undo_stack.pop())
             if command.undo():
                 self.redo_stack.append(command)
                 self.logger.debug(f"Command undone: {command.description}")
@@ -391,4 +666,34 @@ class CommandManager:
             
         except Exception as e:
             self.logger.error(f"Failed to redo command: {e}")
-            return False
\ No newline at end of file
+            return False
+    
+    def _spill_old_commands(self) -> None:
+        """Move the oldest in-memory commands into the journal"""
+        in_memory = [i for i, c in enumerate(self.undo_stack) if not isinstance(c, SpilledCommand)]
+        for i in in_memory[:max(len(in_memory) - self.max_memory_commands, 0)]:
+            command = self.undo_stack[i]
+            try:
+                ref = self.journal.append(command)
+            except Exception as e:
+                self.logger.debug(f"Command kept in memory, cannot spill: {command.description} ({e})")
+                continue
+            self.undo_stack[i] = SpilledCommand(command.description, ref)
+        
+        if self.journal.should_compact():
+            spilled = [c for c in self.undo_stack if isinstance(c, SpilledCommand)]
+            for placeholder, ref in zip(spilled, self.journal.compact([c.ref for c in spilled])):
+                placeholder.ref = ref
+    
+    def _load(self, command: Union[Command, SpilledCommand]) -> Command:
+        """Return the command, reading it back from the journal if spilled"""
+        if not isinstance(command, SpilledCommand):
+            return command
+        loaded = self.journal.read(command.ref)
+        self.journal.release(command.ref)
+        return loaded
+    
+    def _discard(self, command: Union[Command, SpilledCommand]) -> None:
+        """Account for a command leaving history"""
+        if isinstance(command, SpilledCommand):
+            self.journal.release(command.ref)
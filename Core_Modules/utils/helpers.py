@@ -6,14 +6,14 @@ import re
 import os
 import sys
 import logging
-import requests
-import hashlib
 import shutil
 from pathlib import Path
 from typing import Optional, Tuple, Any, Dict
 from datetime import datetime
 import tkinter as tk
 from tkinter import ttk
+from lru_cache import LRUCache
+from logo_cache import get_logo_fetcher
 
 
 def sanitize_filename(filename: str, max_length: int = 255) -> str:
@@ -153,6 +153,9 @@ def download_and_cache_thumbnail(url: str, channel_name: str,
     """
     Download and cache a thumbnail image.
     
+    Images are stored content-addressed by logo_cache, so channels sharing a
+    logo share one file; channel_name is kept for API compatibility.
+    
     Args:
         url: Thumbnail URL
         channel_name: Channel name for filename
@@ -162,49 +165,13 @@ def download_and_cache_thumbnail(url: str, channel_name: str,
     Returns:
         Tuple of (cached_path, status)
     """
-    logger = logging.getLogger(__name__)
-    
-    if not url:
-        return None, "no_url"
-    
-    try:
-        # Create cache directory
-        cache_dir = Path(cache_dir)
-        cache_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Generate cache filename
-        url_hash = hashlib.md5(url.encode()).hexdigest()[:8]
-        safe_name = sanitize_filename(channel_name)[:50]
-        
-        # Try to determine extension from URL
-        ext = '.jpg'
-        for image_ext in ['.png', '.jpg', '.jpeg', '.gif', '.webp']:
-            if url.lower().endswith(image_ext):
-                ext = image_ext
-                break
-        
-        cache_filename = f"{safe_name}_{url_hash}{ext}"
-        cache_path = cache_dir / cache_filename
-        
-        # Check if already cached
-        if cache_path.exists():
-            return str(cache_path), "cached"
-        
-        # Download thumbnail
-        response = requests.get(url, timeout=timeout, stream=True)
-        response.raise_for_status()
-        
-        # Save to cache
-        with open(cache_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        
-        logger.debug(f"Cached thumbnail for {channel_name}: {cache_filename}")
-        return str(cache_path), "downloaded"
-        
-    except Exception as e:
-        logger.debug(f"Failed to cache thumbnail for {channel_name}: {e}")
+    path, status = get_logo_fetcher(Path(cache_dir)).fetch(url, timeout=timeout)
+    if status == "revalidated":
+        return path, "cached"
+    if path is None and status != "no_url":
+        logging.getLogger(__name__).debug(f"Failed to cache thumbnail for {channel_name}: {status}")
         return None, "error"
+    return path, status
 
 
 def get_cached_thumbnail_stats(cache_dir: Path) -> Dict[str, Any]:
@@ -227,8 +194,9 @@ def get_cached_thumbnail_stats(cache_dir: Path) -> Dict[str, Any]:
                 'total_size_mb': 0.0
             }
         
-        files = list(cache_dir.glob('*'))
-        total_size = sum(f.stat().st_size for f in files if f.is_file())
+        files = [f for f in cache_dir.rglob('*')
+                 if f.is_file() and f.suffix.lower() in ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.bmp', '.ico')]
+        total_size = sum(f.stat().st_size for f in files)
         
         return {
             'total_files': len(files),
@@ -244,8 +212,8 @@ def get_cached_thumbnail_stats(cache_dir: Path) -> Dict[str, Any]:
         }
 
 
-class SimpleCache:
-    """Simple LRU cache implementation"""
+class SimpleCache(LRUCache):
+    """Simple LRU cache implementation (see lru_cache.LRUCache)"""
     
     def __init__(self, max_size: int = 200):
         """
@@ -254,54 +222,7 @@ class SimpleCache:
         Args:
             max_size: Maximum number of items to cache
         """
-        self.cache = {}
-        self.max_size = max_size
-        self.access_order = []
-    
-    def get(self, key: str) -> Any:
-        """
-        Get item from cache.
-        
-        Args:
-            key: Cache key
-            
-        Returns:
-            Cached value or None
-        """
-        if key in self.cache:
-            # Move to end (most recently used)
-            self.access_order.remove(key)
-            self.access_order.append(key)
-            return self.cache[key]
-        return None
-    
-    def set(self, key: str, value: Any) -> None:
-        """
-        Set item in cache.
-        
-        Args:
-            key: Cache key
-            value: Value to cache
-        """
-        if key in self.cache:
-            # Update existing and move to end
-            self.access_order.remove(key)
-        elif len(self.cache) >= self.max_size:
-            # Remove oldest
-            oldest = self.access_order.pop(0)
-            del self.cache[oldest]
-        
-        self.cache[key] = value
-        self.access_order.append(key)
-    
-    def clear(self) -> None:
-        """Clear the cache"""
-        self.cache.clear()
-        self.access_order.clear()
-    
-    def size(self) -> int:
-        """Get cache size"""
-        return len(self.cache)
+        super().__init__(max_size=max_size)
 
 
 def get_file_size(file_path: str) -> str:
@@ -1,9 +1,10 @@
 """
 Web EPG Server
 Provides /now.json API endpoint for current and next shows
+and a streamed /epg.json export with time window and channel filters
 """
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 import json
 import threading
 from datetime import datetime
@@ -12,9 +13,43 @@ from urllib.parse import urlparse, parse_qs
 from Core_Modules.tv_schedule_db import TVScheduleDB
 
 
+class ChunkedWriter:
+    """Buffers text and writes it as HTTP/1.1 chunks"""
+    
+    def __init__(self, wfile, chunk_size: int = 64 * 1024):
+        self.wfile = wfile
+        self.chunk_size = chunk_size
+        self.buffer = []
+        self.buffered = 0
+    
+    def write(self, text: str):
+        """Queue text, flushing a chunk once the buffer is full"""
+        self.buffer.append(text)
+        self.buffered += len(text)
+        if self.buffered >= self.chunk_size:
+            self.flush()
+    
+    def flush(self):
+        """Send buffered text as one chunk"""
+        if not self.buffer:
+            return
+        data = ''.join(self.buffer).encode('utf-8')
+        self.buffer = []
+        self.buffered = 0
+        self.wfile.write(b'%X\r\n' % len(data) + data + b'\r\n')
+    
+    def close(self):
+        """Flush remaining data and send the terminating chunk"""
+        self.flush()
+        self.wfile.write(b'0\r\n\r\n')
+
+
 class EPGHandler(BaseHTTPRequestHandler):
     """HTTP handler for EPG requests"""
     
+    # HTTP/1.1 is required for chunked transfer encoding on /epg.json
+    protocol_version = "HTTP/1.1"
+    
     db: Optional[TVScheduleDB] = None  # Will be set by server
     
     def do_GET(self):
@@ -138,7 +173,11 @@ class EPGHandler(BaseHTTPRequestHandler):
         self.send_json_response(response)
     
     def handle_epg(self, params):
-        """Get full EPG for a schedule"""
+        """
+        Stream the EPG for a schedule using chunked transfer encoding
+        Query params: schedule=<schedule_id>, channel=<id>[,<id>...],
+                      from=<datetime>, to=<datetime>, format=json|ndjson
+        """
         schedule_id = params.get('schedule', [None])[0]
         
         if not schedule_id:
@@ -150,8 +189,22 @@ class EPGHandler(BaseHTTPRequestHandler):
         
         try:
             schedule_id = int(schedule_id)
+            channel_param = params.get('channel', [None])[0]
+            channel_ids = [int(c) for c in channel_param.split(',') if c.strip()] if channel_param else None
+        except ValueError:
+            self.send_json_response({"error": "Invalid schedule or channel ID"}, 400)
+            return
+        
+        try:
+            window_start = self._parse_window_time(params.get('from', [None])[0])
+            window_end = self._parse_window_time(params.get('to', [None])[0])
         except ValueError:
-            self.send_json_response({"error": "Invalid schedule ID"}, 400)
+            self.send_json_response({"error": "Invalid from/to time (use YYYY-MM-DD or ISO datetime)"}, 400)
+            return
+        
+        output_format = params.get('format', ['json'])[0]
+        if output_format not in ('json', 'ndjson'):
+            self.send_json_response({"error": "Invalid format (use json or ndjson)"}, 400)
             return
         
         # Get schedule details
@@ -159,63 +212,135 @@ class EPGHandler(BaseHTTPRequestHandler):
             self.send_json_response({"error": "Database not initialized"}, 500)
             return
         
-        schedules = self.db.get_schedules()
-        schedule = next((s for s in schedules if s['schedule_id'] == schedule_id), None)
+        schedule = self.db.get_schedule(schedule_id)
         
         if not schedule:
             self.send_json_response({"error": "Schedule not found"}, 404)
             return
         
-        # Get time slots
-        slots = self.db.get_time_slots(schedule_id)
+        schedule_info = {
+            "id": schedule_id,
+            "name": schedule.get('name'),
+            "start_date": schedule.get('start_date'),
+            "end_date": schedule.get('end_date'),
+            "enable_looping": schedule.get('enable_looping', 0)
+        }
+        window = {
+            "from": window_start.replace(' ', 'T') if window_start else None,
+            "to": window_end.replace(' ', 'T') if window_end else None
+        }
+        
+        slots = self.db.iter_time_slots(schedule_id, channel_ids, window_start, window_end)
         
-        # Build EPG by channel
-        epg_by_channel = {}
+        content_type = 'application/x-ndjson' if output_format == 'ndjson' else 'application/json'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        
+        writer = ChunkedWriter(self.wfile)
+        try:
+            if output_format == 'ndjson':
+                self._write_epg_ndjson(writer, schedule_info, window, slots)
+            else:
+                self._write_epg_json(writer, schedule_info, window, slots)
+            writer.close()
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away mid-stream; stop reading from the cursor
+            self.close_connection = True
+        finally:
+            slots.close()
+    
+    def _write_epg_json(self, writer, schedule_info, window, slots):
+        """Write the EPG as a single JSON document, one program at a time"""
+        writer.write('{"schedule": %s, "window": %s, "channels": {' % (
+            json.dumps(schedule_info), json.dumps(window)))
+        
+        current_channel = None
+        first_program = True
         for slot in slots:
-            channel_id = slot['channel_id']
-            if channel_id not in epg_by_channel:
-                channel = self._get_channel(channel_id)
-                epg_by_channel[channel_id] = {
-                    "channel": channel,
-                    "programs": []
-                }
-            
-            try:
-                start = datetime.strptime(slot['start_time'], "%Y-%m-%d %H:%M:%S")
-                end = datetime.strptime(slot['end_time'], "%Y-%m-%d %H:%M:%S")
-                
-                epg_by_channel[channel_id]["programs"].append({
-                    "id": slot['slot_id'],
-                    "show_id": slot.get('show_id'),
-                    "show_name": self._get_show_name(slot.get('show_id')),
-                    "start": start.isoformat(),
-                    "end": end.isoformat(),
-                    "duration_minutes": int((end - start).total_seconds() / 60)
-                })
-            except:
+            program = self._slot_to_program(slot)
+            if program is None:
                 continue
+            
+            if slot['channel_id'] != current_channel:
+                if current_channel is not None:
+                    writer.write(']}, ')
+                current_channel = slot['channel_id']
+                writer.write('%s: {"channel": %s, "programs": [' % (
+                    json.dumps(str(current_channel)),
+                    json.dumps(self._slot_channel(slot))))
+                first_program = True
+            
+            if not first_program:
+                writer.write(', ')
+            writer.write(json.dumps(program))
+            first_program = False
         
-        response = {
-            "schedule": {
-                "id": schedule_id,
-                "name": schedule.get('name'),
-                "start_date": schedule.get('start_date'),
-                "end_date": schedule.get('end_date'),
-                "enable_looping": schedule.get('enable_looping', 0)
-            },
-            "channels": epg_by_channel,
+        if current_channel is not None:
+            writer.write(']}')
+        writer.write('}, "generated_at": %s}' % json.dumps(datetime.now().isoformat()))
+    
+    def _write_epg_ndjson(self, writer, schedule_info, window, slots):
+        """Write the EPG as newline-delimited JSON: a header line, then one program per line"""
+        writer.write(json.dumps({
+            "schedule": schedule_info,
+            "window": window,
             "generated_at": datetime.now().isoformat()
-        }
+        }) + '\n')
         
-        self.send_json_response(response)
+        for slot in slots:
+            program = self._slot_to_program(slot)
+            if program is None:
+                continue
+            program["channel_id"] = slot['channel_id']
+            program["channel_name"] = slot.get('channel_name')
+            writer.write(json.dumps(program) + '\n')
+    
+    @staticmethod
+    def _slot_to_program(slot):
+        """Convert a time slot row into an EPG program entry (None if times are malformed)"""
+        try:
+            start = datetime.strptime(slot['start_time'], "%Y-%m-%d %H:%M:%S")
+            end = datetime.strptime(slot['end_time'], "%Y-%m-%d %H:%M:%S")
+        except (TypeError, ValueError):
+            return None
+        
+        return {
+            "id": slot['slot_id'],
+            "show_id": slot.get('show_id'),
+            "show_name": slot.get('show_name') or "Unknown",
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "duration_minutes": int((end - start).total_seconds() / 60)
+        }
+    
+    @staticmethod
+    def _slot_channel(slot):
+        """Channel details carried on a streamed time slot row"""
+        return {
+            "id": slot['channel_id'],
+            "name": slot.get('channel_name') or f"Channel {slot['channel_id']}",
+            "description": slot.get('channel_description') or ""
+        }
+    
+    @staticmethod
+    def _parse_window_time(value):
+        """Normalize a from/to query value to the DB timestamp format"""
+        if not value:
+            return None
+        return datetime.fromisoformat(value).strftime("%Y-%m-%d %H:%M:%S")
     
     def send_json_response(self, data, status_code=200):
         """Send JSON response"""
+        body = json.dumps(data, indent=2).encode('utf-8')
         self.send_response(status_code)
         self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
         self.send_header('Access-Control-Allow-Origin', '*')
         self.end_headers()
-        self.wfile.write(json.dumps(data, indent=2).encode('utf-8'))
+        self.wfile.write(body)
     
     def log_message(self, format, *args):
         """Suppress log messages"""
@@ -231,26 +356,6 @@ class EPGHandler(BaseHTTPRequestHandler):
             return show.get('name') if show else "Unknown"
         except:
             return "Unknown"
-    
-    def _get_channel(self, channel_id):
-        """Get channel details"""
-        if not self.db:
-            return {"id": channel_id, "name": f"Channel {channel_id}", "description": ""}
-        
-        try:
-            channels = self.db.get_channels()
-            channel = next((c for c in channels if c['channel_id'] == channel_id), None)
-            return {
-                "id": channel_id,
-                "name": channel.get('name') if channel else f"Channel {channel_id}",
-                "description": channel.get('description') if channel else ""
-            }
-        except:
-            return {
-                "id": channel_id,
-                "name": f"Channel {channel_id}",
-                "description": ""
-            }
 
 
 class WebEPGServer:
@@ -269,7 +374,7 @@ class WebEPGServer:
     
     def start(self):
         """Start the server in a background thread"""
-        self.server = HTTPServer((self.host, self.port), EPGHandler)
+        self.server = ThreadingHTTPServer((self.host, self.port), EPGHandler)
         self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
         self.thread.start()
         print(f"EPG Server started at http://{self.host}:{self.port}")